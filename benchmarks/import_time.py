@@ -0,0 +1,55 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark measures, in fresh interpreters, the start-up costs paid by a process that only needs a few variables:
+# - "import": `import openfisca_germany`;
+# - "system": `CountryTaxBenefitSystem()`, which only registers the variable names;
+# - "one variable": the first `get_variable`, which imports the file defining the variable;
+# - "all variables": importing every variable file, which was the cost of building a system before variables were loaded lazily.
+#
+# Usage: python benchmarks/import_time.py [--repeat 10]
+
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+
+
+SCRIPT = '''
+import json, time
+start = time.perf_counter()
+import openfisca_germany
+imported = time.perf_counter()
+tax_benefit_system = openfisca_germany.CountryTaxBenefitSystem()
+built = time.perf_counter()
+tax_benefit_system.get_variable('disposable_income')
+one_variable = time.perf_counter()
+tax_benefit_system.variables.load_all()
+all_variables = time.perf_counter()
+print(json.dumps({
+    'import': imported - start,
+    'system': built - imported,
+    'one variable': one_variable - built,
+    'all variables': all_variables - one_variable,
+    }))
+'''
+
+
+def run_once():
+    output = subprocess.check_output([sys.executable, '-c', SCRIPT])
+    return json.loads(output.decode().strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure the import and start-up times of openfisca_germany in fresh interpreters.")
+    parser.add_argument('--repeat', type = int, default = 10, help = "number of fresh interpreters to start")
+    args = parser.parse_args()
+
+    runs = [run_once() for _ in range(args.repeat)]
+    for step in runs[0]:
+        timings = [run[step] for run in runs]
+        print("{:<15} median {:8.2f} ms   best {:8.2f} ms".format(step, statistics.median(timings) * 1000, min(timings) * 1000))  # noqa: T001, T201
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark compares simulations whose inputs are read from an in-memory table with simulations whose inputs are mapped from a directory of .npy files, or from an Arrow IPC file.
+# For each source, it reports the time to build the simulation and to compute the ALG2 variables, the bytes of inputs owned by the simulation, and the bytes of inputs mapped from the file.
+#
+# Usage: python benchmarks/mapped.py [--households 1000000]
+
+import argparse
+import os
+import tempfile
+import time
+
+from openfisca_germany.microsimulation import build_simulation, generate_population, open_columns, write_columns
+from openfisca_germany.storage import get_mapped_usage, get_storage_usage
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+VARIABLES = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh']
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare simulations built from an in-memory table and from mapped columnar files.")
+    parser.add_argument('--households', type = int, default = 1_000_000, help = "number of households of the synthetic table")
+    args = parser.parse_args()
+
+    tax_benefit_system = get_tax_benefit_system()
+    table = generate_population(args.households)
+    print("{:,} households, {:,} persons".format(args.households, len(table['p_id'])))  # noqa: T001, T201
+    print("  {:<10} {:>10} {:>10} {:>12} {:>12}".format('source', 'build', 'compute', 'owned MB', 'mapped MB'))  # noqa: T001, T201
+    with tempfile.TemporaryDirectory() as directory:
+        sources = {'memory': lambda: table}
+        for name, file_name in [('npy', 'survey'), ('arrow', 'survey.arrow')]:
+            path = os.path.join(directory, file_name)
+            write_columns(table, path, tax_benefit_system)
+            sources[name] = lambda path = path: open_columns(path)
+
+        for name, open_source in sources.items():
+            start = time.perf_counter()
+            simulation = build_simulation(tax_benefit_system, open_source(), 2019)
+            built = time.perf_counter()
+            for variable in VARIABLES:
+                simulation.calculate(variable, 2019)
+            computed = time.perf_counter()
+            inputs = [variable for variable in table if variable in tax_benefit_system.variables]
+            owned = sum(get_storage_usage(simulation).get(variable, 0) for variable in inputs)
+            mapped = sum(get_mapped_usage(simulation).get(variable, 0) for variable in inputs)
+            print("  {:<10} {:9.2f}s {:9.2f}s {:12.1f} {:12.1f}".format(name, built - start, computed - built, owned / 1e6, mapped / 1e6))  # noqa: T001, T201
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark measures the throughput of `run_in_parallel` for `regelbedarf_m_hh` and `arbeitsl_geld_2_eink_hh`, for an increasing number of processes.
+# The speedup is relative to the first number of processes. One process simulates the whole table in the current process.
+#
+# Usage: python benchmarks/parallel.py [--households 1000000] [--processes 1 2 4 8 16 32]
+
+import argparse
+import time
+
+from openfisca_germany.microsimulation import generate_population, run_in_parallel
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+VARIABLES = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh']
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure the throughput of run_in_parallel for an increasing number of processes.")
+    parser.add_argument('--households', type = int, default = 1_000_000, help = "number of households of the synthetic table")
+    parser.add_argument('--processes', type = int, nargs = '+', default = [1, 2, 4, 8, 16, 32], help = "numbers of processes to compare")
+    args = parser.parse_args()
+
+    tax_benefit_system = get_tax_benefit_system()
+    table = generate_population(args.households)
+    person_count = len(table['p_id'])
+    reference = None
+    for processes in args.processes:
+        start = time.perf_counter()
+        run_in_parallel(tax_benefit_system, table, 2019, VARIABLES, processes = processes)
+        duration = time.perf_counter() - start
+        if reference is None:
+            reference = duration
+        print("{:>3} processes {:8.2f} s {:12,.0f} persons/s   speedup {:5.2f}".format(  # noqa: T001, T201
+            processes, duration, person_count / duration, reference / duration))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark measures the comparison of a reference table with the results of the tax and benefit system, as in the golden data tests of `test_arbeitsl_geld_2.py`.
+# The reference table is a synthetic population spread over the years of these tests, with the results of a simulation for each year as reference values.
+# It compares:
+# - "per column": building a simulation for each year and output column, and comparing one column at a time, as the golden data tests used to;
+# - "one run": `compare_with_reference`, computing all the outputs for all the years in one dated simulation.
+#
+# Usage: python benchmarks/parity.py [--households 1000 10000]
+
+import argparse
+import time
+
+import numpy as np
+
+from openfisca_germany.legislation_dates import DatedSimulation
+from openfisca_germany.microsimulation import build_simulation, compare_with_reference, generate_population
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+YEARS = [2005, 2006, 2009, 2011, 2013, 2016, 2019]
+
+OUTPUTS = [
+    '_arbeitsl_geld_2_brutto_eink_hh',
+    'alleinerziehenden_mehrbedarf_hh',
+    'regelbedarf_m_hh',
+    'regelsatz_m_hh',
+    'kost_unterk_m_hh',
+    'unterhaltsvors_m_hh',
+    'eink_anr_frei',
+    'arbeitsl_geld_2_eink',
+    'arbeitsl_geld_2_eink_hh',
+    ]
+
+
+def get_reference(tax_benefit_system, household_count):
+    table = generate_population(household_count, seed = 0)
+    table['jahr'] = np.random.default_rng(0).choice(YEARS, household_count)[table['hh_id']].astype(float)
+    for year in YEARS:
+        rows = table['jahr'] == year
+        simulation = build_simulation(tax_benefit_system, table, year)
+        for variable in OUTPUTS:
+            population = simulation.get_variable_population(variable)
+            values = simulation.calculate(variable, year).astype(float)
+            if not population.entity.is_person:
+                values = population.project(values)
+            table.setdefault('expected_' + variable, np.zeros(len(rows)))[rows] = values[rows]
+    return table
+
+
+def compare_per_column(tax_benefit_system, table):
+    inputs = {name: values for name, values in table.items() if not name.startswith('expected_')}
+    mismatches = 0
+    for year in YEARS:
+        rows = table['jahr'] == year
+        year_table = {name: values[rows] for name, values in inputs.items()}
+        for variable in OUTPUTS:
+            simulation = build_simulation(tax_benefit_system, year_table, year)
+            population = simulation.get_variable_population(variable)
+            values = simulation.calculate(variable, year)
+            if not population.entity.is_person:
+                values = population.project(values)
+            mismatches += not np.allclose(values, table['expected_' + variable][rows], atol = 0.01)
+    return mismatches
+
+
+def compare_in_one_run(tax_benefit_system, table):
+    outputs = {variable: 'expected_' + variable for variable in OUTPUTS}
+    return len(compare_with_reference(tax_benefit_system, table, max(YEARS), outputs, simulation_class = DatedSimulation))
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure the comparison of a reference table with the results of the tax and benefit system.")
+    parser.add_argument('--households', type = int, nargs = '+', default = [1_000, 10_000], help = "numbers of households of the reference tables")
+    args = parser.parse_args()
+
+    tax_benefit_system = get_tax_benefit_system()
+    print("  {:>12} {:>12} {:>14} {:>12} {:>10}".format('households', 'method', 'simulations', 'time (s)', 'mismatch'))  # noqa: T001, T201
+    for household_count in args.households:
+        table = get_reference(tax_benefit_system, household_count)
+        for method, compare, simulation_count in [('per column', compare_per_column, len(YEARS) * len(OUTPUTS)), ('one run', compare_in_one_run, 1)]:
+            start = time.perf_counter()
+            mismatches = compare(tax_benefit_system, table)
+            print("  {:12,} {:>12} {:14} {:12.2f} {:10}".format(household_count, method, simulation_count, time.perf_counter() - start, mismatches))  # noqa: T001, T201
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark compares the aggregations of household members:
+# - "core": `GroupPopulation` from OpenFisca-Core, which derives the grouping of the members on every aggregation;
+# - "indexed": `IndexedGroupPopulation`, which aggregates the members with a membership index built once.
+# Members are either in consecutive rows, as with `build_simulation` on survey data, or shuffled.
+#
+# Usage: python benchmarks/populations.py [--households 1000000] [--repeat 5]
+
+import argparse
+import timeit
+
+import numpy as np
+
+from openfisca_core.populations import GroupPopulation, Population
+
+from openfisca_germany.entities import Household
+from openfisca_germany.populations import IndexedGroupPopulation
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+def build_population(population_class, members_entity_id):
+    members = Population(get_tax_benefit_system().person_entity)
+    members.count = len(members_entity_id)
+    population = population_class(Household, members)
+    population.count = members_entity_id.max() + 1
+    population.members_entity_id = members_entity_id
+    return population
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare the aggregations of OpenFisca-Core and indexed group populations.")
+    parser.add_argument('--households', type = int, default = 1_000_000, help = "number of households of 1 to 5 persons")
+    parser.add_argument('--repeat', type = int, default = 5, help = "number of calculations, of which the best is kept")
+    args = parser.parse_args()
+
+    random = np.random.RandomState(0)
+    sizes = random.randint(1, 6, args.households)
+    members_entity_id = np.repeat(np.arange(args.households), sizes)
+    person_count = len(members_entity_id)
+    values = random.uniform(0, 1000, person_count)
+    flags = values > 900
+    operations = {
+        'sum': lambda population: population.sum(values),
+        'any': lambda population: population.any(flags),
+        'all': lambda population: population.all(flags),
+        'max': lambda population: population.max(values),
+        'nb_persons': lambda population: population.nb_persons(),
+        'value_from_first_person': lambda population: population.value_from_first_person(values),
+        'project': lambda population: population.project(population.sum(values)),
+        }
+
+    for layout in ['consecutive', 'shuffled']:
+        if layout == 'shuffled':
+            order = random.permutation(person_count)
+            members_entity_id, values[:], flags[:] = members_entity_id[order], values[order], flags[order]
+        core = build_population(GroupPopulation, members_entity_id)
+        indexed = build_population(IndexedGroupPopulation, members_entity_id)
+        # The first aggregation builds the membership index, and Core's positions of the members
+        indexed.nb_persons()
+        core.members_position
+        print("{:,} households, {:,} persons, {} members".format(args.households, person_count, layout))  # noqa: T001, T201
+        for name, operation in operations.items():
+            core_time = min(timeit.repeat(lambda: operation(core), number = 1, repeat = args.repeat))
+            indexed_time = min(timeit.repeat(lambda: operation(indexed), number = 1, repeat = args.repeat))
+            print("  {:<25} core {:8.1f} ms   indexed {:8.1f} ms   speedup {:5.1f}".format(  # noqa: T001, T201
+                name, core_time * 1000, indexed_time * 1000, core_time / indexed_time))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark compares web workers that each build their tax and benefit system with preforked workers sharing a system warmed up by their parent.
+# For each worker, it reports the time from the fork until the worker is ready, the latency of its first `/calculate` request, and its resident and private memory once it answered.
+#
+# Usage: python benchmarks/preload.py [--workers 4] [--warm-years 2015 2020]
+
+import argparse
+import copy
+import multiprocessing
+import time
+
+from openfisca_germany import CountryTaxBenefitSystem
+from openfisca_germany.situation_examples import couple
+from openfisca_germany.web_api import create_app
+from openfisca_germany.web_api.preload import freeze, get_memory_usage, warm_up, warm_up_app
+
+
+def run_worker(app, forked_at, connection):
+    if app is None:
+        app = create_app(CountryTaxBenefitSystem())
+    ready = time.perf_counter()
+    client = app.test_client()
+    response = client.post('/calculate', json = copy.deepcopy(couple))
+    answered = time.perf_counter()
+    assert response.status_code == 200, response.get_json()
+    connection.send((ready - forked_at, answered - ready, get_memory_usage()))
+
+
+def start_workers(app, count):
+    context = multiprocessing.get_context('fork')
+    reports = []
+    for _ in range(count):
+        receiver, sender = context.Pipe(duplex = False)
+        worker = context.Process(target = run_worker, args = (app, time.perf_counter(), sender))
+        worker.start()
+        reports.append(receiver.recv())
+        worker.join()
+    return reports
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare the start-up and memory of web workers with and without a preloaded system.")
+    parser.add_argument('--workers', type = int, default = 4, help = "number of workers forked")
+    parser.add_argument('--warm-years', type = int, nargs = 2, default = [2015, 2020], metavar = ('FIRST', 'LAST'), help = "years for which the preloaded system is warmed up")
+    args = parser.parse_args()
+
+    print("  {:<10} {:>10} {:>14} {:>10} {:>12}".format('mode', 'startup', 'first request', 'RSS MB', 'private MB'))  # noqa: T001, T201
+    cold_reports = start_workers(None, args.workers)
+
+    tax_benefit_system = CountryTaxBenefitSystem()
+    years = range(args.warm_years[0], args.warm_years[1] + 1)
+    warm_up(tax_benefit_system, years)
+    app = create_app(tax_benefit_system)
+    warm_up_app(app, tax_benefit_system, years)
+    freeze()
+    preloaded_reports = start_workers(app, args.workers)
+
+    for name, reports in [('cold', cold_reports), ('preloaded', preloaded_reports)]:
+        for startup, first_request, memory in reports:
+            print("  {:<10} {:9.3f}s {:13.3f}s {:10.1f} {:12.1f}".format(  # noqa: T001, T201
+                name, startup, first_request, memory['rss'] / 1e6, (memory['private'] or 0) / 1e6))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,54 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark measures the overhead of profiling the ALG2 variables, and shows their profile.
+# It compares the shortest of `--repeat` runs without and with a profiler, prints the variables taking the most time, and can write the collapsed stacks for a flame graph.
+#
+# Usage: python benchmarks/profiling.py [--households 100000] [--repeat 5] [--output alg2.folded]
+
+import argparse
+import gc
+import time
+
+from openfisca_germany.microsimulation import build_simulation, generate_population
+from openfisca_germany.profiling import Profiler
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+VARIABLES = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh']
+
+
+def run(tax_benefit_system, table, profiler, repeat):
+    durations = []
+    for _ in range(repeat):
+        simulation = build_simulation(tax_benefit_system, table, 2019, profiler = profiler)
+        start = time.perf_counter()
+        for variable in VARIABLES:
+            simulation.calculate(variable, 2019)
+        durations.append(time.perf_counter() - start)
+        del simulation
+        gc.collect()
+    return min(durations)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure the overhead of profiling the ALG2 variables, and show their profile.")
+    parser.add_argument('--households', type = int, default = 100_000, help = "number of households of the synthetic population")
+    parser.add_argument('--repeat', type = int, default = 5, help = "number of runs, of which the shortest is kept")
+    parser.add_argument('--output', help = "path to which the collapsed stacks are written")
+    args = parser.parse_args()
+
+    tax_benefit_system = get_tax_benefit_system()
+    table = generate_population(args.households)
+    run(tax_benefit_system, table, None, 1)  # Warm up the parameters and formulas
+    reference = run(tax_benefit_system, table, None, args.repeat)
+    profiler = Profiler()
+    profiled = run(tax_benefit_system, table, profiler, args.repeat)
+    print("{:,} persons: {:.4f} s without profiler, {:.4f} s with profiler, overhead {:+.1%}".format(  # noqa: T001, T201
+        len(table['p_id']), reference, profiled, profiled / reference - 1))
+    print(profiler.format_table(limit = 15))  # noqa: T001, T201
+    if args.output:
+        profiler.write_collapsed_stacks(args.output)
+
+
+if __name__ == '__main__':
+    main()
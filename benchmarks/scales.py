@@ -0,0 +1,43 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark compares the computation of the marginal rate scales of the legislation:
+# - "core": `MarginalRateTaxScale.calc` from OpenFisca-Core, which builds a (persons x brackets) matrix;
+# - "compiled": `CompiledMarginalRateTaxScale.calc`, which interpolates between the cumulative amounts at each threshold.
+#
+# Usage: python benchmarks/scales.py [--persons 1000000 10000000] [--repeat 5]
+
+import argparse
+import timeit
+
+import numpy as np
+
+from openfisca_core.taxscales import MarginalRateTaxScale
+
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+SCALES = {
+    'eink_anr_frei': (0, 2000),
+    'social_security_contribution': (0, 30000),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare the computation times of compiled and OpenFisca-Core marginal rate scales.")
+    parser.add_argument('--persons', type = int, nargs = '+', default = [1_000_000, 10_000_000], help = "numbers of tax bases")
+    parser.add_argument('--repeat', type = int, default = 5, help = "number of calculations, of which the best is kept")
+    args = parser.parse_args()
+
+    parameters = get_tax_benefit_system().get_parameters_at_instant('2019-01-01').taxes
+    for name, (low, high) in SCALES.items():
+        scale = parameters[name]
+        for person_count in args.persons:
+            bases = np.random.RandomState(0).uniform(low, high, person_count)
+            core = min(timeit.repeat(lambda: MarginalRateTaxScale.calc(scale, bases), number = 1, repeat = args.repeat))
+            compiled = min(timeit.repeat(lambda: scale.calc(bases), number = 1, repeat = args.repeat))
+            print("{:<30} {:>12,} persons   core {:8.1f} ms   compiled {:8.1f} ms   speedup {:5.1f}".format(  # noqa: T001, T201
+                name, person_count, core * 1000, compiled * 1000, core / compiled))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark compares the time needed to load the legislation parameters:
+# - "yaml": the cache is disabled and every YAML file is parsed;
+# - "cold": the cache is empty, so the YAML files are parsed and the compiled parameters are written;
+# - "warm": the compiled parameters are read back from the cache.
+#
+# Usage: python benchmarks/startup.py [--repeat 20]
+
+import argparse
+import os
+import shutil
+import tempfile
+import timeit
+
+from openfisca_germany import COUNTRY_DIR, CountryTaxBenefitSystem, parameter_cache
+
+
+PARAMETERS_DIR = os.path.join(COUNTRY_DIR, 'parameters')
+
+
+def time_yaml():
+    return timeit.timeit(lambda: parameter_cache.load_parameters(PARAMETERS_DIR, cache_dir = ''), number = 1)
+
+
+def time_cold(cache_dir):
+    shutil.rmtree(cache_dir, ignore_errors = True)
+    return timeit.timeit(lambda: parameter_cache.load_parameters(PARAMETERS_DIR, cache_dir = cache_dir), number = 1)
+
+
+def time_warm(cache_dir):
+    return timeit.timeit(lambda: parameter_cache.load_parameters(PARAMETERS_DIR, cache_dir = cache_dir), number = 1)
+
+
+def time_system():
+    return timeit.timeit(CountryTaxBenefitSystem, number = 1)
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare cold and warm loading times of the legislation parameters.")
+    parser.add_argument('--repeat', type = int, default = 20, help = "number of timed runs per mode")
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    os.environ[parameter_cache.CACHE_DIR_ENVIRONMENT_VARIABLE] = cache_dir
+    try:
+        results = {
+            'yaml': [time_yaml() for _ in range(args.repeat)],
+            'cold': [time_cold(cache_dir) for _ in range(args.repeat)],
+            'warm': [time_warm(cache_dir) for _ in range(args.repeat)],
+            'CountryTaxBenefitSystem() (warm)': [time_system() for _ in range(args.repeat)],
+            }
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors = True)
+
+    for mode, timings in results.items():
+        print("{:<35} best {:8.2f} ms   mean {:8.2f} ms".format(mode, min(timings) * 1000, sum(timings) / len(timings) * 1000))  # noqa: T001, T201
+    print("{:<35} {:8.1f}x".format('speedup (yaml / warm)', min(results['yaml']) / min(results['warm'])))  # noqa: T001, T201
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark measures the memory stored by the holders of an ALG2 simulation, with the default dtypes of OpenFisca-Core and with the storage profiles.
+# It then validates the lean profile against the float64 reference run, within the tolerance of the golden data tests.
+#
+# Usage: python benchmarks/storage.py [--households 1000000]
+
+import argparse
+
+from openfisca_germany.microsimulation import build_simulation, compare_storage_profiles, generate_population
+from openfisca_germany.storage import get_storage_usage, lean_storage, reference_storage
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+VARIABLES = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh']
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure the memory stored by an ALG2 simulation with each storage profile.")
+    parser.add_argument('--households', type = int, default = 1_000_000, help = "number of households of the synthetic table")
+    args = parser.parse_args()
+
+    tax_benefit_system = get_tax_benefit_system()
+    table = generate_population(args.households)
+    print("{:,} households, {:,} persons".format(args.households, len(table['p_id'])))  # noqa: T001, T201
+    for name, system in [('default', tax_benefit_system), ('lean', lean_storage(tax_benefit_system)), ('reference', reference_storage(tax_benefit_system))]:
+        simulation = build_simulation(system, table, 2019)
+        for variable in VARIABLES:
+            simulation.calculate(variable, 2019)
+        print("  {:<10} {:10.1f} MB".format(name, sum(get_storage_usage(simulation).values()) / 1e6))  # noqa: T001, T201
+
+    differences = compare_storage_profiles(tax_benefit_system, table, 2019, VARIABLES)
+    print("lean profile {}".format("valid" if not differences else "invalid: {}".format(differences)))  # noqa: T001, T201
+
+
+if __name__ == '__main__':
+    main()
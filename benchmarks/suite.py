@@ -0,0 +1,149 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark suite measures the hot paths of the country package on synthetic populations of increasing sizes:
+# - "system": building the tax and benefit system, with the compiled parameters cache;
+# - "simulation": building a simulation from a person-level table;
+# - each variable of `VARIABLES`: computing it, with its dependencies, on a simulation just built.
+#
+# For each case and size, it records the wall time, the shortest of `--repeat` runs, and the peak memory allocated by a run, traced with `tracemalloc`.
+# Building the system does not depend on the size of the population: it is measured once.
+# Results can be saved as a baseline, and compared with a baseline: the cases slower or bigger than the baseline by more than `--tolerance` are reported as regressions.
+#
+# Usage: python benchmarks/suite.py [--persons 1000 100000 10000000] [--repeat 5] [--save baseline.json] [--compare baseline.json] [--tolerance 0.5]
+
+import argparse
+import gc
+import json
+import os
+import platform
+import sys
+import time
+import tracemalloc
+
+from openfisca_core.periods import MONTH
+
+from openfisca_germany import CountryTaxBenefitSystem
+from openfisca_germany.microsimulation import build_simulation, generate_population
+from openfisca_germany.microsimulation.synthetic import HOUSEHOLD_SIZES
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+VARIABLES = ['disposable_income', 'total_taxes', 'total_benefits', 'regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh']
+
+YEAR = 2019
+
+# Average number of persons of the households of `generate_population`
+PERSONS_BY_HOUSEHOLD = sum(size * share for size, share in HOUSEHOLD_SIZES.items()) / sum(HOUSEHOLD_SIZES.values())
+
+
+def measure(run, prepare = lambda: None, repeat = 1):
+    """
+    Runs ``run(prepare())`` ``repeat`` times, and returns the shortest wall time.
+    Then runs it once more while tracing allocations, including the ones of numpy arrays, and returns the peak memory allocated during the run.
+    """
+    times = []
+    for _ in range(repeat):
+        argument = prepare()
+        start = time.perf_counter()
+        run(argument)
+        times.append(time.perf_counter() - start)
+        # Simulations are reference cycles: collect them before building the next one
+        del argument
+        gc.collect()
+
+    argument = prepare()
+    tracemalloc.start()
+    try:
+        run(argument)
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return dict(time = min(times), peak_memory = peak)
+
+
+def get_table(person_count):
+    return generate_population(max(round(person_count / PERSONS_BY_HOUSEHOLD), 1))
+
+
+def get_period(tax_benefit_system, variable_name):
+    return '{}-01'.format(YEAR) if tax_benefit_system.get_variable(variable_name).definition_period == MONTH else YEAR
+
+
+def run_suite(person_counts, repeat):
+    """
+    Returns the wall time and peak memory of each case, by case name and number of persons.
+    """
+    tax_benefit_system = get_tax_benefit_system()
+    results = {'system': {'any': measure(lambda _: CountryTaxBenefitSystem(), repeat = repeat)}, 'simulation': {}}
+    results.update({variable: {} for variable in VARIABLES})
+    for person_count in person_counts:
+        table = get_table(person_count)
+        size = str(person_count)
+        results['simulation'][size] = measure(lambda _: build_simulation(tax_benefit_system, table, YEAR), repeat = repeat)
+        for variable in VARIABLES:
+            period = get_period(tax_benefit_system, variable)
+            results[variable][size] = measure(
+                lambda simulation: simulation.calculate(variable, period),
+                prepare = lambda: build_simulation(tax_benefit_system, table, YEAR),
+                repeat = repeat,
+                )
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Returns the regressions of ``results`` with respect to ``baseline``, as (case, size, measure, ratio) tuples.
+
+    Wall times of less than a millisecond, and peak memories of less than a megabyte, are too noisy to be compared.
+    """
+    thresholds = dict(time = 1e-3, peak_memory = 1e6)
+    regressions = []
+    for case, sizes in results.items():
+        for size, measures in sizes.items():
+            reference = baseline.get(case, {}).get(size)
+            if reference is None:
+                continue
+            for name, threshold in thresholds.items():
+                if max(measures[name], reference[name]) < threshold:
+                    continue
+                ratio = measures[name] / max(reference[name], threshold)
+                if ratio > 1 + tolerance:
+                    regressions.append((case, size, name, ratio))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure the wall time and peak memory of the hot paths of the country package.")
+    parser.add_argument('--persons', type = int, nargs = '+', default = [1_000, 100_000, 10_000_000], help = "numbers of persons of the synthetic populations")
+    parser.add_argument('--repeat', type = int, default = 5, help = "number of runs of each case, of which the shortest is kept")
+    parser.add_argument('--save', help = "path of a JSON file to which the results are saved, e.g. as a new baseline")
+    parser.add_argument('--compare', help = "path of a JSON file of baseline results to compare with")
+    parser.add_argument('--tolerance', type = float, default = 0.5, help = "relative increase above the baseline reported as a regression")
+    args = parser.parse_args()
+
+    results = run_suite(args.persons, args.repeat)
+    baseline = {}
+    if args.compare and os.path.exists(args.compare):
+        with open(args.compare) as baseline_file:
+            baseline = json.load(baseline_file)['results']
+
+    print("  {:<26} {:>10} {:>12} {:>14} {:>10}".format('case', 'persons', 'time (s)', 'peak (MB)', 'vs base'))  # noqa: T001, T201
+    for case, sizes in results.items():
+        for size, measures in sizes.items():
+            reference = baseline.get(case, {}).get(size)
+            ratio = "{:.2f}x".format(measures['time'] / reference['time']) if reference and reference['time'] else ''
+            print("  {:<26} {:>10} {:12.4f} {:14.1f} {:>10}".format(case, size, measures['time'], measures['peak_memory'] / 1e6, ratio))  # noqa: T001, T201
+
+    if args.save:
+        with open(args.save, 'w') as results_file:
+            json.dump(dict(machine = dict(python = platform.python_version(), platform = platform.platform()), results = results), results_file, indent = 2, sort_keys = True)
+            results_file.write('\n')
+
+    regressions = compare(results, baseline, args.tolerance)
+    for case, size, name, ratio in regressions:
+        print("Regression: {} for {} persons, {} is {:.2f} times the baseline".format(case, size, name, ratio))  # noqa: T001, T201
+    return 1 if regressions else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark measures the generation of synthetic populations of increasing sizes, and writing them as columnar files ready to be mapped by simulations.
+#
+# Usage: python benchmarks/synthetic.py [--households 10000 1000000 5000000] [--output population.arrow]
+
+import argparse
+import time
+
+from openfisca_germany.microsimulation import generate_population, write_columns
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Measure the generation of synthetic populations.")
+    parser.add_argument('--households', type = int, nargs = '+', default = [10_000, 1_000_000, 5_000_000], help = "numbers of households generated")
+    parser.add_argument('--seed', type = int, default = 0, help = "seed of the random generator")
+    parser.add_argument('--output', help = "path of a directory of .npy files, or of an Arrow IPC file, to which the last population is written")
+    args = parser.parse_args()
+
+    print("  {:>12} {:>12} {:>10} {:>16}".format('households', 'persons', 'time (s)', 'persons/s'))  # noqa: T001, T201
+    for household_count in args.households:
+        start = time.perf_counter()
+        population = generate_population(household_count, seed = args.seed)
+        duration = time.perf_counter() - start
+        person_count = len(population['p_id'])
+        print("  {:12,} {:12,} {:10.2f} {:16,.0f}".format(household_count, person_count, duration, person_count / duration))  # noqa: T001, T201
+
+    if args.output:
+        start = time.perf_counter()
+        write_columns(population, args.output, get_tax_benefit_system())
+        print("Written to {} in {:.2f} s".format(args.output, time.perf_counter() - start))  # noqa: T001, T201
+
+
+if __name__ == '__main__':
+    main()
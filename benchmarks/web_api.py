@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark load-tests the `/calculate` route of the web API, with one simulation per request, with coalesced requests, and with cached results.
+# Concurrent clients each send one-household situations, the stock `single` and `couple` examples with varying salaries, through the Flask test client.
+# Only `--distinct` situations are different, as front-end calculators send many identical situations.
+# It reports the p50 and p99 latencies and the throughput of each serving mode, and the simulations run by the coalescing modes, with their fallbacks to one simulation per request.
+#
+# Usage: python benchmarks/web_api.py [--clients 32] [--requests 50] [--distinct 200] [--max-batch-size 64] [--max-wait 0.005]
+
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+import copy
+import time
+
+import numpy as np
+
+from openfisca_germany.situation_examples import couple, single
+from openfisca_germany.systems import get_tax_benefit_system
+from openfisca_germany.web_api import create_app
+
+
+def get_situation(index):
+    situation = copy.deepcopy(couple if index % 2 else single)
+    situation['persons']['Alicia']['salary'] = {'2017-01': 1000 + index % 5000}
+    return situation
+
+
+def load_test(app, clients, requests, distinct):
+    def run_client(client_index):
+        client = app.test_client()
+        latencies = []
+        for index in range(requests):
+            situation = get_situation((client_index * requests + index) % distinct)
+            start = time.perf_counter()
+            response = client.post('/calculate', json = situation)
+            latencies.append(time.perf_counter() - start)
+            assert response.status_code == 200, response.get_json()
+        return latencies
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(clients) as executor:
+        latencies = np.concatenate(list(executor.map(run_client, range(clients))))
+    return latencies, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Load-test the /calculate route with and without coalescing concurrent requests and caching results.")
+    parser.add_argument('--clients', type = int, default = 32, help = "number of concurrent clients")
+    parser.add_argument('--requests', type = int, default = 50, help = "number of requests sent by each client")
+    parser.add_argument('--distinct', type = int, default = 200, help = "number of distinct situations sent")
+    parser.add_argument('--max-batch-size', type = int, default = 64, help = "maximum number of requests coalesced")
+    parser.add_argument('--max-wait', type = float, default = 0.005, help = "maximum time, in seconds, a request waits for other requests")
+    args = parser.parse_args()
+
+    tax_benefit_system = get_tax_benefit_system()
+    print("{} clients, {} requests each, {} distinct situations".format(args.clients, args.requests, args.distinct))  # noqa: T001, T201
+    print("  {:<12} {:>10} {:>10} {:>14} {:>12} {:>10}".format('mode', 'p50 ms', 'p99 ms', 'requests/s', 'simulations', 'fallbacks'))  # noqa: T001, T201
+    modes = [
+        ('per request', 1, 0),
+        ('coalesced', args.max_batch_size, 0),
+        ('cached', 1, 10_000),
+        ('both', args.max_batch_size, 10_000),
+        ]
+    for name, max_batch_size, cache_size in modes:
+        app = create_app(tax_benefit_system, max_batch_size = max_batch_size, max_wait = args.max_wait, cache_size = cache_size)
+        load_test(app, 1, 5, args.distinct)  # Warm up the parameters and formulas
+        batcher = app.config.get('MICRO_BATCHER')
+        stats_before = dict(batcher.stats) if batcher is not None else None
+        latencies, duration = load_test(app, args.clients, args.requests, args.distinct)
+        simulations, fallbacks = ('', '') if batcher is None else (batcher.stats[key] - stats_before[key] for key in ['simulations', 'fallbacks'])
+        print("  {:<12} {:10.1f} {:10.1f} {:14.0f} {:>12} {:>10}".format(  # noqa: T001, T201
+            name, np.percentile(latencies, 50) * 1000, np.percentile(latencies, 99) * 1000, len(latencies) / duration, simulations, fallbacks))
+
+
+if __name__ == '__main__':
+    main()
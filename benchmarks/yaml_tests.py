@@ -0,0 +1,61 @@
+# -*- coding: utf-8 -*-
+
+# This benchmark compares the YAML test runner of OpenFisca-Core with the batched runner of `openfisca_germany.yaml_tests`, on a large corpus.
+# The corpus is made of `--copies` copies of the YAML tests of the package.
+#
+# Usage: python benchmarks/yaml_tests.py [--copies 100] [--processes 1 4]
+
+import argparse
+import contextlib
+import io
+import os
+import tempfile
+import time
+
+from openfisca_core.tools.test_runner import run_tests
+
+from openfisca_germany.systems import get_tax_benefit_system
+from openfisca_germany.yaml_tests import iter_yaml_files, run_yaml_tests
+
+
+TESTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'openfisca_germany', 'tests')
+
+
+def write_corpus(directory, copies):
+    count = 0
+    for path in iter_yaml_files([TESTS_DIR]):
+        with open(path) as yaml_file:
+            content = yaml_file.read()
+        for copy in range(copies):
+            with open(os.path.join(directory, '{}_{}'.format(copy, os.path.basename(path))), 'w') as yaml_file:
+                yaml_file.write(content)
+            count += content.count('- name:')
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Compare the YAML test runner of OpenFisca-Core with the batched runner.")
+    parser.add_argument('--copies', type = int, default = 100, help = "number of copies of the YAML tests of the package")
+    parser.add_argument('--processes', type = int, nargs = '+', default = [1, 4], help = "numbers of processes of the batched runner")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        count = write_corpus(directory, args.copies)
+        print("{:,} test cases".format(count))  # noqa: T001, T201
+
+        start = time.perf_counter()
+        with contextlib.redirect_stdout(io.StringIO()):
+            exit_code = run_tests(get_tax_benefit_system(), [directory], {})
+        print("  {:<24} {:8.2f} s   exit code {}".format('OpenFisca-Core', time.perf_counter() - start, exit_code))  # noqa: T001, T201
+
+        for processes in args.processes:
+            start = time.perf_counter()
+            results = run_yaml_tests([directory], processes = processes)
+            failures = sum(result['error'] is not None for result in results)
+            simulations = round(sum(1. / result['batch'] for result in results if result['batch']))
+            print("  {:<24} {:8.2f} s   {} failures, {} simulations".format(  # noqa: T001, T201
+                'batched, {} processes'.format(processes), time.perf_counter() - start, failures, simulations))
+
+
+if __name__ == '__main__':
+    main()
@@ -4,8 +4,7 @@ import os
 
 from openfisca_core.taxbenefitsystems import TaxBenefitSystem
 
-from openfisca_germany import entities
-from openfisca_germany.situation_examples import couple
+from openfisca_germany import entities, lazy_variables, parameter_cache, scales, situation_examples
 
 
 COUNTRY_DIR = os.path.dirname(os.path.abspath(__file__))
@@ -19,7 +18,9 @@ class CountryTaxBenefitSystem(TaxBenefitSystem):
         super(CountryTaxBenefitSystem, self).__init__(entities.entities)
 
         # We add to our tax and benefit system all the variables
-        self.add_variables_from_directory(os.path.join(COUNTRY_DIR, 'variables'))
+        # They are only registered by name here: the module defining a variable is imported the first time this variable is requested
+        self.variables = lazy_variables.LazyVariables(self._load_variables_file)
+        self._register_variables_from_directory(os.path.join(COUNTRY_DIR, 'variables'))
 
         # We add to our tax and benefit system all the legislation parameters defined in the  parameters files
         param_path = os.path.join(COUNTRY_DIR, 'parameters')
@@ -29,5 +30,27 @@ class CountryTaxBenefitSystem(TaxBenefitSystem):
         self.open_api_config = {
             "variable_example": "disposable_income",
             "parameter_example": "taxes.income_tax_rate",
-            "simulation_example": couple,
+            "simulation_example": situation_examples.couple,
             }
+
+    def _register_variables_from_directory(self, directory):
+        # Extensions keep using `add_variables_from_directory`, which imports their variables right away
+        for file_path, variable_names in lazy_variables.scan_variables_directory(directory):
+            if variable_names is None:
+                # Some classes of the file cannot be resolved without importing it
+                self.add_variables_from_file(file_path)
+            else:
+                self.variables.register(file_path, variable_names)
+
+    def _load_variables_file(self, file_path, variable_names):
+        return lazy_variables.load_variables_from_file(file_path, module_prefix = id(self))
+
+    def load_parameters(self, path_to_yaml_dir):
+        # The parameter tree is read from the compiled parameter cache when the YAML files have not changed since it was written
+        parameters = parameter_cache.load_parameters(path_to_yaml_dir)
+
+        if self.preprocess_parameters is not None:
+            parameters = self.preprocess_parameters(parameters)
+
+        # Marginal rate scales are computed with arrays compiled once per instant
+        self.parameters = scales.compile_scales(parameters)
@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# This file defines simulations whose cache of intermediate results is bounded.
+# OpenFisca-Core keeps the result of every calculation, e.g. `_arbeitsl_geld_2_brutto_eink`, `nettolohn_m` or `miete_pro_qm_hh`, until the simulation is dropped.
+# Here, an intermediate result is dropped as soon as all the formulas known to depend on it have read it, or once all the outputs of its period are computed.
+# The least recently used intermediate results are also dropped when a memory budget is exceeded.
+# Inputs and requested outputs are always kept. A dropped result is computed again if it is requested later.
+
+from collections import OrderedDict
+
+from openfisca_core import periods
+from openfisca_core.simulations import Simulation
+
+from openfisca_germany.dependency_graph import get_dependency_graph
+
+
+class BoundedCacheSimulation(Simulation):
+    """
+    A simulation that only keeps the results it still needs.
+
+    :param outputs: Names of the variables to keep. The results of the other variables are dropped once all their dependents among the variables needed by ``outputs`` have read them, or once all the ``outputs`` of their period are computed. If ``None``, results are only dropped to respect ``memory_budget``.
+    :param memory_budget: Number of bytes of computed results to keep at most, dropping the least recently used ones first. If ``None``, there is no budget.
+
+    Inputs, and the variables requested directly with ``calculate``, rather than by a formula, are always kept.
+    Dependents are the formulas in force that read a variable in the static dependency graph, see :any:`build_dependency_graph`.
+
+    ``cache_stats`` counts the calculations read from the cache (``hits``) or computed (``misses``), the results ``evicted``, and the ``bytes`` and ``peak_bytes`` of the computed results kept.
+
+    Example:
+
+    >>> simulation = build_simulation(tax_benefit_system, survey, 2019, simulation_class = BoundedCacheSimulation)
+    >>> simulation.outputs = {'regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh'}
+    >>> simulation.calculate('arbeitsl_geld_2_eink_hh', 2019)  # Only keeps the inputs and arbeitsl_geld_2_eink_hh
+    """
+
+    def __init__(self, tax_benefit_system, populations, outputs = None, memory_budget = None):
+        super().__init__(tax_benefit_system, populations)
+        self.outputs = outputs
+        self.memory_budget = memory_budget
+        self.cache_stats = dict(hits = 0, misses = 0, evicted = 0, bytes = 0, peak_bytes = 0)
+        self._entries = OrderedDict()  # Computed (variable name, period) that can be dropped -> number of bytes, least recently used first
+        self._kept = set()  # (variable name, period) requested directly
+        self._pending_dependents = {}  # Computed (variable name, period) -> names of the dependents that have not read it yet
+        self._reads = []  # For each calculation in progress, the (variable name, period) its formula read
+        self._computed = set()  # (variable name, period) whose formula is running
+        self._output_results = set()  # Computed (variable name, period) of the outputs
+
+    @property
+    def outputs(self):
+        return self._outputs
+
+    @outputs.setter
+    def outputs(self, outputs):
+        self._outputs = set(outputs) if outputs is not None else None
+        self._required = get_dependency_graph(self.tax_benefit_system).required_variables(self._outputs) if outputs is not None else None
+
+    def calculate(self, variable_name, period):
+        if period is not None and not isinstance(period, periods.Period):
+            period = periods.period(period)
+        if self._reads:
+            self._reads[-1].add((variable_name, period))
+            return super().calculate(variable_name, period)
+
+        self._kept.add((variable_name, period))
+        self._drop((variable_name, period))
+        result = super().calculate(variable_name, period)
+        if self._outputs is not None and all((name, period) in self._kept or (name, period) in self._output_results for name in self._outputs):
+            # Once all the outputs of a period are computed, no intermediate of this period is needed anymore
+            for key in [key for key in self._entries if key[1] == period]:
+                self._evict(key)
+        return result
+
+    def _calculate(self, variable_name, period):
+        key = (variable_name, period)
+        if key in self._entries:
+            self._entries.move_to_end(key)
+        self._reads.append(set())
+        try:
+            array = super()._calculate(variable_name, period)
+        finally:
+            reads = self._reads.pop()
+        if key not in self._computed:
+            self.cache_stats['hits'] += 1
+            return array
+
+        self._computed.discard(key)
+        self.cache_stats['misses'] += 1
+        self._add(key, array)
+        for read in reads:
+            self._release(read, variable_name)
+        self._respect_budget()
+        return array
+
+    def _run_formula(self, variable, population, period):
+        self._computed.add((variable.name, period))
+        return super()._run_formula(variable, population, period)
+
+    def _add(self, key, array):
+        nbytes = getattr(array, 'nbytes', 0)
+        if self._outputs is not None and key[0] in self._outputs:
+            self._output_results.add(key)
+        elif key not in self._kept:
+            self._entries[key] = nbytes
+            if self._required is not None:
+                self._pending_dependents[key] = self._get_dependents(*key)
+        self.cache_stats['bytes'] += nbytes
+        self.cache_stats['peak_bytes'] = max(self.cache_stats['peak_bytes'], self.cache_stats['bytes'])
+
+    def _get_dependents(self, variable_name, period):
+        # Only the formulas in force for the period are counted, e.g. not `formula_2005` of a variable computed in 2019
+        return {
+            name for name, formula_name in get_dependency_graph(self.tax_benefit_system).formula_dependents(variable_name)
+            if name in self._required and getattr(self.tax_benefit_system.get_variable(name).get_formula(period), '__name__', None) == formula_name
+            }
+
+    def _release(self, key, reader_name):
+        pending = self._pending_dependents.get(key)
+        if pending is None:
+            return
+        pending.discard(reader_name)
+        if not pending:
+            self._evict(key)
+
+    def _respect_budget(self):
+        if self.memory_budget is None:
+            return
+        while self._entries and self.cache_stats['bytes'] > self.memory_budget:
+            self._evict(next(iter(self._entries)))
+
+    def _drop(self, key):
+        # A result requested directly is kept: it is no longer an intermediate that can be dropped
+        if key in self._entries:
+            self._pending_dependents.pop(key, None)
+            self._entries.pop(key)
+
+    def _evict(self, key):
+        self._pending_dependents.pop(key, None)
+        nbytes = self._entries.pop(key, None)
+        if nbytes is None:
+            return
+        self.get_holder(key[0]).delete_arrays(key[1])
+        self.cache_stats['bytes'] -= nbytes
+        self.cache_stats['evicted'] += 1
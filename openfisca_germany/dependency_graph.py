@@ -0,0 +1,344 @@
+# -*- coding: utf-8 -*-
+
+# This file extracts the dependency graph of the variables of a tax and benefit system, without computing anything.
+# The source of each formula, including its dated variants such as `formula_2011`, is parsed, and every variable it reads is listed:
+# `person('alter', period)`, `household.members('kind', period)` or `person.tax_unit('eink_st_tu', period)`.
+# Each edge records the entity projection and the period through which the variable is read.
+# The graph can be pruned to the variables needed by some outputs, ordered topologically, and exported to DOT or JSON.
+
+import argparse
+import ast
+from collections import deque, namedtuple
+import inspect
+import io
+import json
+import textwrap
+import tokenize
+import weakref
+
+
+_graphs = weakref.WeakKeyDictionary()
+
+# Methods of populations and projectors that do not read a variable, even when given a string
+POPULATION_METHODS = {
+    'all', 'any', 'check_array_compatible_with_entity', 'check_period_validity', 'check_role_validity',
+    'empty_array', 'filled_array', 'get_holder', 'get_memory_usage', 'get_rank', 'has_role',
+    'max', 'min', 'nb_persons', 'project', 'reduce', 'sum', 'transpose',
+    'value_from_first_person', 'value_from_partner', 'value_from_person', 'value_nth_person',
+    }
+
+
+Dependency = namedtuple('Dependency', ['variable', 'dependency', 'formula', 'projection', 'period'])
+Dependency.__doc__ = """
+An edge of the dependency graph: the formula ``formula`` of ``variable`` reads ``dependency``.
+
+``projection`` is the path from the entity of ``variable`` to the population calling ``dependency``, e.g. ``'members'`` or ``'tax_unit'``, and is empty when ``dependency`` is read on the same entity.
+``period`` is the source of the period argument, e.g. ``'period'`` or ``'period.this_year'``.
+"""
+
+
+def get_string(node):
+    """
+    Returns the value of a string literal, or ``None`` if ``node`` is not one.
+    """
+    # Python 3.7 parses string literals as `ast.Str`, later versions as `ast.Constant`
+    if type(node).__name__ == 'Str':
+        return node.s
+    if isinstance(node, ast.Constant) and isinstance(node.value, str):
+        return node.value
+    return None
+
+
+def get_argument_source(lines, node):
+    """
+    Returns the source of the call argument ``node``, read in ``lines``, the lines of the parsed source, with its whitespace collapsed.
+
+    Python 3.7 does not record where nodes end: the argument ends at the first comma or closing bracket outside of its own brackets.
+    """
+    # Column offsets count UTF-8 bytes
+    first_line = lines[node.lineno - 1].encode('utf-8')[node.col_offset:].decode('utf-8')
+    text = ''.join([first_line] + lines[node.lineno:])
+    depth = 0
+    for token in tokenize.generate_tokens(io.StringIO(text).readline):
+        if token.type != tokenize.OP:
+            continue
+        if token.string in ('(', '[', '{'):
+            depth += 1
+        elif token.string in (')', ']', '}') and depth > 0:
+            depth -= 1
+        elif token.string in (',', ')', ']', '}') and depth == 0:
+            end_row, end_column = token.start
+            break
+    else:
+        end_row, end_column = len(text.splitlines()), None
+    argument_lines = text.splitlines()[:end_row]
+    argument_lines[-1] = argument_lines[-1][:end_column]
+    return ' '.join(' '.join(argument_lines).split())
+
+
+def get_projection(node, entity_name):
+    """
+    Returns the projection path of a called expression rooted at the entity argument of a formula, e.g. ``['members']`` for ``household.members``, or ``None`` if it is not rooted at this entity.
+    """
+    path = []
+    while isinstance(node, ast.Attribute):
+        path.append(node.attr)
+        node = node.value
+    if isinstance(node, ast.Name) and node.id == entity_name:
+        return path[::-1]
+    return None
+
+
+def get_string_bindings(tree):
+    """
+    Returns the names bound to a string, or to a list or tuple of strings, in a function, including comprehension variables iterating over them.
+    """
+    bindings = {}
+
+    def strings(node):
+        if get_string(node) is not None:
+            return [get_string(node)]
+        if isinstance(node, (ast.List, ast.Tuple)) and all(get_string(element) is not None for element in node.elts):
+            return [get_string(element) for element in node.elts]
+        if isinstance(node, ast.Name):
+            return bindings.get(node.id)
+        return None
+
+    # Assignments are visited before the comprehensions and loops using them
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Assign) and len(node.targets) == 1 and isinstance(node.targets[0], ast.Name):
+            values = strings(node.value)
+            if values is not None:
+                bindings[node.targets[0].id] = values
+    for node in ast.walk(tree):
+        if isinstance(node, (ast.comprehension, ast.For)) and isinstance(node.target, ast.Name):
+            values = strings(node.iter)
+            if values is not None:
+                bindings[node.target.id] = values
+    return bindings
+
+
+def extract_formula_dependencies(formula, seen = None):
+    """
+    Returns the variables read by a formula, as a list of ``(dependency, projection, period)`` tuples.
+
+    A variable is read by calling the entity argument of the formula, or one of its projections, with the name of the variable.
+    Names given as string literals, or as variables bound to string literals, e.g. ``for s in sources``, are resolved; other names are ignored.
+    Functions of the same module called with the entity, e.g. ``anz_kinder_nach_alter_hh(household, period)``, are followed.
+    """
+    seen = set() if seen is None else seen
+    seen.add(formula)
+    source = textwrap.dedent(inspect.getsource(formula))
+    lines = source.splitlines(True)
+    tree = ast.parse(source)
+    function = tree.body[0]
+    entity_name = function.args.args[0].arg
+    bindings = get_string_bindings(function)
+
+    dependencies = []
+    for node in ast.walk(function):
+        if not isinstance(node, ast.Call) or not node.args:
+            continue
+        if isinstance(node.func, ast.Name) and isinstance(node.args[0], ast.Name) and node.args[0].id == entity_name:
+            helper = formula.__globals__.get(node.func.id)
+            if inspect.isfunction(helper) and helper.__module__ == formula.__module__ and helper not in seen:
+                dependencies.extend(extract_formula_dependencies(helper, seen))
+            continue
+        projection = get_projection(node.func, entity_name)
+        if projection is None or (projection and projection[-1] in POPULATION_METHODS):
+            continue
+        name = node.args[0]
+        if get_string(name) is not None:
+            names = [get_string(name)]
+        elif isinstance(name, ast.Name) and name.id in bindings:
+            names = bindings[name.id]
+        else:
+            continue
+        period = get_argument_source(lines, node.args[1]) if len(node.args) > 1 else ''
+        for keyword in node.keywords:
+            if keyword.arg == 'period':
+                period = get_argument_source(lines, keyword.value)
+        dependencies.extend((dependency, '.'.join(projection), period) for dependency in names)
+    return dependencies
+
+
+class DependencyGraph(object):
+    """
+    The static dependency graph of the variables of a tax and benefit system.
+
+    - ``variables`` maps each variable name to its entity key, its definition period, and whether it has a formula;
+    - ``edges`` is the list of :any:`Dependency` read by the formulas.
+
+    Variables read by a formula but not defined in the system are kept as nodes without entity.
+    """
+
+    def __init__(self, variables, edges):
+        self.variables = variables
+        self.edges = edges
+        self._dependencies = {}
+        self._dependents = {}
+        self._formula_dependents = {}
+        for edge in edges:
+            self._dependencies.setdefault(edge.variable, set()).add(edge.dependency)
+            self._dependents.setdefault(edge.dependency, set()).add(edge.variable)
+            self._formula_dependents.setdefault(edge.dependency, set()).add((edge.variable, edge.formula))
+
+    def dependencies(self, variable_name):
+        """
+        Returns the names of the variables directly read by the formulas of ``variable_name``.
+        """
+        return set(self._dependencies.get(variable_name, ()))
+
+    def dependents(self, variable_name):
+        """
+        Returns the names of the variables whose formulas directly read ``variable_name``.
+        """
+        return set(self._dependents.get(variable_name, ()))
+
+    def formula_dependents(self, variable_name):
+        """
+        Returns the formulas directly reading ``variable_name``, as ``(variable name, formula name)`` tuples, e.g. ``('kindersatz_m_hh', 'formula_2011')``.
+        """
+        return set(self._formula_dependents.get(variable_name, ()))
+
+    def required_variables(self, outputs):
+        """
+        Returns the names of the variables needed to compute ``outputs``, including ``outputs``.
+        """
+        required = set(outputs)
+        queue = deque(required)
+        while queue:
+            for dependency in self._dependencies.get(queue.popleft(), ()):
+                if dependency not in required:
+                    required.add(dependency)
+                    queue.append(dependency)
+        return required
+
+    def input_variables(self, outputs):
+        """
+        Returns the names of the variables without formula needed to compute ``outputs``: the inputs to load.
+        """
+        return {
+            name for name in self.required_variables(outputs)
+            if not self.variables.get(name, {}).get('has_formula')
+            }
+
+    def prune(self, outputs):
+        """
+        Returns the subgraph of the variables needed to compute ``outputs``.
+        """
+        required = self.required_variables(outputs)
+        return DependencyGraph(
+            {name: description for name, description in self.variables.items() if name in required},
+            [edge for edge in self.edges if edge.variable in required],
+            )
+
+    def topological_order(self, outputs = None):
+        """
+        Returns the names of the variables, every variable coming after the variables it reads.
+
+        A variable reading itself, e.g. for a previous period, is not a cycle.
+
+        :param outputs: If given, only orders the variables needed to compute ``outputs``.
+        :raises ValueError: If variables depend on each other.
+        """
+        names = self.required_variables(outputs) if outputs is not None else set(self.variables) | set(self._dependents)
+        remaining = {
+            name: {dependency for dependency in self._dependencies.get(name, ()) if dependency != name}
+            for name in names
+            }
+        order = []
+        ready = sorted(name for name, dependencies in remaining.items() if not dependencies)
+        while ready:
+            name = ready.pop()
+            order.append(name)
+            del remaining[name]
+            for dependent in sorted(self._dependents.get(name, ()), reverse = True):
+                if dependent in remaining:
+                    remaining[dependent].discard(name)
+                    if not remaining[dependent] and dependent not in ready:
+                        ready.append(dependent)
+        if remaining:
+            raise ValueError("The following variables depend on each other: {}.".format(', '.join(sorted(remaining))))
+        return order
+
+    def to_dict(self):
+        return {
+            'variables': self.variables,
+            'edges': [edge._asdict() for edge in self.edges],
+            }
+
+    def to_json(self, **kwargs):
+        return json.dumps(self.to_dict(), **kwargs)
+
+    def to_dot(self):
+        """
+        Returns the graph in the DOT language of Graphviz. Edges point from a variable to the variables it reads.
+        """
+        lines = ['digraph dependencies {', '    rankdir=LR;']
+        for name, description in sorted(self.variables.items()):
+            label = '{}\\n{} {}'.format(name, description['entity'], description['definition_period'])
+            shape = 'box' if description['has_formula'] else 'ellipse'
+            lines.append('    "{}" [label="{}", shape={}];'.format(name, label, shape))
+        for edge in self.edges:
+            label = ' '.join(part for part in [edge.projection, edge.period] if part)
+            lines.append('    "{}" -> "{}" [label="{}"];'.format(edge.variable, edge.dependency, label))
+        lines.append('}')
+        return '\n'.join(lines) + '\n'
+
+
+def build_dependency_graph(tax_benefit_system):
+    """
+    Extracts the static dependency graph of all the variables of ``tax_benefit_system``.
+
+    Example:
+
+    >>> graph = build_dependency_graph(tax_benefit_system)
+    >>> graph.input_variables(['arbeitsl_geld_2_eink_hh'])  # Inputs to load to compute arbeitsl_geld_2_eink_hh
+    >>> graph.prune(['regelbedarf_m_hh']).to_dot()
+    """
+    variables = {}
+    edges = []
+    # Variables may be loaded in any order, see `lazy_variables`: sorting them makes the exports stable
+    for name, variable in sorted(tax_benefit_system.variables.items()):
+        variables[name] = {
+            'entity': variable.entity.key,
+            'definition_period': variable.definition_period,
+            'has_formula': bool(variable.formulas),
+            }
+        for formula in variable.formulas.values():
+            for dependency, projection, period in extract_formula_dependencies(formula):
+                edges.append(Dependency(name, dependency, formula.__name__, projection, period))
+    for edge in edges:
+        variables.setdefault(edge.dependency, {'entity': None, 'definition_period': None, 'has_formula': False})
+    return DependencyGraph(variables, edges)
+
+
+def get_dependency_graph(tax_benefit_system):
+    """
+    Returns the dependency graph of ``tax_benefit_system``, extracted once per system.
+
+    The graph is shared: it must not be modified.
+    """
+    graph = _graphs.get(tax_benefit_system)
+    if graph is None:
+        graph = _graphs[tax_benefit_system] = build_dependency_graph(tax_benefit_system)
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Export the static dependency graph of the variables of OpenFisca-Germany.")
+    parser.add_argument('outputs', nargs = '*', help = "only export the variables needed to compute these variables")
+    parser.add_argument('--format', choices = ['dot', 'json'], default = 'dot', help = "output format")
+    args = parser.parse_args()
+
+    from openfisca_germany.systems import get_tax_benefit_system
+
+    graph = build_dependency_graph(get_tax_benefit_system())
+    if args.outputs:
+        graph = graph.prune(args.outputs)
+    print(graph.to_dot() if args.format == 'dot' else graph.to_json(indent = 2), end = '')  # noqa: T001, T201
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,7 @@
 # -*- coding: utf-8 -*-
 
 # This file defines the entities needed by our legislation.
-from openfisca_core.entities import build_entity
+from openfisca_germany.populations import build_entity
 
 Household = build_entity(
     key = "household",
@@ -0,0 +1,277 @@
+# -*- coding: utf-8 -*-
+
+# This file compares a reform with its baseline without computing the reformed simulation from scratch.
+# The baseline simulation records, for each computed (variable, period), the variables and the parameters its formula read.
+# A reform only changes the variables it updates or neutralizes, and the variables reading the parameters it modifies.
+# The reformed simulation reuses the baseline arrays of every other variable: only the downstream closure of the changes is computed again.
+# The calculations are recorded by a tracer wrapping the one of the simulation, and the parameters through `trace_parameters_at_instant`, so that simulations can still be traced.
+
+from collections import deque
+
+import numpy as np
+
+from openfisca_core import periods
+from openfisca_core.parameters import ParameterNodeAtInstant
+from openfisca_core.simulations import Simulation
+from openfisca_core.taxscales import TaxScaleLike
+from openfisca_core.tracers import TracingParameterNodeAtInstant
+
+from openfisca_germany.populations import instantiate_entities
+from openfisca_germany.storage import is_stored
+
+
+# Parameter nodes, traced or not, whose children are recorded
+NODE_TYPES = (ParameterNodeAtInstant, TracingParameterNodeAtInstant)
+
+
+class RecordingParameterNode(object):
+    """
+    Parameters at an instant, which record the name of every parameter read through them.
+    """
+
+    def __init__(self, node, instant, name, uses):
+        self._node = node
+        self._instant = instant
+        self._name = name
+        self._uses = uses
+
+    def _child(self, key, child):
+        name = '{}.{}'.format(self._name, key) if self._name else str(key)
+        if isinstance(child, NODE_TYPES):
+            return RecordingParameterNode(child, self._instant, name, self._uses)
+        self._uses.add((name, self._instant))
+        return child
+
+    def __getattr__(self, key):
+        if key.startswith('_'):
+            raise AttributeError(key)
+        return self._child(key, getattr(self._node, key))
+
+    def __getitem__(self, key):
+        if isinstance(key, np.ndarray):
+            # Vectorial parameters may read any child of this node
+            self._uses.add((self._name, self._instant))
+            return self._node[key]
+        return self._child(key, self._node[key])
+
+    def __iter__(self):
+        return iter(getattr(self._node, 'parameter_node_at_instant', self._node))
+
+
+def get_parameter(parameters, name):
+    for key in name.split('.') if name else []:
+        parameters = parameters[key]
+    return parameters
+
+
+def fingerprint(value):
+    """
+    Returns a comparable representation of a parameter value at an instant: a number, a scale or a node.
+    """
+    if isinstance(value, ParameterNodeAtInstant):
+        return tuple((key, fingerprint(value[key])) for key in value)
+    if isinstance(value, TaxScaleLike):
+        return (type(value).__name__, tuple(value.thresholds), tuple(getattr(value, 'rates', getattr(value, 'amounts', []))))
+    if isinstance(value, np.ndarray):
+        return tuple(value.tolist())
+    return value
+
+
+class RecordingTracer(object):
+    """
+    A tracer recording the dependencies of the calculations of ``simulation`` in it, and passing every event on to ``tracer``, the tracer of the simulation.
+    """
+
+    def __init__(self, simulation, tracer):
+        self.simulation = simulation
+        self.tracer = tracer
+        self.requests = {}
+
+    def __getattr__(self, name):
+        # E.g. `trees` or `print_computation_log` of a full tracer
+        return getattr(self.tracer, name)
+
+    @property
+    def stack(self):
+        return self.tracer.stack
+
+    def get_nb_requests(self, variable):
+        # Read by `Holder.get_memory_usage`, as a recording simulation is always traced
+        return self.requests.get(variable, 0)
+
+    def record_calculation_start(self, variable, period):
+        simulation = self.simulation
+        self.requests[variable] = self.requests.get(variable, 0) + 1
+        if self.stack:
+            caller = self.stack[-1]
+            simulation.dependencies.setdefault((caller['name'], caller['period']), set()).add((variable, period))
+        self.tracer.record_calculation_start(variable, period)
+        # Calculations of values not stored yet run a formula, or give the default value of the variable
+        self.stack[-1]['stored'] = is_stored(simulation.get_holder(variable), period)
+
+    def record_calculation_result(self, value):
+        self.tracer.record_calculation_result(value)
+
+    def record_parameter_access(self, parameter, period, value):
+        self.tracer.record_parameter_access(parameter, period, value)
+
+    def record_calculation_end(self):
+        frame = self.stack[-1]
+        if not frame['stored']:
+            self.simulation.computed.add((frame['name'], frame['period']))
+        self.tracer.record_calculation_end()
+
+
+class RecordingSimulation(Simulation):
+    """
+    A simulation that records the dependencies of each computed (variable, period), so that :any:`build_reform_simulation` can reuse its results.
+
+    - ``dependencies`` maps each computed ``(variable name, period)`` to the ``(variable name, period)`` its formula read;
+    - ``parameter_uses`` maps each computed ``(variable name, period)`` to the ``(parameter name, instant)`` its formula read;
+    - ``computed`` is the set of ``(variable name, period)`` computed by a formula, as opposed to inputs.
+
+    The simulation can be traced as any other: setting ``trace`` replaces the tracer wrapped by its :any:`RecordingTracer`.
+    """
+
+    def __init__(self, tax_benefit_system, populations):
+        self.dependencies = {}
+        self.parameter_uses = {}
+        self.computed = set()
+        super().__init__(tax_benefit_system, populations)
+        self.tracer = RecordingTracer(self, self.tracer)
+
+    @property
+    def trace(self):
+        # OpenFisca-Core only reads the parameters of formulas through `trace_parameters_at_instant` when the simulation is traced
+        return True
+
+    @trace.setter
+    def trace(self, trace):
+        Simulation.trace.fset(self, trace)
+        self.tracer = RecordingTracer(self, self.tracer)
+
+    def trace_parameters_at_instant(self, formula_period):
+        instant = formula_period.start if isinstance(formula_period, periods.Period) else periods.instant(formula_period)
+        if self._trace:
+            parameters = super().trace_parameters_at_instant(formula_period)
+        else:
+            parameters = self.tax_benefit_system.get_parameters_at_instant(instant)
+        caller = self.tracer.stack[-1]
+        return RecordingParameterNode(parameters, instant, '', self.parameter_uses.setdefault((caller['name'], caller['period']), set()))
+
+
+def get_changed_variables(baseline, reform, variable_names):
+    """
+    Returns the variables among ``variable_names`` that ``reform`` has added, updated or neutralized.
+    """
+    return {
+        name for name in variable_names
+        if name not in baseline.variables or name not in reform.variables or baseline.variables[name] is not reform.variables[name]
+        }
+
+
+def get_changed_parameter_uses(baseline, reform, parameter_uses):
+    """
+    Returns the ``(parameter name, instant)`` among ``parameter_uses`` whose value is different in ``reform``.
+    """
+    if reform.parameters is baseline.parameters:
+        return set()
+    changed = set()
+    for name, instant in parameter_uses:
+        try:
+            reform_value = get_parameter(reform.get_parameters_at_instant(instant), name)
+        except (AttributeError, KeyError):
+            changed.add((name, instant))  # The reform removed the parameter
+            continue
+        if fingerprint(get_parameter(baseline.get_parameters_at_instant(instant), name)) != fingerprint(reform_value):
+            changed.add((name, instant))
+    return changed
+
+
+def get_stale_calculations(baseline_simulation, reform):
+    """
+    Returns the ``(variable name, period)`` computed by ``baseline_simulation`` whose values may be different in ``reform``.
+
+    These are the calculations of the variables changed by the reform, or reading parameters changed by the reform, and every calculation that depends on them, directly or not.
+    """
+    baseline = baseline_simulation.tax_benefit_system
+    computed = baseline_simulation.computed
+    changed_variables = get_changed_variables(baseline, reform, {name for name, _ in computed})
+    all_parameter_uses = set().union(*baseline_simulation.parameter_uses.values())
+    changed_parameter_uses = get_changed_parameter_uses(baseline, reform, all_parameter_uses)
+
+    stale = {
+        calculation for calculation in computed
+        if calculation[0] in changed_variables
+        or not changed_parameter_uses.isdisjoint(baseline_simulation.parameter_uses.get(calculation, ()))
+        }
+    # Inputs may also be read differently by the reform, e.g. when it neutralizes them
+    changed_inputs = get_changed_variables(baseline, reform, {name for dependencies in baseline_simulation.dependencies.values() for name, _ in dependencies})
+
+    dependents = {}
+    for calculation, dependencies in baseline_simulation.dependencies.items():
+        for dependency in dependencies:
+            dependents.setdefault(dependency, set()).add(calculation)
+            if dependency[0] in changed_inputs:
+                stale.add(calculation)
+
+    queue = deque(stale)
+    while queue:
+        for dependent in dependents.get(queue.popleft(), ()):
+            if dependent not in stale:
+                stale.add(dependent)
+                queue.append(dependent)
+    return stale
+
+
+def build_reform_simulation(baseline_simulation, reform):
+    """
+    Builds a simulation of ``reform`` with the same populations and inputs as ``baseline_simulation``, reusing every baseline result the reform cannot change.
+
+    :param baseline_simulation: A :any:`RecordingSimulation`, e.g. built with ``build_simulation(..., simulation_class = RecordingSimulation)``, whose results of interest have been computed.
+    :param reform: The reformed tax and benefit system, e.g. ``flat_social_security_contribution(tax_benefit_system)``.
+
+    :returns: A :any:`RecordingSimulation` of ``reform``, whose calculations only compute the variables changed by the reform and their dependents. It can itself be the baseline of another reform.
+
+    The baseline and reformed simulations share the arrays they have in common: they must not be modified in place.
+
+    Example:
+
+    >>> baseline_simulation = build_simulation(tax_benefit_system, survey, '2019-01', simulation_class = RecordingSimulation)
+    >>> baseline_simulation.calculate('disposable_income', '2019-01')
+    >>> reform_simulation = build_reform_simulation(baseline_simulation, flat_social_security_contribution(tax_benefit_system))
+    >>> reform_simulation.calculate('disposable_income', '2019-01')  # Only computes social_security_contribution and disposable_income
+    """
+    stale = get_stale_calculations(baseline_simulation, reform)
+
+    populations = instantiate_entities(reform)
+    for key, population in populations.items():
+        baseline_population = baseline_simulation.populations[key]
+        population.ids = baseline_population.ids
+        population.count = baseline_population.count
+        if not population.entity.is_person:
+            population.members_entity_id = baseline_population.members_entity_id
+            population.members_role = baseline_population.members_role
+            population.members_position = baseline_population.members_position
+            population._ordered_members_map = baseline_population.ordered_members_map
+    simulation = RecordingSimulation(reform, populations)
+
+    for key, baseline_population in baseline_simulation.populations.items():
+        for name in baseline_population.get_memory_usage()['by_variable']:
+            baseline_holder = baseline_population.get_holder(name)
+            variable = reform.get_variable(name)
+            if variable is None or variable.is_neutralized:
+                continue
+            for period in baseline_holder.get_known_periods():
+                calculation = (name, period)
+                if calculation in stale:
+                    continue
+                array = baseline_holder.get_array(period)
+                if calculation in baseline_simulation.computed:
+                    simulation.get_holder(name).put_in_cache(array, period)
+                    simulation.computed.add(calculation)
+                    simulation.dependencies[calculation] = baseline_simulation.dependencies.get(calculation, set())
+                    simulation.parameter_uses[calculation] = baseline_simulation.parameter_uses.get(calculation, set())
+                else:
+                    simulation.set_input(name, period, array)
+    return simulation
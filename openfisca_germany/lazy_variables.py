@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+
+# This file defines a lazy registry for the variables of a tax and benefit system.
+# Importing every module of the `variables` directory is the main cost of building a tax and benefit system.
+# Variables are therefore only registered by name when the system is built: the module defining a variable is imported the first time this variable is requested.
+
+import ast
+from collections.abc import MutableMapping
+import glob
+import importlib
+import importlib.util
+from inspect import isclass
+import logging
+import os
+
+from openfisca_core.taxbenefitsystems import VariableNameConflict
+from openfisca_core.variables import Variable
+
+
+log = logging.getLogger(__name__)
+
+
+class UnresolvedBase(Exception):
+    pass
+
+
+def resolve_base(node, local_classes, imported_names, star_modules):
+    """
+    Returns whether the base class ``node``, an AST expression, is a variable, without importing the file it is written in.
+
+    Names are resolved from the classes defined earlier in the file, then from the modules imported by the file, which are imported if need be.
+
+    :raises: :any:`UnresolvedBase` if the base class cannot be resolved statically, e.g. because it is the result of a call.
+    """
+    attributes = []
+    while isinstance(node, ast.Attribute):
+        attributes.insert(0, node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        raise UnresolvedBase(node)
+
+    name = node.id
+    if name in local_classes:
+        if attributes:
+            raise UnresolvedBase(node)
+        return local_classes[name]
+    try:
+        if name in imported_names:
+            module_name, attribute = imported_names[name]
+            if module_name is None:
+                raise UnresolvedBase(node)
+            value = importlib.import_module(module_name)
+            if attribute is not None:
+                value = getattr(value, attribute)
+        else:
+            value = next(
+                getattr(module, name) for module in map(importlib.import_module, reversed(star_modules))
+                if hasattr(module, name)
+                )
+        for attribute in attributes:
+            value = getattr(value, attribute)
+    except (ImportError, AttributeError, StopIteration):
+        raise UnresolvedBase(node) from None
+    if not isclass(value):
+        raise UnresolvedBase(node)
+    return issubclass(value, Variable)
+
+
+def scan_variable_names(file_path):
+    """
+    Returns the names of the variables defined in a Python file, without importing it.
+
+    The file is parsed, and the base classes of its module-level classes are resolved from the classes defined earlier in the file and from the modules it imports, e.g. ``openfisca_core.model_api``.
+    A class is a variable if one of its bases is a variable.
+
+    :returns: The names of the variables, or ``None`` if some classes of the file cannot be resolved without importing it, e.g. classes defined conditionally or inheriting from an assigned name.
+    """
+    with open(file_path, 'rb') as file:
+        tree = ast.parse(file.read(), filename = file_path)
+
+    local_classes = {}  # Name of each class of the file -> whether it is a variable
+    imported_names = {}  # Name bound by an import -> (module name, attribute name or None)
+    star_modules = []
+    for statement in tree.body:
+        if isinstance(statement, ast.Import):
+            for alias in statement.names:
+                if alias.asname is None:
+                    # `import a.b` binds `a`
+                    imported_names[alias.name.split('.')[0]] = (alias.name.split('.')[0], None)
+                else:
+                    imported_names[alias.asname] = (alias.name, None)
+        elif isinstance(statement, ast.ImportFrom):
+            if statement.level:
+                # Relative imports depend on the package the file is imported from
+                return None
+            for alias in statement.names:
+                if alias.name == '*':
+                    star_modules.append(statement.module)
+                else:
+                    imported_names[alias.asname or alias.name] = (statement.module, alias.name)
+        elif isinstance(statement, ast.ClassDef):
+            try:
+                is_variable = any([resolve_base(base, local_classes, imported_names, star_modules) for base in statement.bases])
+            except UnresolvedBase:
+                return None
+            local_classes[statement.name] = is_variable
+        elif any(isinstance(node, ast.ClassDef) for node in ast.walk(statement)):
+            # Classes defined in a condition, a loop or a function call
+            return None
+        else:
+            # Names assigned by the file, e.g. `Base = Variable`, can only be resolved by running it
+            for node in ast.walk(statement):
+                if isinstance(node, ast.Name) and isinstance(node.ctx, ast.Store):
+                    if node.id in local_classes:
+                        return None
+                    imported_names[node.id] = (None, None)
+    return [name for name, is_variable in local_classes.items() if is_variable]
+
+
+def scan_variables_directory(directory):
+    """
+    Recursively explores a directory, like :any:`TaxBenefitSystem.add_variables_from_directory`.
+
+    :returns: A list of ``(file_path, variable_names)`` tuples, one per Python file, where ``variable_names`` is ``None`` if the file must be imported to know its variables, see :any:`scan_variable_names`.
+    """
+    scanned = [
+        (py_file, scan_variable_names(py_file))
+        for py_file in sorted(glob.glob(os.path.join(directory, "*.py")))
+        ]
+    for subdirectory in sorted(glob.glob(os.path.join(directory, "*/"))):
+        scanned.extend(scan_variables_directory(subdirectory))
+    return scanned
+
+
+def load_variables_from_file(file_path, module_prefix):
+    """
+    Imports a Python file and instantiates all the variables it defines.
+
+    The module is given a name unique to ``module_prefix``, like :any:`TaxBenefitSystem.add_variables_from_file` does, so that each tax and benefit system gets its own variable classes.
+    Unlike the latter, the compiled bytecode of the file is cached by Python.
+
+    :returns: A dict of :any:`Variable` instances, indexed by variable names.
+    """
+    file_name = os.path.splitext(os.path.basename(file_path))[0]
+    module_name = '{}_{}_{}'.format(module_prefix, hash(os.path.abspath(file_path)), file_name)
+    try:
+        spec = importlib.util.spec_from_file_location(module_name, file_path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+    except Exception:
+        log.error('Unable to load OpenFisca variables from file "{}"'.format(file_path))
+        raise
+
+    return {
+        value.__name__: value(baseline_variable = None)
+        for value in vars(module).values()
+        # We only want to get the module classes defined in this module (not imported)
+        if isclass(value) and issubclass(value, Variable) and value.__module__ == module_name
+        }
+
+
+class LazyVariables(MutableMapping):
+    """
+    The variables of a tax and benefit system, indexed by name, some of which may not have been imported yet.
+
+    Looking up a pending variable imports the file defining it, along with all the other variables of this file.
+    Iterating over the variables imports all the pending files.
+
+    :param load_file: Function that takes the path of a Python file and the names of the pending variables it defines, and returns the variables it defines, indexed by name.
+    """
+
+    def __init__(self, load_file, variables = None, pending = None):
+        self._load_file = load_file
+        self._variables = variables if variables is not None else {}
+        self._pending = pending if pending is not None else {}  # Name of each pending variable -> path of the file defining it
+
+    def register(self, file_path, variable_names):
+        """
+        Declares that the variables ``variable_names`` are defined in ``file_path``, without importing it.
+
+        :raises: :any:`VariableNameConflict` if a variable with the same name has already been registered.
+        """
+        for name in variable_names:
+            if name in self:
+                raise VariableNameConflict(
+                    'Variable "{}" is already defined. Use `update_variable` to replace it.'.format(name))
+            self._pending[name] = file_path
+
+    def is_loaded(self, name):
+        return name in self._variables
+
+    def load(self, file_path):
+        names = [name for name, path in self._pending.items() if path == file_path]
+        for name in names:
+            del self._pending[name]
+        for name, variable in self._load_file(file_path, names).items():
+            self._variables.setdefault(name, variable)
+
+    def load_all(self):
+        for file_path in sorted(set(self._pending.values())):
+            self.load(file_path)
+
+    def copy(self):
+        # A copy, e.g. for a reform, resolves its pending variables through the original, so that each file is imported only once.
+        def load_file_from_original(file_path, names):
+            return {name: self[name] for name in names if name in self}
+
+        return LazyVariables(load_file_from_original, dict(self._variables), dict(self._pending))
+
+    def __getitem__(self, name):
+        try:
+            return self._variables[name]
+        except KeyError:
+            file_path = self._pending.get(name)
+            if file_path is None:
+                raise
+        self.load(file_path)
+        return self._variables[name]
+
+    def __setitem__(self, name, variable):
+        self._pending.pop(name, None)
+        self._variables[name] = variable
+
+    def __delitem__(self, name):
+        if self._pending.pop(name, None) is None:
+            del self._variables[name]
+        else:
+            self._variables.pop(name, None)
+
+    def __contains__(self, name):
+        return name in self._variables or name in self._pending
+
+    def __iter__(self):
+        self.load_all()
+        return iter(list(self._variables))
+
+    def __len__(self):
+        return len(self._variables) + len(self._pending)
+
+    def __repr__(self):
+        return '<LazyVariables: {} loaded, {} pending>'.format(len(self._variables), len(self._pending))
@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+# This file defines simulations in which each row has its own legislation date, e.g. panel data mixing several years.
+# The legislation date of each row is read from a variable, `jahr` by default, instead of being the period of the calculation.
+# Parameters are evaluated as arrays indexed by the date of each row, and dated formulas, such as `formula_2011`, are dispatched row by row.
+# Each formula still runs once on the whole population: a mixed-year panel is computed in one pass.
+
+from functools import partial
+
+import numpy as np
+
+from openfisca_core import periods
+from openfisca_core.parameters import ParameterNodeAtInstant, VectorialParameterNodeAtInstant
+from openfisca_core.simulations import Simulation
+from openfisca_core.taxscales import TaxScaleLike
+from openfisca_core.tracers import TracingParameterNodeAtInstant
+
+
+# Variable containing the legislation date of each row
+DATE_VARIABLE = 'jahr'
+
+# Parameter nodes whose children are looked up by name
+NODE_TYPES = (ParameterNodeAtInstant, VectorialParameterNodeAtInstant, TracingParameterNodeAtInstant)
+
+
+def to_instant(value):
+    """
+    Converts a legislation date, given as a year number or a ``numpy.datetime64``, into an :any:`Instant`.
+    """
+    if isinstance(value, np.datetime64):
+        return periods.instant(str(value.astype('datetime64[D]')))
+    return periods.instant(int(value))
+
+
+class ParameterNodeAtInstants(object):
+    """
+    The parameters at several instants, evaluated for each row of a population.
+
+    Numeric parameters are returned as arrays with one value per row, and scales as :any:`ScaleAtInstants`.
+    Nodes can be indexed by an array with one key per row, e.g. ``parameters.benefits.rent_ceiling[zone]``, as in OpenFisca-Core: each row then gets the value of its key at its own instant.
+
+    :param nodes: The parameters at each instant, as :any:`ParameterNodeAtInstant` objects, or the nodes they return when they are indexed by an array.
+    :param instant_index: For each row, the index of its instant in ``nodes``.
+    :param by_row: Whether each node already has one value per row, i.e. has been indexed by an array.
+    """
+
+    def __init__(self, nodes, instant_index, by_row = False):
+        self._nodes = nodes
+        self._instant_index = instant_index
+        self._by_row = by_row
+
+    def _wrap(self, children):
+        if isinstance(children[0], NODE_TYPES):
+            return ParameterNodeAtInstants(children, self._instant_index, self._by_row)
+        if isinstance(children[0], TaxScaleLike):
+            return ScaleAtInstants(children, self._instant_index)
+        if self._by_row:
+            return np.stack(children)[self._instant_index, np.arange(len(self._instant_index))]
+        return np.asarray(children)[self._instant_index]
+
+    def __getattr__(self, key):
+        if key.startswith('_'):
+            raise AttributeError(key)
+        return self._wrap([getattr(node, key) for node in self._nodes])
+
+    def __getitem__(self, key):
+        if isinstance(key, np.ndarray):
+            if len(key) != len(self._instant_index):
+                raise ValueError("Parameters can only be indexed by an array with one key per row: got {} keys for {} rows.".format(len(key), len(self._instant_index)))
+            # Each node returns one value per row, of which each row keeps the one of its instant
+            return ParameterNodeAtInstants(self._nodes, self._instant_index, by_row = True)._wrap([node[key] for node in self._nodes])
+        return self._wrap([node[key] for node in self._nodes])
+
+    def __repr__(self):
+        return '<ParameterNodeAtInstants: {} instants>'.format(len(self._nodes))
+
+
+class ScaleAtInstants(object):
+    """
+    A scale at several instants, evaluated for each row of a population.
+
+    Calling a method of the scale, e.g. ``calc(base)``, calls the method of the scale of each instant on the rows having this instant.
+    """
+
+    def __init__(self, scales, instant_index):
+        self._scales = scales
+        self._instant_index = instant_index
+
+    def __getattr__(self, name):
+        if name.startswith('_'):
+            raise AttributeError(name)
+        methods = [getattr(scale, name) for scale in self._scales]
+        if not callable(methods[0]):
+            raise AttributeError("The attribute '{}' of a scale depends on the legislation date of each row: only its methods can be used.".format(name))
+
+        def vectorial_method(base, *args, **kwargs):
+            result = None
+            for index, method in enumerate(methods):
+                rows = self._instant_index == index
+                if not rows.any():
+                    continue
+                values = method(base[rows], *args, **kwargs)
+                if result is None:
+                    result = np.zeros(len(base), dtype = np.asarray(values).dtype)
+                result[rows] = values
+            return result
+
+        return vectorial_method
+
+
+class DatedSimulation(Simulation):
+    """
+    A simulation in which each row uses the legislation in force at its own date, read from the variable :any:`DATE_VARIABLE`.
+
+    Variables are still computed and cached for the period of the calculation, e.g. the year in which the inputs are set.
+    For each row, formulas and parameters are the ones in force at the date of the row, shifted by the offset between the requested and the calculated periods, e.g. ``parameters(period.last_year)``.
+
+    If the date variable has no value for the period of the calculation, the simulation behaves as a regular one.
+    A group uses the date of its first member.
+    """
+    date_variable = DATE_VARIABLE
+
+    def __init__(self, tax_benefit_system, populations):
+        super().__init__(tax_benefit_system, populations)
+        self._row_instants = {}
+        self._formula_rows = {}
+
+    def get_row_instants(self, population, period):
+        """
+        Returns the legislation dates of the rows of ``population``, as a tuple ``(instants, instant_index)``, or ``None`` if the date variable has not been set for ``period``.
+        """
+        key = (population.entity.key, period)
+        if key not in self._row_instants:
+            dates_population = self.get_variable_population(self.date_variable)
+            dates = dates_population.get_holder(self.date_variable).get_array(period)
+            if dates is None:
+                self._row_instants[key] = None
+            else:
+                if not dates_population.entity.is_person:
+                    dates = dates[dates_population.members_entity_id]
+                if not population.entity.is_person:
+                    dates = population.value_from_first_person(dates)
+                values, instant_index = np.unique(dates, return_inverse = True)
+                self._row_instants[key] = ([to_instant(value) for value in values], instant_index)
+        return self._row_instants[key]
+
+    def get_formula_rows(self, population, period, formula_instants):
+        """
+        Returns the rows of ``population`` whose legislation dates are the ``formula_instants``, i.e. the rows computed by a same formula, and the index of the date of each row in ``formula_instants``.
+
+        The other rows are given the first of the ``formula_instants``: they are computed with the legislation of this date, at which all the parameters of the formula exist, and then ignored.
+        The result is computed once per population, period and formula.
+        """
+        key = (population.entity.key, period, formula_instants)
+        if key not in self._formula_rows:
+            _, instant_index = self.get_row_instants(population, period)
+            rows = np.isin(instant_index, formula_instants)
+            # The dates of a population are all used by some of its rows, so the formula instants are the ones used
+            formula_index = np.searchsorted(formula_instants, np.where(rows, instant_index, formula_instants[0]))
+            self._formula_rows[key] = (rows, formula_index)
+        return self._formula_rows[key]
+
+    def get_parameters_at_rows(self, period, instants, formula_index, instant):
+        """
+        Returns the parameters of each row at ``instant``, shifted from the calculated ``period`` to the legislation date of the row.
+
+        :param instants: The legislation dates of the rows.
+        :param formula_index: For each row, the index of its date in ``instants``.
+        """
+        instant = instant.start if isinstance(instant, periods.Period) else periods.instant(instant)
+        month_offset = (instant.year - period.start.year) * 12 + instant.month - period.start.month
+        nodes = [self.tax_benefit_system.get_parameters_at_instant(row_instant.offset(month_offset, periods.MONTH)) for row_instant in instants]
+        if self.trace:
+            # As in `Simulation.trace_parameters_at_instant`, the parameters read at each date are recorded
+            nodes = [TracingParameterNodeAtInstant(node, self.tracer) for node in nodes]
+        if len(nodes) == 1:
+            return nodes[0]
+        return ParameterNodeAtInstants(nodes, formula_index)
+
+    def _run_formula(self, variable, population, period):
+        row_instants = self.get_row_instants(population, period) if variable.formulas else None
+        if row_instants is None:
+            return super()._run_formula(variable, population, period)
+
+        instants, instant_index = row_instants
+        formulas = [variable.get_formula(instant) for instant in instants]
+        array = None
+        for formula in dict.fromkeys(formula for formula in formulas if formula is not None):
+            formula_instants = tuple(index for index, other in enumerate(formulas) if other is formula)
+            rows, formula_index = self.get_formula_rows(population, period, formula_instants)
+            parameters_at = partial(self.get_parameters_at_rows, period, [instants[index] for index in formula_instants], formula_index)
+            if formula.__code__.co_argcount == 2:
+                formula_array = formula(population, period)
+            else:
+                formula_array = formula(population, period, parameters_at)
+            if array is None and len(formula_instants) == len(instants):
+                return formula_array
+            if array is None:
+                array = population.get_holder(variable.name).default_array()
+            array[rows] = np.asarray(formula_array)[rows] if np.ndim(formula_array) else formula_array
+        return array
@@ -0,0 +1,13 @@
+# -*- coding: utf-8 -*-
+
+# This package gathers the tools used to run the tax and benefit system on large populations, such as survey data.
+
+from openfisca_germany.microsimulation.builder import build_simulation  # noqa: F401
+from openfisca_germany.microsimulation.export import export_variables, iter_record_batches, write_record_batches  # noqa: F401
+from openfisca_germany.microsimulation.chunks import export_in_chunks, iter_chunks, iter_simulations, run_in_chunks  # noqa: F401
+from openfisca_germany.microsimulation.parallel import run_in_parallel  # noqa: F401
+from openfisca_germany.microsimulation.multi_period import calculate_periods, run_periods  # noqa: F401
+from openfisca_germany.microsimulation.validation import compare_storage_profiles  # noqa: F401
+from openfisca_germany.microsimulation.mapped import open_columns, write_columns  # noqa: F401
+from openfisca_germany.microsimulation.synthetic import generate_population  # noqa: F401
+from openfisca_germany.microsimulation.parity import compare_with_reference, format_differences  # noqa: F401
@@ -0,0 +1,160 @@
+# -*- coding: utf-8 -*-
+
+# This file builds simulations from person-level tables, such as survey data.
+# Each row of the table describes a person, the groups it belongs to and its role in these groups, and the input variables of the person and of its groups.
+# All the populations are built with vectorial operations: there is no Python loop over the rows of the table.
+
+import numpy as np
+
+from openfisca_core.indexed_enums import Enum
+from openfisca_core.simulations import Simulation
+
+from openfisca_germany.populations import instantiate_entities, positions_within_groups
+
+
+# Default columns containing the identifiers of each entity
+ID_COLUMNS = {
+    'person': 'p_id',
+    'household': 'hh_id',
+    'tax_unit': 'tu_id',
+    }
+
+# Default columns containing the role of each person in its group entities, e.g. 'parent' or 'child'
+ROLE_COLUMNS = {
+    'household': 'household_role',
+    'tax_unit': 'tax_unit_role',
+    }
+
+
+def column_names(table):
+    """
+    Returns the column names of a ``pandas.DataFrame``, a ``pyarrow.Table`` or a dict of arrays.
+    """
+    if hasattr(table, 'column_names'):  # pyarrow.Table or pyarrow.RecordBatch
+        return list(table.column_names)
+    if hasattr(table, 'columns'):  # pandas.DataFrame
+        return list(table.columns)
+    return list(table.keys())
+
+
+def get_column(table, name):
+    """
+    Returns a column of a ``pandas.DataFrame``, a ``pyarrow.Table`` or a dict of arrays, as a numpy array.
+    """
+    if hasattr(table, 'column_names'):
+        return table.column(name).to_numpy()
+    column = table[name]
+    if hasattr(column, 'to_numpy'):
+        return column.to_numpy()
+    return np.asarray(column)
+
+
+def get_members_role(entity, members_entity_id, count, role_values):
+    """
+    Converts the role of each member, given as a role key or plural (e.g. 'parent', 'parents', 'first_parent' or 'child'), into :any:`Role` objects.
+
+    Members declared with a role that has subroles (e.g. 'parent') get the subroles in their order of appearance within their group (e.g. 'first_parent', then 'second_parent').
+    """
+    roles_by_name = {}
+    for role in entity.roles:
+        roles_by_name[role.key] = role
+        roles_by_name[role.plural] = role
+        for subrole in role.subroles or []:
+            roles_by_name[subrole.key] = subrole
+
+    # We only loop over the role names, not over the members
+    role_values = role_values.astype(str)
+    members_role = np.empty(len(role_values), dtype = object)
+    has_valid_role = np.zeros(len(role_values), dtype = bool)
+    for name, role in roles_by_name.items():
+        with_role = role_values == name
+        if not with_role.any():
+            continue
+        has_valid_role |= with_role
+        if role.subroles:
+            ranks = positions_within_groups(members_entity_id[with_role], count)[0]
+            if ranks.max() >= len(role.subroles):
+                raise ValueError("There can be at most {} {} in a {}.".format(len(role.subroles), role.plural, entity.key))
+            members_role[with_role] = np.array(role.subroles, dtype = object)[ranks]
+        else:
+            members_role[with_role] = role
+    if not has_valid_role.all():
+        raise ValueError("'{}' is not a valid role for the entity '{}'. Valid roles are: {}.".format(
+            role_values[~has_valid_role][0], entity.key, ', '.join(sorted(roles_by_name))))
+    return members_role
+
+
+def build_simulation(tax_benefit_system, table, period, input_columns = None, id_columns = None, role_columns = None, simulation_class = Simulation, profiler = None):
+    """
+    Builds a simulation from a person-level table.
+
+    Each group entity is made of the persons sharing the same identifier in its id column.
+    Its input variables are read from the row of its first member, so the table must repeat them for all members.
+    If the id column of a group entity is missing, each person is alone in its own group.
+
+    :param tax_benefit_system: The tax and benefit system to simulate.
+    :param table: A ``pandas.DataFrame``, a ``pyarrow.Table`` or a dict of arrays, with one row per person.
+    :param period: The period for which the input columns are set, or a list of periods. In the latter case, each input array is shared by all the periods, without copy.
+    :param input_columns: The columns to set as inputs. By default, every column named after a variable of ``tax_benefit_system``.
+    :param id_columns: The id column of each entity. Defaults to :any:`ID_COLUMNS`.
+    :param role_columns: The role column of each group entity. Defaults to :any:`ROLE_COLUMNS`. Members without a role column get the first role of the entity.
+    :param simulation_class: The class of the simulation, e.g. :any:`DatedSimulation` for tables mixing several legislation dates.
+    :param profiler: If given, a :any:`Profiler` recording the calculations of the simulation.
+
+    :returns: A :any:`Simulation`, whose persons are in the order of the rows of ``table``.
+
+    Example:
+
+    >>> simulation = build_simulation(tax_benefit_system, survey, 2019, role_columns = {'household': 'role', 'tax_unit': 'role_tu'})
+    >>> simulation.calculate('arbeitsl_geld_2_eink_hh', 2019)
+    """
+    id_columns = ID_COLUMNS if id_columns is None else id_columns
+    role_columns = ROLE_COLUMNS if role_columns is None else role_columns
+    names = column_names(table)
+    if input_columns is None:
+        reserved = set(id_columns.values()) | set(role_columns.values())
+        input_columns = [
+            name for name in names
+            if name not in reserved and tax_benefit_system.get_variable(name) is not None
+            ]
+
+    populations = instantiate_entities(tax_benefit_system)
+    person_entity = tax_benefit_system.person_entity
+    persons = populations[person_entity.key]
+    person_id_column = id_columns.get(person_entity.key)
+    if person_id_column in names:
+        persons.ids = get_column(table, person_id_column)
+        persons.count = len(persons.ids)
+    else:
+        persons.count = len(get_column(table, names[0])) if names else 0
+        persons.ids = np.arange(persons.count)
+
+    first_members = {person_entity.key: slice(None)}
+    for entity in tax_benefit_system.group_entities:
+        group = populations[entity.key]
+        if id_columns.get(entity.key) in names:
+            group.ids, first_members[entity.key], group.members_entity_id = np.unique(
+                get_column(table, id_columns[entity.key]), return_index = True, return_inverse = True)
+        else:
+            group.ids = persons.ids
+            first_members[entity.key] = slice(None)
+            group.members_entity_id = np.arange(persons.count)
+        group.count = len(group.ids)
+        if role_columns.get(entity.key) in names:
+            group._members_role = get_members_role(entity, group.members_entity_id, group.count, get_column(table, role_columns[entity.key]))
+
+    simulation = simulation_class(tax_benefit_system, populations)
+    input_periods = period if isinstance(period, (list, tuple)) else [period]
+    for name in input_columns:
+        variable = tax_benefit_system.get_variable(name, check_existence = True)
+        values = get_column(table, name)[first_members[variable.entity.key]]
+        # Convert the values once, so that the holder stores the same array for every period
+        if variable.value_type == Enum:
+            values = variable.possible_values.encode(values)
+        elif values.dtype != variable.dtype:
+            values = values.astype(variable.dtype)
+        for input_period in input_periods:
+            simulation.set_input(name, input_period, values)
+    if profiler is not None:
+        profiler.attach(simulation)
+    return simulation
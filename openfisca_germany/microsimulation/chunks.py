@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+# This file runs simulations over person-level tables that do not fit in memory, such as national survey files.
+# The table is read as a stream of batches, e.g. `pandas.read_csv(..., chunksize = ...)` or `pyarrow.parquet.ParquetFile(...).iter_batches()`.
+# The rows are regrouped into chunks that never split a household or a tax unit, and each chunk gets its own small simulation.
+# As formulas only combine the members of a same group, the results are the same as the ones of a single simulation of the whole table.
+
+import numpy as np
+
+from openfisca_germany.microsimulation.builder import ID_COLUMNS, build_simulation, column_names, get_column
+from openfisca_germany.microsimulation.export import iter_record_batches, write_record_batches
+
+
+# Number of persons of each chunk
+DEFAULT_CHUNK_SIZE = 500_000
+
+
+def get_group_columns(names, id_columns = None):
+    """
+    Returns the id columns of the group entities found in ``names``.
+    """
+    id_columns = ID_COLUMNS if id_columns is None else id_columns
+    return [name for entity_key, name in id_columns.items() if entity_key != 'person' and name in names]
+
+
+def get_row_count(columns):
+    return len(next(iter(columns.values()))) if columns else 0
+
+
+def close_groups(columns, group_columns, closed_groups):
+    """
+    Checks that the members of each group of ``columns`` are in consecutive rows, given the groups closed by the previous tables, and updates ``closed_groups``.
+
+    :param closed_groups: For each group column, a tuple ``(closed_ids, last_id)``: the sorted ids of the groups whose rows have ended, and the id of the last row seen, whose group may continue.
+
+    :raises: ValueError if a group reappears after other rows.
+
+    The ids of all the groups read are kept, as the tables need not be sorted by group id: memory grows with the number of groups, e.g. 8 bytes per group for integer ids, and each table merges its ids into them, in a time linear in the number of groups read so far.
+    """
+    for name in group_columns:
+        ids = columns[name]
+        if len(ids) == 0:
+            continue
+        closed_ids, last_id = closed_groups.get(name, (ids[:0], None))
+        starts = np.flatnonzero(ids[1:] != ids[:-1]) + 1
+        if last_id is None or ids[0] != last_id:
+            starts = np.insert(starts, 0, 0)
+        if last_id is not None and (ids[0] != last_id or len(starts)):
+            # The group of the last row of the previous table ends before the first row of this table, or within it
+            closed_ids = insert_sorted(closed_ids, np.asarray([last_id]))
+        run_ids = ids[starts]
+        unique_ids, counts = np.unique(run_ids, return_counts = True)
+        reopened = unique_ids[counts > 1]
+        if len(reopened) == 0 and len(closed_ids):
+            positions = np.searchsorted(closed_ids, unique_ids).clip(max = len(closed_ids) - 1)
+            reopened = unique_ids[closed_ids[positions] == unique_ids]
+        if len(reopened):
+            raise ValueError("The members of the group '{}' of the column '{}' are not in consecutive rows: sort the table by {} first.".format(
+                reopened[0], name, ', '.join(group_columns)))
+        # The group of the last row may continue in the next table
+        closed_ids = insert_sorted(closed_ids, np.sort(run_ids[:-1]))
+        closed_groups[name] = (closed_ids, ids[-1])
+    return closed_groups
+
+
+def insert_sorted(sorted_values, new_sorted_values):
+    # Merging two sorted runs with a stable sort is linear
+    return np.sort(np.concatenate([sorted_values, new_sorted_values]), kind = 'stable')
+
+
+def get_cuts(columns, group_columns):
+    """
+    Returns the rows before which ``columns`` can be cut without splitting a group, i.e. where every group id changes.
+    """
+    is_cut = np.ones(max(get_row_count(columns) - 1, 0), dtype = bool)
+    for name in group_columns:
+        ids = columns[name]
+        is_cut &= ids[1:] != ids[:-1]
+    return np.flatnonzero(is_cut) + 1
+
+
+def split_chunks(columns, group_columns, chunk_size, is_last):
+    """
+    Yields the chunks that can be cut from ``columns``, and returns the remaining rows, which may be continued by the next table.
+    """
+    row_count = get_row_count(columns)
+    cuts = get_cuts(columns, group_columns)
+    if is_last:
+        cuts = np.append(cuts, row_count)
+    start = 0
+    while start < row_count:
+        next_cuts = cuts[np.searchsorted(cuts, start, side = 'right'):]
+        fitting_count = np.searchsorted(next_cuts, start + chunk_size, side = 'right')
+        if fitting_count == 0:
+            if len(next_cuts) == 0:
+                break
+            stop = next_cuts[0]  # A single group bigger than chunk_size
+        elif fitting_count < len(next_cuts) or is_last or next_cuts[fitting_count - 1] == start + chunk_size:
+            stop = next_cuts[fitting_count - 1]
+        else:
+            break  # The next table may fill the chunk further
+        yield {name: values[start:stop] for name, values in columns.items()}
+        start = stop
+    return {name: values[start:] for name, values in columns.items()}
+
+
+def iter_chunks(tables, chunk_size = DEFAULT_CHUNK_SIZE, id_columns = None):
+    """
+    Regroups a stream of person-level tables into chunks that never split a group.
+
+    The members of each group must be in consecutive rows, as in survey files sorted by household.
+    A chunk contains at most ``chunk_size`` persons, unless a single group is bigger.
+    The ids of the groups already read are kept, to check that no group reappears later, in the same table or in the next ones.
+    Unlike the rows, they are not bounded by ``chunk_size``: they take memory and time linear in the number of groups of the whole stream, see :any:`close_groups`.
+
+    :raises: ValueError if the members of a group are not in consecutive rows, as they would otherwise end up in different chunks.
+
+    :param tables: Iterable of ``pandas.DataFrame``, ``pyarrow.Table``, ``pyarrow.RecordBatch`` or dicts of arrays, with the same columns.
+    :param chunk_size: Maximum number of persons of each chunk.
+    :param id_columns: The id column of each entity, as in :any:`build_simulation`. A chunk never splits the groups of these columns.
+
+    :returns: A generator of dicts of numpy arrays.
+    """
+    pending = None
+    group_columns = None
+    closed_groups = {}
+    for table in tables:
+        names = column_names(table)
+        columns = {name: get_column(table, name) for name in names}
+        if group_columns is None:
+            group_columns = get_group_columns(names, id_columns)
+        close_groups(columns, group_columns, closed_groups)
+        if pending:
+            columns = {name: np.concatenate([pending[name], columns[name]]) for name in names}
+        pending = yield from split_chunks(columns, group_columns, chunk_size, is_last = False)
+    if pending:
+        yield from split_chunks(pending, group_columns, chunk_size, is_last = True)
+
+
+def iter_simulations(tax_benefit_system, tables, period, chunk_size = DEFAULT_CHUNK_SIZE, **build_options):
+    """
+    Builds one simulation per chunk of a stream of person-level tables.
+
+    Only one chunk and its simulation are referenced at a time, so memory is bounded by ``chunk_size`` and not by the size of the whole table.
+
+    :param build_options: ``input_columns``, ``id_columns``, ``role_columns`` and ``profiler``, as in :any:`build_simulation`.
+
+    See :any:`iter_chunks` and :any:`build_simulation` for the other parameters.
+    """
+    for chunk in iter_chunks(tables, chunk_size, build_options.get('id_columns')):
+        yield build_simulation(tax_benefit_system, chunk, period, **build_options)
+
+
+def run_in_chunks(tax_benefit_system, tables, period, variables, periods = None, chunk_size = DEFAULT_CHUNK_SIZE, entity = None, **build_options):
+    """
+    Computes variables over a stream of person-level tables, one chunk at a time.
+
+    :param variables: Names of the variables to compute.
+    :param periods: Periods for which each variable is computed. Defaults to ``[period]``.
+    :param entity: Key of the entity of the rows of the results. Defaults to persons, in the order of the input rows.
+
+    :returns: A generator of ``pyarrow.RecordBatch`` objects, at least one per chunk, with the same columns as :any:`iter_record_batches`.
+
+    Example:
+
+    >>> from pyarrow.parquet import ParquetFile
+    >>> batches = run_in_chunks(tax_benefit_system, ParquetFile('survey.parquet').iter_batches(), 2019, ['arbeitsl_geld_2_eink_hh'])
+    """
+    periods = [period] if periods is None else periods
+    for simulation in iter_simulations(tax_benefit_system, tables, period, chunk_size, **build_options):
+        yield from iter_record_batches(simulation, variables, periods, entity = entity, batch_size = chunk_size, id_columns = build_options.get('id_columns'))
+
+
+def export_in_chunks(tax_benefit_system, tables, period, variables, path, periods = None, chunk_size = DEFAULT_CHUNK_SIZE, entity = None, file_format = None, **build_options):
+    """
+    Computes variables over a stream of person-level tables, one chunk at a time, and writes them to a Parquet or Arrow IPC file.
+
+    See :any:`run_in_chunks` and :any:`write_record_batches` for the parameters.
+
+    :returns: The number of rows written.
+    """
+    batches = run_in_chunks(tax_benefit_system, tables, period, variables, periods, chunk_size, entity, **build_options)
+    return write_record_batches(batches, path, file_format)
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+
+# This file exports computed variables to columnar files, such as Parquet or Arrow IPC files.
+# Each (variable, period) pair becomes a column. Values of group entities are joined to the rows of their members by index, with `members_entity_id`.
+# Rows are written in batches, so that the joined wide table is never built in memory.
+# All the variables are still computed before the first batch is written, and the simulation keeps their arrays: peak memory is the one of every exported column at the size of its entity, plus one batch.
+# To bound memory by a number of rows instead, export chunks of the table with `export_in_chunks`.
+
+import os
+
+from openfisca_core.indexed_enums import EnumArray
+
+from openfisca_germany.microsimulation.builder import ID_COLUMNS
+
+
+# Number of rows of each record batch, i.e. of each Parquet row group
+DEFAULT_BATCH_SIZE = 1_000_000
+
+# File formats, indexed by file extension
+FILE_FORMATS = {
+    '.parquet': 'parquet',
+    '.arrow': 'arrow',
+    '.feather': 'arrow',
+    '.ipc': 'arrow',
+    }
+
+
+def import_pyarrow():
+    try:
+        import pyarrow
+    except ImportError:
+        raise ImportError("Exporting variables requires pyarrow. Install it with `pip install OpenFisca-Germany[arrow]`.")
+    return pyarrow
+
+
+def column_name(variable_name, period, several_periods):
+    """
+    Returns the name of the column of a variable for a period: the variable name, suffixed with the period when several periods are exported.
+    """
+    if several_periods:
+        return '{}_{}'.format(variable_name, period)
+    return variable_name
+
+
+def get_row_index(simulation, row_entity, entity):
+    """
+    Returns, for each row of ``row_entity``, the index of the corresponding ``entity``, or ``None`` if both are the same.
+
+    :raises: ValueError if the values of ``entity`` cannot be joined to the rows of ``row_entity``.
+    """
+    if entity.key == row_entity.key:
+        return None
+    if row_entity.is_person:
+        return simulation.populations[entity.key].members_entity_id
+    raise ValueError("Values of the entity '{}' cannot be exported with one row per {}: use one row per {}.".format(
+        entity.key, row_entity.key, simulation.persons.entity.key))
+
+
+def to_arrow_values(values):
+    # Enumerations are exported by name, like in the web API
+    if isinstance(values, EnumArray):
+        return values.decode_to_str()
+    return values
+
+
+def iter_record_batches(simulation, variables, periods, entity = None, batch_size = DEFAULT_BATCH_SIZE, id_columns = None):
+    """
+    Computes variables and yields them as ``pyarrow.RecordBatch`` objects of at most ``batch_size`` rows.
+
+    :param simulation: The simulation to compute.
+    :param variables: Names of the variables to export.
+    :param periods: Periods for which each variable is computed.
+    :param entity: Key of the entity of the rows, e.g. ``'household'``. Defaults to persons. Persons can be joined to the values of all entities, but groups only to their own.
+    :param batch_size: Maximum number of rows of each batch.
+    :param id_columns: Name of the id column of each entity. Defaults to the columns read by :any:`build_simulation`. Only the ids of the entities that can be joined to the rows are exported.
+
+    At least one batch is yielded, even if the simulation has no rows, so that the schema is always known.
+
+    All the (variable, period) pairs are computed before the first batch is yielded, and stay in memory, in the simulation, until the last one: only the joined rows are built one batch at a time. To bound memory by a number of rows, use :any:`export_in_chunks`.
+    """
+    pyarrow = import_pyarrow()
+    tax_benefit_system = simulation.tax_benefit_system
+    id_columns = ID_COLUMNS if id_columns is None else id_columns
+    if entity is None:
+        entity = tax_benefit_system.person_entity.key
+    if entity not in simulation.populations:
+        raise ValueError("'{}' is not an entity. Valid entities are: {}.".format(entity, ', '.join(sorted(simulation.populations))))
+    row_entity = simulation.populations[entity].entity
+    row_count = simulation.populations[entity].count
+    periods = list(periods)
+
+    # Each column is a tuple (name, values, index of the value of each row)
+    columns = []
+    for entity_key, name in id_columns.items():
+        population = simulation.populations.get(entity_key)
+        if population is None or not (entity_key == row_entity.key or row_entity.is_person):
+            continue
+        columns.append((name, population.ids, get_row_index(simulation, row_entity, population.entity)))
+    for variable_name in variables:
+        variable = tax_benefit_system.get_variable(variable_name, check_existence = True)
+        row_index = get_row_index(simulation, row_entity, variable.entity)
+        for period in periods:
+            values = simulation.calculate(variable_name, period)
+            columns.append((column_name(variable_name, period, len(periods) > 1), values, row_index))
+
+    names = [name for name, _, _ in columns]
+    for start in range(0, row_count or 1, batch_size):
+        rows = slice(start, min(start + batch_size, row_count))
+        arrays = [
+            pyarrow.array(to_arrow_values(values[rows] if row_index is None else values[row_index[rows]]))
+            for _, values, row_index in columns
+            ]
+        yield pyarrow.RecordBatch.from_arrays(arrays, names = names)
+
+
+def write_record_batches(batches, path, file_format = None):
+    """
+    Writes record batches to a Parquet or Arrow IPC file, one at a time. All the batches must have the same schema.
+
+    :param path: Path of the file to write.
+    :param file_format: ``'parquet'`` or ``'arrow'``. By default, guessed from the extension of ``path``, or ``'parquet'``.
+
+    :returns: The number of rows written.
+    """
+    pyarrow = import_pyarrow()
+    if file_format is None:
+        file_format = FILE_FORMATS.get(os.path.splitext(path)[1].lower(), 'parquet')
+    if file_format not in set(FILE_FORMATS.values()):
+        raise ValueError("Unknown file format '{}'. Valid formats are: {}.".format(file_format, ', '.join(sorted(set(FILE_FORMATS.values())))))
+
+    row_count = 0
+    writer = None
+    try:
+        for batch in batches:
+            if writer is None:
+                if file_format == 'parquet':
+                    import pyarrow.parquet as parquet
+                    writer = parquet.ParquetWriter(path, batch.schema)
+                else:
+                    writer = pyarrow.ipc.new_file(path, batch.schema)
+            if file_format == 'parquet':
+                writer.write_table(pyarrow.Table.from_batches([batch]))
+            else:
+                writer.write_batch(batch)
+            row_count += batch.num_rows
+    finally:
+        if writer is not None:
+            writer.close()
+    return row_count
+
+
+def export_variables(simulation, variables, periods, path, file_format = None, entity = None, batch_size = DEFAULT_BATCH_SIZE, id_columns = None):
+    """
+    Computes variables and writes them to a Parquet or Arrow IPC file, one batch of rows at a time.
+
+    See :any:`iter_record_batches` and :any:`write_record_batches` for the parameters.
+
+    :returns: The number of rows written.
+
+    Example:
+
+    >>> export_variables(simulation, ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink', 'arbeitsl_geld_2_eink_hh'], [2018, 2019], 'results.parquet')
+    """
+    batches = iter_record_batches(simulation, variables, periods, entity, batch_size, id_columns)
+    return write_record_batches(batches, path, file_format)
@@ -0,0 +1,103 @@
+# -*- coding: utf-8 -*-
+
+# This file writes person-level tables to columnar files, and maps them back into memory to build simulations.
+# Mapped columns are read-only views of the file: formulas read their pages on demand, and processes mapping the same file share the same physical pages.
+# Columns are written in the dtype of their variable, so that the holders store the mapped arrays without copy, see `openfisca_germany.storage.MappedStorage`.
+# A table can be written as a directory of `.npy` files, one per column, or as an uncompressed Arrow IPC file.
+
+import os
+
+import numpy as np
+
+from openfisca_germany.microsimulation.builder import column_names, get_column
+from openfisca_germany.microsimulation.export import FILE_FORMATS, import_pyarrow
+
+
+def get_file_format(path):
+    """
+    Returns ``'arrow'`` if ``path`` has the extension of an Arrow IPC file, e.g. ``.arrow``, and ``'npy'`` for a directory of ``.npy`` files otherwise.
+
+    :raises: ValueError if ``path`` is a Parquet file, which cannot be mapped.
+    """
+    file_format = FILE_FORMATS.get(os.path.splitext(path)[1].lower(), 'npy')
+    if file_format == 'parquet':
+        raise ValueError("Parquet files are compressed and cannot be mapped: use an Arrow IPC file, or a directory of .npy files.")
+    return file_format
+
+
+def get_mappable_column(table, name, tax_benefit_system = None):
+    """
+    Returns a column of ``table`` that can be mapped: in the dtype of the variable it is named after in ``tax_benefit_system``, if any, and with strings of fixed width.
+    """
+    values = get_column(table, name)
+    variable = tax_benefit_system.get_variable(name) if tax_benefit_system is not None else None
+    if variable is not None and values.dtype != variable.dtype and variable.dtype != object:
+        values = values.astype(variable.dtype)
+    elif values.dtype == object:
+        values = values.astype(str)
+    return values
+
+
+def to_arrow_array(pyarrow, values):
+    """
+    Converts a numpy array to a single Arrow array, so that all the columns are written in one record batch.
+    """
+    array = pyarrow.array(values)
+    # Large arrays of strings are converted by chunks
+    return array.combine_chunks() if isinstance(array, pyarrow.ChunkedArray) else array
+
+
+def write_columns(table, path, tax_benefit_system = None, columns = None):
+    """
+    Writes a person-level table to a directory of ``.npy`` files, or to an Arrow IPC file, which can be mapped with :any:`open_columns`.
+
+    :param table: A ``pandas.DataFrame``, a ``pyarrow.Table`` or a dict of arrays, with one row per person.
+    :param path: Path of the directory, or of the Arrow IPC file if it has an Arrow extension, e.g. ``.arrow``.
+    :param tax_benefit_system: If given, the columns named after its variables are written in the dtype of the variables, e.g. with :any:`lean_storage`.
+    :param columns: The columns to write. By default, all the columns of ``table``.
+
+    :returns: The number of rows written.
+    """
+    columns = column_names(table) if columns is None else columns
+    arrays = {name: get_mappable_column(table, name, tax_benefit_system) for name in columns}
+    if get_file_format(path) == 'arrow':
+        pyarrow = import_pyarrow()
+        batch = pyarrow.RecordBatch.from_arrays([to_arrow_array(pyarrow, values) for values in arrays.values()], names = list(arrays))
+        with pyarrow.OSFile(path, 'wb') as sink:
+            with pyarrow.ipc.new_file(sink, batch.schema) as writer:
+                writer.write_batch(batch)
+    else:
+        os.makedirs(path, exist_ok = True)
+        for name, values in arrays.items():
+            np.save(os.path.join(path, name + '.npy'), values)
+    return len(next(iter(arrays.values()))) if arrays else 0
+
+
+def open_columns(path, columns = None):
+    """
+    Maps the columns of a directory of ``.npy`` files, or of an Arrow IPC file, written by :any:`write_columns`.
+
+    :param columns: The columns to map. By default, all the columns of the file.
+
+    :returns: A dict of read-only arrays, which can be given to :any:`build_simulation`. Columns of numbers are mapped without copy. Boolean and string columns of Arrow files are copied, as Arrow stores them in another layout than numpy.
+
+    Example:
+
+    >>> write_columns(survey, 'survey.arrow', tax_benefit_system)
+    >>> simulation = build_simulation(tax_benefit_system, open_columns('survey.arrow'), 2019)
+    """
+    if get_file_format(path) == 'arrow':
+        pyarrow = import_pyarrow()
+        table = pyarrow.ipc.open_file(pyarrow.memory_map(path)).read_all()
+        columns = table.column_names if columns is None else columns
+        arrays = {}
+        for name in columns:
+            column = table.column(name)
+            chunk = column.chunk(0) if column.num_chunks == 1 else column.combine_chunks()
+            zero_copy = chunk.null_count == 0 and (pyarrow.types.is_integer(chunk.type) or pyarrow.types.is_floating(chunk.type))
+            arrays[name] = chunk.to_numpy(zero_copy_only = zero_copy)
+        return arrays
+
+    if columns is None:
+        columns = sorted(os.path.splitext(file_name)[0] for file_name in os.listdir(path) if file_name.endswith('.npy'))
+    return {name: np.load(os.path.join(path, name + '.npy'), mmap_mode = 'r') for name in columns}
@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+# This file computes variables for several periods, e.g. several years, in a single simulation.
+# The populations are built once, and the input arrays are shared by all the periods instead of being copied for each of them.
+# Each period is then computed in turn, and the results are stacked in a (period x entity) array.
+
+import numpy as np
+
+from openfisca_core import periods as core_periods
+
+from openfisca_germany.microsimulation.builder import build_simulation
+
+
+def calculate_periods(simulation, variable_name, periods):
+    """
+    Computes a variable for several periods.
+
+    :returns: An array of shape ``(len(periods), entity count)``, whose rows are in the order of ``periods``.
+    """
+    periods = [core_periods.period(period) for period in periods]
+    return np.stack([simulation.calculate(variable_name, period) for period in periods])
+
+
+def run_periods(tax_benefit_system, table, periods, variables, **build_options):
+    """
+    Builds a single simulation of a person-level table for several periods, and computes variables for all of them.
+
+    The input columns are the same for every period: the populations and the input arrays are built once, and shared by all the periods.
+    Inputs that change between periods can be set on the returned simulation, with ``simulation.set_input``, before the calculations.
+
+    :param tax_benefit_system: The tax and benefit system to simulate.
+    :param table: A ``pandas.DataFrame``, a ``pyarrow.Table`` or a dict of arrays, with one row per person.
+    :param periods: The periods to compute, e.g. ``[2005, 2006, 2009, 2011, 2013, 2016, 2019]``.
+    :param variables: Names of the variables to compute.
+    :param build_options: ``input_columns``, ``id_columns``, ``role_columns`` and ``profiler``, as in :any:`build_simulation`.
+
+    :returns: A dict of arrays of shape ``(len(periods), entity count)``, indexed by variable names.
+
+    Example:
+
+    >>> results = run_periods(tax_benefit_system, survey, range(2005, 2020), ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh'])
+    >>> results['regelbedarf_m_hh'][-1]  # Every household in 2019
+    """
+    periods = list(periods)
+    simulation = build_simulation(tax_benefit_system, table, periods, **build_options)
+    return {variable_name: calculate_periods(simulation, variable_name, periods) for variable_name in variables}
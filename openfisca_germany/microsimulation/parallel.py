@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+
+# This file runs a simulation of a person-level table on several CPU cores.
+# Each formula is a vectorial expression over a whole population, so a single simulation only uses one core.
+# The table is split into shards of whole households, with their members and tax units, and each shard is simulated by a worker process.
+# Workers are forked: they share the tax and benefit system and the table with the parent process, copy-on-write, instead of receiving them pickled.
+
+import multiprocessing
+import os
+
+import numpy as np
+
+from openfisca_germany.microsimulation.builder import ID_COLUMNS, build_simulation, column_names, get_column
+from openfisca_germany.microsimulation.export import column_name, get_row_index, to_arrow_values
+from openfisca_germany.profiling import Profiler
+
+
+# Arguments shared with the forked workers. Only set while a pool is running.
+_shared = None
+
+
+def get_shards(columns, shard_count, id_columns = None):
+    """
+    Assigns each person to a shard, so that shards have about the same number of persons and never split a group.
+
+    Households are assigned to shards in the order of their ids. Tax units must not span several households.
+
+    :returns: The shard of each person.
+    :raises: ValueError if a group of another entity, e.g. a tax unit, spans several households, whatever the number of shards.
+    """
+    id_columns = ID_COLUMNS if id_columns is None else id_columns
+    group_columns = {entity_key: name for entity_key, name in id_columns.items() if entity_key != 'person' and name in columns}
+    person_count = len(next(iter(columns.values())))
+    if not group_columns:
+        return np.arange(person_count) * shard_count // max(person_count, 1)
+
+    (main_entity, main_column), *other_columns = group_columns.items()
+    _, members_main_group = np.unique(columns[main_column], return_inverse = True)
+    for entity_key, name in other_columns:
+        # Each group must be within a single group of the main entity, so that sharding by the main entity never splits it
+        _, members_group = np.unique(columns[name], return_inverse = True)
+        group_main_groups = np.empty(members_group.max() + 1, dtype = members_main_group.dtype)
+        group_main_groups[members_group] = members_main_group
+        spanning = group_main_groups[members_group] != members_main_group
+        if spanning.any():
+            raise ValueError("The {} '{}' (column '{}') spans several {}s (column '{}'): each {} must be within a single {} for the table to be split.".format(
+                entity_key, columns[name][spanning][0], name, main_entity, main_column, entity_key, main_entity))
+
+    group_sizes = np.bincount(members_main_group)
+    group_shards = (np.cumsum(group_sizes) - group_sizes) * shard_count // person_count
+    return group_shards[members_main_group]
+
+
+def compute_shard(rows):
+    """
+    Simulates the persons ``rows`` of the shared table, and returns the person-level values of each column, and the stats and stacks recorded if the simulation is profiled.
+    """
+    tax_benefit_system, columns, period, variables, periods, build_options = _shared
+    if build_options.get('profiler') is not None:
+        # Each shard is profiled on its own, and its profile added to the one of the parent process
+        build_options = dict(build_options, profiler = Profiler())
+    simulation = build_simulation(tax_benefit_system, {name: values[rows] for name, values in columns.items()}, period, **build_options)
+    results = {}
+    for variable_name in variables:
+        variable = tax_benefit_system.get_variable(variable_name, check_existence = True)
+        row_index = get_row_index(simulation, simulation.persons.entity, variable.entity)
+        for output_period in periods:
+            values = simulation.calculate(variable_name, output_period)
+            results[column_name(variable_name, output_period, len(periods) > 1)] = to_arrow_values(values if row_index is None else values[row_index])
+    profiler = build_options.get('profiler')
+    return results, (profiler.stats, profiler.stacks) if profiler is not None else None
+
+
+def run_in_parallel(tax_benefit_system, table, period, variables, periods = None, processes = None, **build_options):
+    """
+    Computes variables for a person-level table, on several processes.
+
+    :param tax_benefit_system: The tax and benefit system to simulate. It is shared with the workers, and must not be modified while they run.
+    :param table: A ``pandas.DataFrame``, a ``pyarrow.Table`` or a dict of arrays, with one row per person.
+    :param period: The period for which the input columns are set.
+    :param variables: Names of the variables to compute.
+    :param periods: Periods for which each variable is computed. Defaults to ``[period]``.
+    :param processes: Number of worker processes. Defaults to the number of CPU cores. With one process, or on platforms that cannot fork, the table is simulated in the current process.
+    :param build_options: ``input_columns``, ``id_columns``, ``role_columns`` and ``profiler``, as in :any:`build_simulation`. The calculations of all the workers are added to ``profiler``.
+
+    :returns: A dict of arrays, with one value per person in the order of the rows of ``table``. Values of group entities are joined to their members. Columns are named as in :any:`iter_record_batches`.
+
+    Example:
+
+    >>> results = run_in_parallel(tax_benefit_system, survey, 2019, ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh'], processes = 32)
+    """
+    global _shared
+
+    periods = [period] if periods is None else list(periods)
+    processes = processes or os.cpu_count() or 1
+    columns = {name: get_column(table, name) for name in column_names(table)}
+    person_count = len(next(iter(columns.values()))) if columns else 0
+    if processes > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+        processes = 1
+    processes = min(processes, max(person_count, 1))
+
+    # Variables are imported lazily: import them once, before forking, rather than once per worker
+    list(tax_benefit_system.variables)
+
+    shards = get_shards(columns, processes, build_options.get('id_columns'))
+    order = np.argsort(shards, kind = 'stable')
+    shard_rows = [rows for rows in np.split(order, np.cumsum(np.bincount(shards, minlength = processes))[:-1]) if len(rows) > 0]
+
+    _shared = (tax_benefit_system, columns, period, variables, periods, build_options)
+    try:
+        if processes == 1:
+            shard_results = [compute_shard(rows) for rows in shard_rows]
+        else:
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                shard_results = pool.map(compute_shard, shard_rows, chunksize = 1)
+    finally:
+        _shared = None
+
+    shard_results, profiles = zip(*shard_results) if shard_results else ([], [])
+    for profile in profiles:
+        if profile is not None:
+            build_options['profiler'].merge(*profile)
+
+    # Put the results back in the order of the rows
+    results = {}
+    for name in (shard_results[0] if shard_results else {}):
+        values = np.concatenate([shard_result[name] for shard_result in shard_results])
+        results[name] = np.empty_like(values)
+        results[name][order] = values
+    return results
@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+# This file compares the results of the tax and benefit system with a reference table, such as the golden data of the reference implementation, gettsim.
+# The reference table is simulated once, and all the output columns are computed in that single simulation.
+# Each output is compared with its reference column by one vectorial tolerance check over all the entities.
+# The differences are reported with the rows of the persons concerned and their input values, so that a failure can be reproduced.
+# Tables mixing several years can be checked in one run with `simulation_class = DatedSimulation`, each row using the legislation of its own year.
+
+from collections import namedtuple
+
+import numpy as np
+
+from openfisca_core.simulations import Simulation
+
+from openfisca_germany.microsimulation.builder import ID_COLUMNS, ROLE_COLUMNS, build_simulation, column_names, get_column
+from openfisca_germany.microsimulation.validation import DEFAULT_ATOL
+
+
+ParityDifference = namedtuple('ParityDifference', ['variable', 'column', 'count', 'max_difference', 'rows', 'actual', 'expected', 'inputs'])
+ParityDifference.__doc__ = """
+The results of ``variable`` differing from the reference ``column`` by more than the tolerance, for ``count`` entities, by at most ``max_difference``.
+
+``rows`` are the indices, in the reference table, of the persons of the differing entities. For each of these rows, ``actual`` and ``expected`` are the results of the entity of the person, and ``inputs`` gives the input values, by input column.
+"""
+
+
+def get_first_rows(population):
+    """
+    Returns, for each entity of ``population``, the index of the row of its first member.
+    """
+    if population.entity.is_person:
+        return np.arange(population.count)
+    members_entity_id = population.members_entity_id
+    first_rows = np.empty(population.count, dtype = int)
+    # The last assignment wins: assigning in reverse order keeps the first member of each group
+    first_rows[members_entity_id[::-1]] = np.arange(len(members_entity_id))[::-1]
+    return first_rows
+
+
+def get_differences(actual, expected, atol, rtol):
+    """
+    Returns the absolute differences between ``actual`` and ``expected``, and whether each of them exceeds ``atol + rtol * abs(expected)``.
+
+    Results missing in both arrays are equal, results missing in one array only are not.
+    """
+    actual = np.asarray(actual, dtype = np.float64)
+    expected = np.asarray(expected, dtype = np.float64)
+    difference = np.abs(actual - expected)
+    difference[np.isnan(actual) & np.isnan(expected)] = 0
+    difference[np.isnan(difference)] = np.inf
+    return difference, difference > atol + rtol * np.abs(np.nan_to_num(expected))
+
+
+def compare_with_reference(tax_benefit_system, table, period, output_columns, input_columns = None, atol = DEFAULT_ATOL, rtol = 0, simulation_class = Simulation, **build_options):
+    """
+    Simulates a person-level reference table, and compares the results with its output columns.
+
+    The table is simulated once: all the outputs are computed in the same simulation, and each of them is compared with its reference column in one vectorial operation.
+    As in :any:`build_simulation`, the reference values of a group entity are read from the row of its first member.
+
+    :param tax_benefit_system: The tax and benefit system to simulate.
+    :param table: A ``pandas.DataFrame``, a ``pyarrow.Table`` or a dict of arrays, with one row per person, containing the inputs and the expected outputs.
+    :param period: The period for which the inputs are set and the outputs computed.
+    :param output_columns: The reference column of each variable to compare, as a dict, or a list of variables named as their reference columns.
+    :param input_columns: The columns to set as inputs. By default, every column named after a variable of ``tax_benefit_system``, except the output columns.
+    :param atol: The largest absolute difference accepted.
+    :param rtol: The largest difference accepted, relative to the reference value, on top of ``atol``.
+    :param simulation_class: The class of the simulation, e.g. :any:`DatedSimulation` to check a table mixing several years in one run.
+    :param build_options: ``id_columns`` and ``role_columns``, as in :any:`build_simulation`.
+
+    :returns: A list of :any:`ParityDifference`, one for each variable whose results differ from the reference. It is empty if all the results match.
+
+    Example:
+
+    >>> differences = compare_with_reference(tax_benefit_system, golden_data, 2019, ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh'], simulation_class = DatedSimulation)
+    >>> print(format_differences(differences))
+    """
+    if not isinstance(output_columns, dict):
+        output_columns = {name: name for name in output_columns}
+    if input_columns is None:
+        id_columns = build_options.get('id_columns') or ID_COLUMNS
+        role_columns = build_options.get('role_columns') or ROLE_COLUMNS
+        reserved = set(id_columns.values()) | set(role_columns.values()) | set(output_columns.values())
+        input_columns = [
+            name for name in column_names(table)
+            if name not in reserved and tax_benefit_system.get_variable(name) is not None
+            ]
+    simulation = build_simulation(tax_benefit_system, table, period, input_columns = input_columns, simulation_class = simulation_class, **build_options)
+
+    differences = []
+    for variable, column in output_columns.items():
+        population = simulation.get_variable_population(variable)
+        actual = simulation.calculate(variable, period)
+        expected = get_column(table, column)[get_first_rows(population)]
+        difference, differs = get_differences(actual, expected, atol, rtol)
+        if not differs.any():
+            continue
+        if population.entity.is_person:
+            rows = np.flatnonzero(differs)
+            entities = rows
+        else:
+            rows = np.flatnonzero(differs[population.members_entity_id])
+            entities = population.members_entity_id[rows]
+        differences.append(ParityDifference(
+            variable, column, int(differs.sum()), difference[differs].max(), rows, actual[entities], expected[entities],
+            {name: get_column(table, name)[rows] for name in input_columns},
+            ))
+    return differences
+
+
+def format_differences(differences, limit = 10):
+    """
+    Returns a text report of ``differences``, as returned by :any:`compare_with_reference`, listing the rows that differ with their input values.
+
+    :param limit: Maximum number of rows listed for each variable.
+    """
+    lines = []
+    for difference in differences:
+        lines.append("{} ({}): {} entities differ, by up to {:.4g}".format(difference.variable, difference.column, difference.count, difference.max_difference))
+        names = ['row', 'actual', 'expected'] + list(difference.inputs)
+        lines.append('  ' + ' '.join('{:>12}'.format(name[:12]) for name in names))
+        for index in range(min(limit, len(difference.rows))):
+            values = [difference.rows[index], difference.actual[index], difference.expected[index]] + [values[index] for values in difference.inputs.values()]
+            lines.append('  ' + ' '.join('{:>12}'.format(format_value(value)) for value in values))
+        if len(difference.rows) > limit:
+            lines.append("  ... and {} more rows".format(len(difference.rows) - limit))
+    return '\n'.join(lines)
+
+
+def format_value(value):
+    if isinstance(value, (float, np.floating)):
+        return '{:.6g}'.format(value)
+    return str(value)[:12]
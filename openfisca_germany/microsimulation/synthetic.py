@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+
+# This file generates synthetic populations, for load tests and benchmarks that need more households than the situation examples.
+# Households are drawn from configurable distributions of sizes and incomes, with a seed, so that the same arguments always generate the same population.
+# The population is generated as a person-level dict of columns, with the identifiers and roles expected by `build_simulation`, and can be written with `write_columns`.
+# All the columns are drawn with vectorial operations: there is no Python loop over the households or the persons.
+
+import numpy as np
+
+
+# Share of households by number of persons
+HOUSEHOLD_SIZES = {1: 0.41, 2: 0.34, 3: 0.12, 4: 0.09, 5: 0.03, 6: 0.01}
+
+# Share of the households of several persons headed by a couple, the others being single parents with their children
+COUPLE_SHARE = 0.75
+
+# Share of the eligible persons receiving each income source, and median of the monthly amounts they receive, by income source.
+# Sources are drawn in this order: unemployment benefits are only received by persons of working age without salary.
+INCOMES = {
+    'bruttolohn_m': (0.75, 2800),
+    'eink_selbst_m': (0.08, 2500),
+    'vermiet_eink_m': (0.06, 400),
+    'kapital_eink_m': (0.25, 50),
+    'sonstig_eink_m': (0.05, 200),
+    'ges_rente_m': (0.95, 1100),
+    'arbeitsl_geld_m': (0.15, 1000),
+    'elterngeld_m': (0.9, 900),
+    }
+
+# Dispersion of the logarithm of the incomes
+INCOME_SIGMA = 0.6
+
+# Share of the households living in a dwelling they own
+OWNER_SHARE = 0.45
+
+RETIREMENT_AGE = 65
+
+# Children are at most this old, and at least 18 years younger than their first parent
+MAX_CHILD_AGE = 24
+
+
+def draw_amounts(random, eligible, share, median):
+    """
+    Returns amounts drawn from a log-normal distribution of ``median`` for a ``share`` of the ``eligible`` persons, and 0 for the others.
+    """
+    receives = np.flatnonzero(eligible & (random.random(len(eligible)) < share))
+    amounts = np.zeros(len(eligible))
+    # Only the amounts received are drawn, as most persons receive few income sources
+    amounts[receives] = np.round(median * np.exp(INCOME_SIGMA * random.standard_normal(len(receives))), 2)
+    return amounts
+
+
+def generate_population(household_count, seed = 0, household_sizes = HOUSEHOLD_SIZES, couple_share = COUPLE_SHARE, incomes = INCOMES, owner_share = OWNER_SHARE):
+    """
+    Generates a synthetic population of ``household_count`` households, as a person-level dict of columns.
+
+    Each household is made of one or two parents, then its children, in consecutive rows, and is also a tax unit, headed by its parents.
+    Households with children are headed by parents of 20 to 55 years old, the others by persons of 18 to 85 years old.
+    Single parents are ``alleinerziehend``, children are ``kind``.
+    Adults receive the income sources summed by ``_arbeitsl_geld_2_brutto_eink``: salaries, self-employment, rental, capital and other incomes until the retirement age, pensions after it, unemployment benefits without salary, and parental benefits for their first parent when the youngest child is less than one year old.
+    Owners pay no rent: their ``kaltmiete_m_hh`` is 0.
+
+    :param household_count: The number of households to generate.
+    :param seed: The seed of the random generator.
+    :param household_sizes: The share of households by number of persons. Defaults to :any:`HOUSEHOLD_SIZES`.
+    :param couple_share: The share of the households of several persons headed by a couple. Defaults to :any:`COUPLE_SHARE`.
+    :param incomes: The share of eligible persons receiving each income source, and the median of the monthly amounts, by income source. Sources missing from it are null. Defaults to :any:`INCOMES`.
+    :param owner_share: The share of households owning their dwelling. Defaults to :any:`OWNER_SHARE`.
+
+    :returns: A dict of numpy arrays with one row per person, that :any:`build_simulation` accepts. Household inputs are repeated for all the members of the household.
+
+    Example:
+
+    >>> table = generate_population(1_000_000, seed = 1)
+    >>> simulation = build_simulation(tax_benefit_system, table, 2019)
+    """
+    unknown = set(incomes) - set(INCOMES)
+    if unknown:
+        raise ValueError("Unknown income sources: {}. Known sources are: {}.".format(', '.join(sorted(unknown)), ', '.join(INCOMES)))
+    random = np.random.default_rng(seed)
+
+    sizes = np.array(list(household_sizes.keys()))
+    probabilities = np.array(list(household_sizes.values()), dtype = float)
+    sizes = random.choice(sizes, household_count, p = probabilities / probabilities.sum())
+    couple = (sizes >= 2) & (random.random(household_count) < couple_share)
+    parent_count = 1 + couple
+    child_count = sizes - parent_count
+    household_age = np.where(child_count > 0, random.integers(20, 56, household_count), random.integers(18, 86, household_count))
+
+    # Position of each person within its household: parents first, then children
+    person_count = int(sizes.sum())
+    hh_id = np.repeat(np.arange(household_count), sizes)
+    position = np.arange(person_count) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    kind = position >= np.repeat(parent_count, sizes)
+    person_household_age = np.repeat(household_age, sizes)
+
+    # Second parents are a few years older or younger than first parents
+    parent_age = np.maximum(18, person_household_age + (position == 1) * random.integers(-5, 6, person_count))
+    max_child_age = np.minimum(MAX_CHILD_AGE, person_household_age - 18)
+    child_age = np.floor(random.random(person_count) * (max_child_age + 1))
+    alter = np.where(kind, child_age, parent_age).astype(float)
+
+    adult = ~kind
+    working_age = adult & (alter < RETIREMENT_AGE)
+    has_baby = np.bincount(hh_id[kind & (alter == 0)], minlength = household_count) > 0
+    eligible = {
+        'bruttolohn_m': working_age,
+        'eink_selbst_m': working_age,
+        'vermiet_eink_m': adult,
+        'kapital_eink_m': adult,
+        'sonstig_eink_m': working_age,
+        'ges_rente_m': adult & (alter >= RETIREMENT_AGE),
+        'elterngeld_m': (position == 0) & np.repeat(has_baby, sizes),
+        }
+
+    table = {
+        'p_id': np.arange(person_count),
+        'hh_id': hh_id,
+        'tu_id': hh_id,
+        'household_role': np.where(kind, 'child', 'parent'),
+        'tax_unit_role': np.where(kind, 'other', 'head'),
+        'alter': alter,
+        'kind': kind,
+        'alleinerziehend': adult & np.repeat(~couple & (child_count > 0), sizes),
+        }
+    for name in INCOMES:
+        if name == 'arbeitsl_geld_m':
+            eligible[name] = working_age & (table['bruttolohn_m'] == 0)
+        if name in incomes:
+            table[name] = draw_amounts(random, eligible[name], *incomes[name])
+        else:
+            table[name] = np.zeros(person_count)
+
+    # Dwellings have about 20 square meters by person, rented about 7.5 € by square meter, and heated for about 1.1 € by square meter
+    owner = random.random(household_count) < owner_share
+    surface = np.round((15 + 20 * sizes) * np.exp(0.25 * random.standard_normal(household_count)))
+    rent = np.where(owner, 0., np.round(surface * 7.5 * np.exp(0.25 * random.standard_normal(household_count)), 2))
+    heating = np.round(surface * 1.1 * np.exp(0.2 * random.standard_normal(household_count)), 2)
+    table['kaltmiete_m_hh'] = np.repeat(rent, sizes)
+    table['heizkosten_m_hh'] = np.repeat(heating, sizes)
+    table['wohnfläche_hh'] = np.repeat(surface, sizes)
+    table['bewohnt_eigentum_hh'] = np.repeat(owner, sizes)
+    return table
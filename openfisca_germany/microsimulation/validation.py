@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+# This file validates a storage profile, such as `lean_storage`, against a reference run in float64.
+# The same table is simulated with both profiles, and the results of each variable are compared within an absolute tolerance.
+# The default tolerance is the one of the golden data tests of `test_arbeitsl_geld_2.py`.
+
+from collections import namedtuple
+
+import numpy as np
+
+from openfisca_germany.microsimulation.builder import build_simulation
+from openfisca_germany.storage import lean_storage, reference_storage
+
+
+# Absolute tolerance of the golden data tests
+DEFAULT_ATOL = 0.01
+
+
+StorageDifference = namedtuple('StorageDifference', ['variable', 'max_difference', 'rows'])
+StorageDifference.__doc__ = """
+The results of ``variable`` differing from the reference run by more than the tolerance: ``rows`` are the indices of the differing entities, and ``max_difference`` the largest absolute difference.
+"""
+
+
+def compare_storage_profiles(tax_benefit_system, table, period, variables, profile = lean_storage, reference = reference_storage, atol = DEFAULT_ATOL, **build_options):
+    """
+    Simulates a person-level table with a storage profile and with a reference profile, and compares the results.
+
+    :param tax_benefit_system: The tax and benefit system to simulate, to which both profiles are applied.
+    :param profile: The storage profile to validate, e.g. :any:`lean_storage`.
+    :param reference: The storage profile of the reference run, :any:`reference_storage` by default.
+    :param atol: The largest absolute difference accepted between the results of both runs.
+    :param build_options: ``input_columns``, ``id_columns`` and ``role_columns``, as in :any:`build_simulation`.
+
+    :returns: A list of :any:`StorageDifference`, one for each variable whose results differ by more than ``atol``. It is empty if the profile is valid.
+
+    Example:
+
+    >>> compare_storage_profiles(tax_benefit_system, survey, 2019, ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh'])
+    >>> []
+    """
+    simulation = build_simulation(profile(tax_benefit_system), table, period, **build_options)
+    reference_simulation = build_simulation(reference(tax_benefit_system), table, period, **build_options)
+
+    differences = []
+    for variable in variables:
+        result = np.asarray(simulation.calculate(variable, period), dtype = np.float64)
+        expected = np.asarray(reference_simulation.calculate(variable, period), dtype = np.float64)
+        difference = np.abs(result - expected)
+        # Results missing in both runs are equal, results missing in one run only are not
+        difference[np.isnan(result) & np.isnan(expected)] = 0
+        difference[np.isnan(difference)] = np.inf
+        rows = np.flatnonzero(difference > atol)
+        if len(rows):
+            differences.append(StorageDifference(variable, difference[rows].max(), rows))
+    return differences
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+
+# This file defines an on-disk cache for the legislation parameters.
+# Parsing the YAML files of the `parameters` directory dominates the start-up of a tax and benefit system.
+# The parsed parameter tree is therefore stored as a single binary file, and read back as long as the YAML files it was built from are unchanged.
+# The file is a pickle, stored by default in the user cache directory, `~/.cache/openfisca_germany`: reading it runs any code written into it.
+# Only point `OPENFISCA_GERMANY_CACHE_DIR` at a directory that no other user can write to, and disable the cache where that cannot be guaranteed.
+# The test suite disables it, so that tests never read nor write the user cache directory.
+
+import hashlib
+import logging
+import os
+import pickle
+import platform
+import tempfile
+
+import pkg_resources
+
+from openfisca_core.parameters import FILE_EXTENSIONS, ParameterNode
+
+
+log = logging.getLogger(__name__)
+
+# Set this environment variable to change where compiled parameters are stored. Set it to an empty string to disable the cache.
+CACHE_DIR_ENVIRONMENT_VARIABLE = 'OPENFISCA_GERMANY_CACHE_DIR'
+
+CACHE_FILE_PREFIX = 'parameters-'
+CACHE_FILE_EXTENSION = '.pickle'
+
+
+def default_cache_dir():
+    """
+    Returns the directory in which compiled parameters are stored, or ``None`` if the cache is disabled.
+    """
+    cache_dir = os.environ.get(CACHE_DIR_ENVIRONMENT_VARIABLE)
+    if cache_dir is not None:
+        return cache_dir or None
+    xdg_cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(xdg_cache_home, 'openfisca_germany')
+
+
+def list_parameter_files(directory):
+    """
+    Lists, in a stable order, all the YAML files a parameter directory is built from.
+    """
+    parameter_files = []
+    for root, _, file_names in os.walk(directory):
+        for file_name in file_names:
+            if os.path.splitext(file_name)[1] in FILE_EXTENSIONS:
+                parameter_files.append(os.path.join(root, file_name))
+    return sorted(parameter_files)
+
+
+def compute_cache_key(directory):
+    """
+    Computes a key that changes as soon as any YAML file of ``directory`` is added, removed, touched or edited.
+
+    The key also depends on the OpenFisca-Core and Python versions, as the cache stores pickled OpenFisca-Core objects.
+    """
+    key = hashlib.sha256()
+    key.update(pkg_resources.get_distribution('OpenFisca-Core').version.encode())
+    key.update(platform.python_version().encode())
+    key.update(os.path.abspath(directory).encode())
+    for file_path in list_parameter_files(directory):
+        with open(file_path, 'rb') as file:
+            content = file.read()
+        key.update(os.path.relpath(file_path, directory).encode())
+        key.update(str(os.stat(file_path).st_mtime_ns).encode())
+        key.update(hashlib.sha256(content).digest())
+    return key.hexdigest()
+
+
+def _cache_file_prefix(directory):
+    # One cache file is kept per parameter directory, so that several country package installations can share a cache directory.
+    return CACHE_FILE_PREFIX + hashlib.sha256(os.path.abspath(directory).encode()).hexdigest()[:16] + '-'
+
+
+def _read_cache(cache_path):
+    try:
+        with open(cache_path, 'rb') as file:
+            return pickle.load(file)
+    except FileNotFoundError:
+        return None
+    except Exception:
+        log.warning('Ignoring unreadable compiled parameters file "{}".'.format(cache_path), exc_info = True)
+        return None
+
+
+def _write_cache(cache_dir, cache_path, parameters):
+    try:
+        os.makedirs(cache_dir, exist_ok = True)
+        # Write to a temporary file first, so that concurrent processes never read a partially written cache.
+        file_descriptor, temporary_path = tempfile.mkstemp(dir = cache_dir, suffix = '.tmp')
+        try:
+            with os.fdopen(file_descriptor, 'wb') as file:
+                pickle.dump(parameters, file, protocol = pickle.HIGHEST_PROTOCOL)
+            os.replace(temporary_path, cache_path)
+        except BaseException:
+            os.remove(temporary_path)
+            raise
+    except Exception:
+        log.warning('Unable to write compiled parameters file "{}".'.format(cache_path), exc_info = True)
+
+
+def _remove_stale_cache_files(cache_dir, prefix, cache_path):
+    for file_name in os.listdir(cache_dir):
+        file_path = os.path.join(cache_dir, file_name)
+        if file_name.startswith(prefix) and file_path != cache_path:
+            try:
+                os.remove(file_path)
+            except OSError:
+                pass
+
+
+def load_parameters(directory, cache_dir = None):
+    """
+    Loads the parameter tree contained in ``directory``, using the compiled parameter cache when it is up to date.
+
+    If the YAML files changed since the cache was written, or if the cache cannot be read, the YAML files are parsed and the cache is rewritten.
+
+    :param directory: Absolute path towards the YAML parameter directory.
+    :param cache_dir: Directory in which compiled parameters are stored. Defaults to :any:`default_cache_dir`. An empty string disables the cache. The files of this directory are unpickled: it must only be writable by trusted users.
+
+    :returns: A new :any:`ParameterNode`. It is never shared with another caller, so it can safely be mutated.
+    """
+    if cache_dir is None:
+        cache_dir = default_cache_dir()
+    if not cache_dir:
+        return ParameterNode('', directory_path = directory)
+
+    prefix = _cache_file_prefix(directory)
+    cache_path = os.path.join(cache_dir, prefix + compute_cache_key(directory) + CACHE_FILE_EXTENSION)
+
+    parameters = _read_cache(cache_path)
+    if isinstance(parameters, ParameterNode):
+        return parameters
+
+    parameters = ParameterNode('', directory_path = directory)
+    _write_cache(cache_dir, cache_path, parameters)
+    if os.path.isfile(cache_path):
+        _remove_stale_cache_files(cache_dir, prefix, cache_path)
+    return parameters
@@ -0,0 +1,285 @@
+# -*- coding: utf-8 -*-
+
+# This file defines group populations, such as households and tax units, that aggregate their members with a precomputed membership index.
+# OpenFisca-Core derives the grouping of the members again on every aggregation: `max`, `min` and `all` even loop over the positions within the groups.
+# Here, the members of each group are indexed once, in CSR style: the order sorting the members by group, and the start and size of each group.
+# `all`, `max`, `min` and the values of the nth members then run as `reduceat` or gather kernels over the sorted members, and counts are read from the index.
+# Sums and `any` keep `bincount` kernels, which are faster than `reduceat` over groups of a few members.
+# Members can also be counted by band of values, e.g. children by age band, in a single (groups x bands) histogram.
+# Holders are created with the variables of the simulation's own tax and benefit system, and stored as its storage profile requires.
+# The entities install these populations in every tax and benefit system they are copied into, reforms included.
+
+import functools
+import weakref
+
+import numpy as np
+
+from openfisca_core.entities import Entity, GroupEntity
+from openfisca_core.holders import Holder
+from openfisca_core.populations import GroupPopulation, Population, projectable
+
+from openfisca_germany import storage
+
+
+def positions_within_groups(group_index, group_count):
+    """
+    Returns the position of each member within its group, in the order of appearance of the members.
+
+    :param group_index: Index of the group of each member.
+    :returns: A tuple ``(positions, order)``, where ``order`` sorts the members by group, and keeps their order of appearance within each group.
+    """
+    order = np.argsort(group_index, kind = 'stable')
+    group_sizes = np.bincount(group_index, minlength = group_count)
+    group_starts = np.cumsum(group_sizes) - group_sizes
+    positions = np.empty(len(group_index), dtype = np.int64)
+    positions[order] = np.arange(len(group_index)) - np.repeat(group_starts, group_sizes)
+    return positions, order
+
+
+class MembershipIndex(object):
+    """
+    The members of each group of a population, in CSR style.
+
+    - ``order`` sorts the members by group, keeping their order of appearance within each group. It is ``None`` if the members are already sorted by group, which avoids reordering the arrays;
+    - ``sizes`` and ``starts`` are the number of members of each group, and the index of its first member in the sorted members;
+    - ``positions`` is the position of each member within its group.
+    """
+
+    def __init__(self, members_entity_id, count):
+        members_entity_id = np.asarray(members_entity_id)
+        self.count = count
+        self.sizes = np.bincount(members_entity_id, minlength = count)
+        self.starts = np.cumsum(self.sizes) - self.sizes
+        if np.all(members_entity_id[1:] >= members_entity_id[:-1]):
+            self.order = None
+            self.positions = np.arange(len(members_entity_id)) - np.repeat(self.starts, self.sizes)
+        else:
+            self.positions, self.order = positions_within_groups(members_entity_id, count)
+        # `reduceat` cannot reduce empty groups: they are filled with the neutral element of the reduction instead
+        self.non_empty = None if self.sizes.all() else self.sizes > 0
+        self.reduce_starts = self.starts if self.non_empty is None else self.starts[self.non_empty]
+
+    def sort(self, array):
+        """
+        Returns the values of the members, sorted by group.
+        """
+        return array if self.order is None else array[self.order]
+
+    def reduce(self, ufunc, array, neutral_element, dtype = None):
+        """
+        Reduces the values of the members of each group with ``ufunc``, e.g. ``numpy.add`` or ``numpy.maximum``.
+
+        :returns: An array with one value per group, ``neutral_element`` for the groups without members.
+        """
+        result = ufunc.reduceat(self.sort(array), self.reduce_starts, dtype = dtype)
+        if self.non_empty is None:
+            return result
+        filled = np.full(self.count, neutral_element, dtype = result.dtype)
+        filled[self.non_empty] = result
+        return filled
+
+
+class StorageMixin(object):
+    """
+    Creates the holders of a population with the variables of the tax and benefit system of its simulation, stored as their storage profile requires, see :any:`StorageProfile`.
+
+    OpenFisca-Core reads the variables of the holders from the entity, which is shared by all the tax and benefit systems, and refers to the last one built.
+    """
+
+    def get_holder(self, variable_name):
+        holder = self._holders.get(variable_name)
+        if holder is not None:
+            return holder
+        self.entity.check_variable_defined_for_entity(variable_name)
+        if self.simulation is not None:
+            variable = self.simulation.tax_benefit_system.get_variable(variable_name)
+        else:
+            variable = self.entity.get_variable(variable_name)
+        holder = self._holders[variable_name] = Holder(variable, self)
+        holder._memory_storage = storage.create_storage(variable)
+        return holder
+
+
+class PersonPopulation(StorageMixin, Population):
+    pass
+
+
+class IndexedGroupPopulation(StorageMixin, GroupPopulation):
+    """
+    A :any:`GroupPopulation` whose aggregations use a :any:`MembershipIndex`, with the same results.
+
+    The index is built on the first aggregation, and built again if ``members_entity_id`` is set.
+    """
+
+    def __init__(self, entity, members):
+        super().__init__(entity, members)
+        self._membership_index = None
+
+    @property
+    def membership_index(self):
+        if self._membership_index is None:
+            self._membership_index = MembershipIndex(self.members_entity_id, self.count)
+        return self._membership_index
+
+    @GroupPopulation.members_entity_id.setter
+    def members_entity_id(self, members_entity_id):
+        self._members_entity_id = members_entity_id
+        self._membership_index = None
+
+    @property
+    def members_position(self):
+        if self._members_position is None and self.members_entity_id is not None:
+            self._members_position = self.membership_index.positions
+        return self._members_position
+
+    @members_position.setter
+    def members_position(self, members_position):
+        self._members_position = members_position
+
+    @property
+    def ordered_members_map(self):
+        if self._ordered_members_map is None:
+            order = self.membership_index.order
+            self._ordered_members_map = np.arange(len(self.members_entity_id)) if order is None else order
+        return self._ordered_members_map
+
+    def _filter_role(self, array, role, neutral_element):
+        self.entity.check_role_validity(role)
+        self.members.check_array_compatible_with_entity(array)
+        if role is None:
+            return array
+        return np.where(self.members.has_role(role), array, neutral_element)
+
+    @projectable
+    def sum(self, array, role = None):
+        # Over groups of a few members, `numpy.bincount` is faster than `numpy.add.reduceat`
+        array = self._filter_role(array, role, 0)
+        return np.bincount(self.members_entity_id, weights = array, minlength = self.count)
+
+    @projectable
+    def any(self, array, role = None):
+        array = self._filter_role(array, role, False)
+        if array.dtype != bool:
+            return np.bincount(self.members_entity_id, weights = array, minlength = self.count) > 0
+        # Only the members for which `array` is true are counted
+        return np.bincount(self.members_entity_id[array], minlength = self.count) > 0
+
+    @projectable
+    def reduce(self, array, reducer, neutral_element, role = None):
+        if not isinstance(reducer, np.ufunc):
+            return super().reduce(array, reducer, neutral_element, role = role)
+        array = self._filter_role(array, role, neutral_element)
+        return self.membership_index.reduce(reducer, array, neutral_element, dtype = np.result_type(array, neutral_element))
+
+    @projectable
+    def nb_persons(self, role = None):
+        if role:
+            return super().nb_persons(role)
+        return self.membership_index.sizes.copy()
+
+    @projectable
+    def value_nth_person(self, n, array, default = 0):
+        self.members.check_array_compatible_with_entity(array)
+        index = self.membership_index
+        result = self.filled_array(default, dtype = array.dtype)
+        with_nth_person = index.sizes > n
+        nth_persons = index.starts[with_nth_person] + n
+        result[with_nth_person] = array[nth_persons if index.order is None else index.order[nth_persons]]
+        return result
+
+
+class Bands(object):
+    """
+    Named ranges of values, bounds included, e.g. the age bands ``{'0_6': (0, 6), '7_13': (7, 13)}``, in which the members of groups are counted in a single pass.
+
+    Bands may overlap, e.g. ``(0, 15)`` and ``(7, 13)``. A value is in a band exactly when ``(low <= value) & (value <= high)``, non-integer values included.
+    """
+
+    def __init__(self, bands):
+        self.names = list(bands)
+        self.index = {name: column for column, name in enumerate(self.names)}
+        self.bounds = np.unique([bound for band in bands.values() for bound in band]).astype(float)
+        # Each value falls into a cell: odd cells are equal to a bound, even cells are strictly between two bounds, or outside them
+        self.cell_count = 2 * len(self.bounds) + 1
+        self.membership = np.zeros((self.cell_count, len(self.names)), dtype = np.int64)
+        for column, (low, high) in enumerate(bands.values()):
+            self.membership[2 * np.searchsorted(self.bounds, low) + 1:2 * np.searchsorted(self.bounds, high) + 2, column] = 1
+        self._counts = weakref.WeakKeyDictionary()
+
+    def cells(self, values):
+        """
+        Returns the cell of each value: values equal to the i-th bound get the cell ``2 * i + 1``, values strictly between the i-th and the next bound get ``2 * i + 2``.
+        """
+        return np.searchsorted(self.bounds, values, side = 'left') + np.searchsorted(self.bounds, values, side = 'right')
+
+    def count(self, population, values, where = None, cache_key = None):
+        """
+        Counts the members of each group of ``population`` whose value is in each band.
+
+        :param values: The values of the members, e.g. their age.
+        :param where: If given, only counts the members for which ``where`` is ``True``, e.g. the children.
+        :param cache_key: If given, e.g. the names of the variables of ``values`` and ``where`` and their period, the matrix is computed once per simulation of ``population`` for this key, and then shared: it must not be modified.
+            As for the variables cached by the simulation, values set again after the first call, e.g. with ``set_input``, are not taken into account: the matrix is only computed again in a new simulation.
+        :returns: An integer matrix of shape ``(population.count, len(bands))``, whose columns are in the order of ``names``.
+
+        Example:
+
+        >>> alter, kind = household.members('alter', period), household.members('kind', period)
+        >>> counts = ALTERSGRUPPEN_KINDER.count(household, alter, where = kind, cache_key = ('alter', 'kind', period))
+        >>> counts[:, ALTERSGRUPPEN_KINDER.index['0_6']]  # Number of children from 0 to 6 years old in each household
+        """
+        if cache_key is not None:
+            counts_by_key = self._counts.setdefault(population.simulation, {})
+            cache_key = (population.entity.key, cache_key)
+            counts = counts_by_key.get(cache_key)
+            if counts is not None:
+                return counts
+
+        cells = self.cells(values)
+        members_entity_id = population.members_entity_id
+        if where is not None:
+            cells, members_entity_id = cells[where], members_entity_id[where]
+        histogram = np.bincount(
+            members_entity_id * self.cell_count + cells,
+            minlength = population.count * self.cell_count,
+            ).reshape(population.count, self.cell_count)
+        counts = histogram @ self.membership
+        if cache_key is not None:
+            counts_by_key[cache_key] = counts
+        return counts
+
+
+def instantiate_entities(tax_benefit_system):
+    """
+    Returns the populations of the entities of ``tax_benefit_system``: a :any:`PersonPopulation`, and :any:`IndexedGroupPopulation` for the group entities.
+
+    The systems built with the entities of :any:`build_entity` return these populations from ``tax_benefit_system.instantiate_entities()``.
+    """
+    person = tax_benefit_system.person_entity
+    members = PersonPopulation(person)
+    populations = {person.key: members}
+    for entity in tax_benefit_system.group_entities:
+        populations[entity.key] = IndexedGroupPopulation(entity, members)
+    return populations
+
+
+class PersonEntity(Entity):
+    """
+    A person entity, which makes the tax and benefit systems it belongs to create the populations of :any:`instantiate_entities`.
+
+    OpenFisca-Core creates the populations in ``TaxBenefitSystem.instantiate_entities``, which reforms inherit from OpenFisca-Core rather than from the country system.
+    The entities however are copied into every system, reforms and clones included, and told which system they belong to.
+    """
+
+    def set_tax_benefit_system(self, tax_benefit_system):
+        super().set_tax_benefit_system(tax_benefit_system)
+        tax_benefit_system.instantiate_entities = functools.partial(instantiate_entities, tax_benefit_system)
+
+
+def build_entity(key, plural, label, doc = "", roles = None, is_person = False):
+    """
+    Builds an entity as ``openfisca_core.entities.build_entity`` does, whose tax and benefit systems create :any:`PersonPopulation` and :any:`IndexedGroupPopulation`, see :any:`PersonEntity`.
+    """
+    if is_person:
+        return PersonEntity(key, plural, label, doc)
+    return GroupEntity(key, plural, label, doc, roles)
@@ -0,0 +1,177 @@
+# -*- coding: utf-8 -*-
+
+# This file profiles the calculations of simulations, variable by variable.
+# OpenFisca-Core's `FullTracer` keeps every intermediate result in a tree, which is too heavy for large populations or for a web server, and only times whole calculations.
+# Here, a tracer records, for each variable and period, the number of calculations, how many were read from the cache, the time spent in the formula itself, excluding its dependencies, and the bytes of the results computed.
+# It also records the self time of each stack of calculations, which can be written as collapsed stacks, the input format of flame graph tools such as `flamegraph.pl` or speedscope.
+# Profiling is opt-in: a simulation is only profiled once attached to a `Profiler`, e.g. with `build_simulation(..., profiler = profiler)`.
+
+import threading
+import time
+
+from openfisca_core.tracers import SimpleTracer
+
+from openfisca_germany.storage import is_stored
+
+
+# Columns of the profile tables, which can be sorted by
+COLUMNS = ['calls', 'hits', 'misses', 'self_time', 'total_time', 'bytes']
+
+
+def get_frame_name(name, period):
+    return '{}<{}>'.format(name, period)
+
+
+class ProfilingTracer(SimpleTracer):
+    """
+    A tracer recording the calculations of one simulation, and adding them to ``profiler`` at the end of each calculation requested directly.
+    """
+
+    def __init__(self, profiler, simulation):
+        super().__init__()
+        self.profiler = profiler
+        self.simulation = simulation
+        self.stats = {}
+        self.stacks = {}
+
+    def record_calculation_start(self, variable, period):
+        # OpenFisca-Core does not tell tracers whether the formula ran: a calculation is a hit if its value is already stored, which is checked without reading it
+        cached = period is not None and is_stored(self.simulation.get_holder(variable), period)
+        self.stack.append({'name': variable, 'period': period, 'hit': cached, 'bytes': 0, 'children_time': 0., 'start': time.perf_counter()})
+
+    def record_calculation_result(self, value):
+        frame = self.stack[-1]
+        if not frame['hit']:
+            frame['bytes'] = getattr(value, 'nbytes', 0)
+
+    def record_calculation_end(self):
+        end = time.perf_counter()
+        frame = self.stack[-1]
+        total_time = end - frame['start']
+        self_time = total_time - frame['children_time']
+        key = (frame['name'], str(frame['period']))
+        stack = tuple((parent['name'], str(parent['period'])) for parent in self.stack)
+        self.stack.pop()
+
+        stats = self.stats.get(key)
+        if stats is None:
+            stats = self.stats[key] = dict.fromkeys(COLUMNS, 0)
+        stats['calls'] += 1
+        stats['hits' if frame['hit'] else 'misses'] += 1
+        stats['self_time'] += self_time
+        stats['total_time'] += total_time
+        stats['bytes'] += frame['bytes']
+        self.stacks[stack] = self.stacks.get(stack, 0.) + self_time
+
+        if self.stack:
+            self.stack[-1]['children_time'] += total_time
+        else:
+            self.profiler.merge(self.stats, self.stacks)
+            self.stats = {}
+            self.stacks = {}
+
+
+class Profiler(object):
+    """
+    Profiles the calculations of the simulations attached to it, variable by variable.
+
+    ``stats`` gives, by (variable name, period), the number of ``calls`` to ``calculate``, how many were read from the cache (``hits``) or computed (``misses``), the ``self_time`` spent in the formula, excluding the calculations of its dependencies, the ``total_time`` including them, in seconds, and the ``bytes`` of the results computed.
+    ``stacks`` gives the self time of each stack of (variable name, period) calculations.
+
+    A profiler can be shared by several simulations, including simulations running in several threads, e.g. in a web server.
+
+    Example:
+
+    >>> profiler = Profiler()
+    >>> simulation = build_simulation(tax_benefit_system, survey, 2019, profiler = profiler)
+    >>> simulation.calculate('arbeitsl_geld_2_eink_hh', 2019)
+    >>> print(profiler.format_table(limit = 10))
+    >>> profiler.write_collapsed_stacks('alg2.folded')  # Then e.g. flamegraph.pl alg2.folded > alg2.svg
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.stacks = {}
+        self._lock = threading.Lock()
+
+    def attach(self, simulation):
+        """
+        Profiles the calculations of ``simulation``, and returns it.
+
+        Setting ``simulation.trace`` replaces the tracer of the profiler: the simulation is not profiled anymore.
+        """
+        simulation.tracer = ProfilingTracer(self, simulation)
+        return simulation
+
+    def merge(self, stats, stacks):
+        """
+        Adds ``stats`` and ``stacks``, e.g. recorded by another profiler, to the ones of this profiler.
+        """
+        with self._lock:
+            for key, values in stats.items():
+                totals = self.stats.get(key)
+                if totals is None:
+                    self.stats[key] = dict(values)
+                else:
+                    for name, value in values.items():
+                        totals[name] += value
+            for stack, self_time in stacks.items():
+                self.stacks[stack] = self.stacks.get(stack, 0.) + self_time
+
+    def clear(self):
+        with self._lock:
+            self.stats = {}
+            self.stacks = {}
+
+    def get_table(self, sort_by = 'self_time', by_period = True):
+        """
+        Returns the stats of each variable, as a list of dicts, in decreasing order of ``sort_by``, one of :any:`COLUMNS`.
+
+        :param by_period: If ``False``, the stats of all the periods of a variable are added up. The total time of a variable computed for a period from other periods of itself, e.g. a yearly value from monthly ones, then counts these calculations twice.
+        """
+        if sort_by not in COLUMNS:
+            raise ValueError("Cannot sort by '{}'. Columns are: {}.".format(sort_by, ', '.join(COLUMNS)))
+        with self._lock:
+            rows = {}
+            for (name, period), values in self.stats.items():
+                key = (name, period) if by_period else (name, None)
+                row = rows.get(key)
+                if row is None:
+                    rows[key] = dict(values, variable = name, period = key[1])
+                else:
+                    for column in COLUMNS:
+                        row[column] += values[column]
+        return sorted(rows.values(), key = lambda row: row[sort_by], reverse = True)
+
+    def format_table(self, sort_by = 'self_time', by_period = True, limit = None):
+        """
+        Returns the stats of each variable, as a text table, in decreasing order of ``sort_by``.
+
+        :param limit: Maximum number of variables shown.
+        """
+        lines = ["{:<40} {:>10} {:>8} {:>8} {:>8} {:>12} {:>12} {:>10}".format('variable', 'period', 'calls', 'hits', 'misses', 'self ms', 'total ms', 'MB')]
+        for row in self.get_table(sort_by, by_period)[:limit]:
+            lines.append("{:<40} {:>10} {:8d} {:8d} {:8d} {:12.2f} {:12.2f} {:10.2f}".format(
+                row['variable'], row['period'] or '', row['calls'], row['hits'], row['misses'],
+                row['self_time'] * 1e3, row['total_time'] * 1e3, row['bytes'] / 1e6))
+        return '\n'.join(lines)
+
+    def get_collapsed_stacks(self, by_period = False):
+        """
+        Returns the self time of each stack of calculations, in microseconds, as collapsed stacks: one line per stack, e.g. ``arbeitsl_geld_2_eink_hh<2019>;eink_anr_frei<2019> 1520``.
+
+        :param by_period: If ``False``, the frames only name the variables, so that the calculations of all the periods of a variable are merged in the flame graph.
+        """
+        with self._lock:
+            stacks = {}
+            for stack, self_time in self.stacks.items():
+                names = ';'.join(get_frame_name(name, period) if by_period else name for name, period in stack)
+                stacks[names] = stacks.get(names, 0.) + self_time
+        return ''.join('{} {}\n'.format(names, round(self_time * 1e6)) for names, self_time in sorted(stacks.items()))
+
+    def write_collapsed_stacks(self, path, by_period = False):
+        """
+        Writes the collapsed stacks of :any:`get_collapsed_stacks` to ``path``, which flame graph tools such as ``flamegraph.pl`` or speedscope read.
+        """
+        with open(path, 'w') as collapsed_file:
+            collapsed_file.write(self.get_collapsed_stacks(by_period))
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+
+# This file defines a faster evaluation of the marginal rate scales of the legislation, such as `taxes.eink_anr_frei` or `taxes.social_security_contribution`.
+# OpenFisca-Core computes a marginal rate scale with a (persons x brackets) matrix: every person is compared to every bracket.
+# Here, the thresholds and rates of a scale are compiled once into arrays, along with the cumulative amount at each threshold.
+# As the amount is piecewise linear in the base, it is then interpolated between the thresholds, in a single pass over the bases.
+
+import numpy as np
+
+from openfisca_core.parameters import Scale
+from openfisca_core.taxscales import MarginalRateTaxScale
+
+
+class CompiledMarginalRateTaxScale(MarginalRateTaxScale):
+    """
+    A :any:`MarginalRateTaxScale` whose ``calc`` uses compiled arrays, with the same results.
+
+    The arrays are compiled on the first calculation, and compiled again if the brackets of the scale change.
+    Calculations rounding the base (``round_base_decimals``) or using a factor per person are left to ``MarginalRateTaxScale``.
+    """
+
+    @classmethod
+    def from_scale(cls, scale):
+        compiled = cls(name = scale.name, option = scale.option, unit = scale.unit)
+        compiled.thresholds = scale.thresholds
+        compiled.rates = scale.rates
+        return compiled
+
+    def compile(self, factor = 1.0):
+        """
+        Returns the thresholds, the rates, and the cumulative amount at each threshold of the scale, with thresholds multiplied by ``factor``.
+        """
+        key = (tuple(self.thresholds), tuple(self.rates), factor)
+        compiled = getattr(self, '_compiled', None)
+        if compiled is None or compiled[0] != key:
+            # Thresholds are multiplied by the same factor as in `MarginalRateTaxScale.calc`
+            thresholds = np.array(self.thresholds, dtype = float) * (factor + np.finfo(np.float_).eps)
+            rates = np.array(self.rates, dtype = float)
+            cumulative_amounts = np.concatenate([[0], np.cumsum(rates[:-1] * np.diff(thresholds))])
+            compiled = self._compiled = (key, (thresholds, rates, cumulative_amounts))
+        return compiled[1]
+
+    def calc(self, tax_base, factor = 1.0, round_base_decimals = None):
+        if round_base_decimals is not None or not np.isscalar(factor) or len(self.thresholds) == 0:
+            return super().calc(tax_base, factor, round_base_decimals)
+
+        thresholds, rates, cumulative_amounts = self.compile(factor)
+        tax_base = np.asarray(tax_base, dtype = float)
+        # The amount is piecewise linear between thresholds, and the last rate applies above the last threshold
+        amounts = np.interp(tax_base, thresholds, cumulative_amounts)
+        amounts += rates[-1] * np.maximum(tax_base - thresholds[-1], 0)
+        return amounts
+
+
+class CompiledScale(Scale):
+    """
+    A :any:`Scale` parameter whose marginal rate scales at instant are :any:`CompiledMarginalRateTaxScale`.
+
+    Scales at instant are cached by the tax and benefit system, so each one is compiled at most once per instant.
+    Reforms modifying the brackets of the scale get new scales at instant, which are compiled again.
+    """
+
+    def _get_at_instant(self, instant):
+        scale = super()._get_at_instant(instant)
+        if type(scale) is MarginalRateTaxScale:
+            return CompiledMarginalRateTaxScale.from_scale(scale)
+        return scale
+
+
+def compile_scales(parameters):
+    """
+    Makes the :any:`Scale` parameters of a parameter tree compute their marginal rate scales with :any:`CompiledMarginalRateTaxScale`.
+
+    :returns: ``parameters``, modified in place.
+    """
+    for descendant in parameters.get_descendants():
+        if type(descendant) is Scale:
+            descendant.__class__ = CompiledScale
+    return parameters
@@ -13,5 +13,15 @@ def parse(file_name):
         return json.loads(file.read())
 
 
-single = parse('single.json')
-couple = parse('couple.json')
+# The example situations are parsed the first time they are accessed, e.g. with `from openfisca_germany.situation_examples import couple`
+EXAMPLES = {
+    'single': 'single.json',
+    'couple': 'couple.json',
+    }
+
+
+def __getattr__(name):
+    if name not in EXAMPLES:
+        raise AttributeError("module '{}' has no attribute '{}'".format(__name__, name))
+    situation = globals()[name] = parse(EXAMPLES[name])
+    return situation
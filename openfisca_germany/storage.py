@@ -0,0 +1,167 @@
+# -*- coding: utf-8 -*-
+
+# This file defines storage profiles, which choose the dtypes in which the values of variables are stored.
+# OpenFisca-Core stores floats in float32, integers in int32 and booleans in one byte per value.
+# On very large populations, memory is the binding limit: the lean profile stores counts and ages in int8 or int16, and flags packed in bits.
+# The reference profile stores floats in float64, to validate the results of the other profiles, see `openfisca_germany.microsimulation.validation`.
+# Inputs can also be read-only views of memory-mapped files, see `openfisca_germany.microsimulation.mapped`: they are stored without copy, and are not counted as memory owned by the simulation.
+
+import copy
+
+import numpy as np
+
+from openfisca_core import periods
+from openfisca_core.data_storage import InMemoryStorage
+from openfisca_core.periods import ETERNITY
+from openfisca_core.reforms import Reform
+
+
+class PackedBoolStorage(InMemoryStorage):
+    """
+    An in-memory storage of boolean arrays, packed in bits: each value takes 1 bit instead of 1 byte.
+
+    Arrays are unpacked each time they are read.
+    """
+
+    def get(self, period):
+        packed = super().get(period)
+        if packed is None:
+            return None
+        bits, length = packed
+        return np.unpackbits(bits, count = length).view(bool)
+
+    def put(self, value, period):
+        super().put((np.packbits(value), len(value)), period)
+
+    def get_memory_usage(self):
+        if not self._arrays:
+            return super().get_memory_usage()
+        return dict(
+            nb_arrays = len(self._arrays),
+            total_nb_bytes = sum(bits.nbytes for bits, _ in self._arrays.values()),
+            cell_size = 1 / 8,
+            )
+
+
+def is_mapped(array):
+    """
+    Returns ``True`` if ``array`` is a read-only view of memory it does not own, such as a memory-mapped file or an Arrow buffer.
+    """
+    return isinstance(array, np.ndarray) and not array.flags.writeable and not array.flags.owndata
+
+
+class MappedStorage(InMemoryStorage):
+    """
+    An in-memory storage that stores arrays by reference, and tells the arrays it owns apart from read-only views of mapped memory, see :any:`is_mapped`.
+
+    Mapped arrays are shared with the file they are read from, and with the other processes mapping it: they are counted in ``mapped_nb_bytes``, not in ``total_nb_bytes``.
+    """
+
+    def get_memory_usage(self):
+        if not self._arrays:
+            return dict(super().get_memory_usage(), mapped_nb_bytes = 0)
+        arrays = list(self._arrays.values())
+        return dict(
+            nb_arrays = len(arrays),
+            total_nb_bytes = sum(array.nbytes for array in arrays if not is_mapped(array)),
+            mapped_nb_bytes = sum(array.nbytes for array in arrays if is_mapped(array)),
+            cell_size = arrays[0].itemsize,
+            )
+
+
+def is_stored(holder, period):
+    """
+    Returns ``True`` if ``holder`` has a value for ``period``, so that calculating it reads the cache, without reading the value: packed arrays are not unpacked.
+    """
+    if holder.variable.is_neutralized:
+        return True
+    if holder.variable.definition_period == ETERNITY:
+        period = periods.period(ETERNITY)
+    return period in holder.get_known_periods()
+
+
+def create_storage(variable):
+    """
+    Returns the in-memory storage of the values of ``variable``: packed in bits if its storage profile packs it, as in :any:`lean_storage`, and able to store mapped arrays otherwise.
+    """
+    storage_class = PackedBoolStorage if getattr(variable, 'packed', False) else MappedStorage
+    return storage_class(is_eternal = (variable.definition_period == ETERNITY))
+
+
+class StorageProfile(Reform):
+    """
+    A reform that only changes how the values of variables are stored, not how they are computed.
+
+    - ``dtypes_by_value_type`` maps value types, e.g. ``int``, to the dtype of the variables of this type;
+    - ``dtypes_by_variable`` maps variable names to their dtype, and overrides ``dtypes_by_value_type``;
+    - if ``pack_flags`` is ``True``, boolean variables are packed in bits, in simulations built with ``build_simulation``.
+
+    The values of variables are cast to their new dtype when they are set or computed: narrow dtypes must be validated against a reference run.
+    """
+    dtypes_by_value_type = {}
+    dtypes_by_variable = {}
+    pack_flags = False
+
+    def apply(self):
+        for name in list(self.variables):
+            variable = self.get_variable(name)
+            dtype = self.dtypes_by_variable.get(name, self.dtypes_by_value_type.get(variable.value_type))
+            packed = self.pack_flags and variable.value_type == bool
+            if dtype is None and not packed:
+                continue
+            variable = copy.copy(variable)
+            if dtype is not None:
+                variable.dtype = np.dtype(dtype)
+            variable.packed = packed
+            self.variables[name] = variable
+
+
+class lean_storage(StorageProfile):
+    """
+    Stores counts and ages in int8, years and other integers in int16, and flags packed in bits. Amounts stay in float32.
+
+    Non-integer ages are truncated.
+    """
+    name = "Memory-lean storage of counts, ages and flags"
+    dtypes_by_value_type = {int: np.int16}
+    dtypes_by_variable = {
+        'age': np.int8,
+        'alter': np.int8,
+        'anz_erwachsene_hh': np.int8,
+        '_anz_erwachsene_tu': np.int8,
+        'anz_kinder_hh': np.int8,
+        'anz_kind_zwischen_0_6_hh': np.int8,
+        'anz_kind_zwischen_0_15_hh': np.int8,
+        'jahr': np.int16,
+        }
+    pack_flags = True
+
+
+class reference_storage(StorageProfile):
+    """
+    Stores floats in float64, for reference runs.
+    """
+    name = "Float64 storage of amounts"
+    dtypes_by_value_type = {float: np.float64}
+
+
+def get_storage_usage(simulation):
+    """
+    Returns the number of bytes stored by the holders of ``simulation``, by variable name. Mapped arrays are not counted, see :any:`get_mapped_usage`.
+    """
+    usage = {}
+    for population in simulation.populations.values():
+        for name, holder_usage in population.get_memory_usage()['by_variable'].items():
+            usage[name] = holder_usage['total_nb_bytes']
+    return usage
+
+
+def get_mapped_usage(simulation):
+    """
+    Returns the number of bytes of the mapped arrays stored by the holders of ``simulation``, by variable name.
+    """
+    usage = {}
+    for population in simulation.populations.values():
+        for name, holder_usage in population.get_memory_usage()['by_variable'].items():
+            usage[name] = holder_usage.get('mapped_nb_bytes', 0)
+    return usage
@@ -0,0 +1,69 @@
+# -*- coding: utf-8 -*-
+
+# This file defines a process-wide factory for tax and benefit systems.
+# Building a tax and benefit system loads every variable and parameter, and applying a reform copies its baseline.
+# Callers that only compute with a system, and never modify it, should share the instances returned here instead of building their own.
+
+from inspect import isclass
+import threading
+from types import MappingProxyType
+
+from openfisca_core.reforms import Reform
+
+from openfisca_germany import CountryTaxBenefitSystem
+
+
+_tax_benefit_systems = {}
+_lock = threading.RLock()
+
+
+def _freeze(tax_benefit_system):
+    # A read-only view of the variables prevents adding, updating or neutralizing variables in place.
+    # `clone()` and reforms copy this view into a regular dict, so they stay modifiable.
+    # Parameters are not protected: `clone()` and `modify_parameters` copy them, but a shared system's parameter tree can still be edited in place.
+    tax_benefit_system.variables = MappingProxyType(tax_benefit_system.variables)
+    return tax_benefit_system
+
+
+def get_tax_benefit_system(*reforms):
+    """
+    Returns the shared tax and benefit system with the given reforms applied, in order.
+
+    The base system is built once per process, and each reformed system once per ordered tuple of reforms.
+    Reformed systems reuse the shared system of their prefix: ``get_tax_benefit_system(A, B)`` applies ``B`` to ``get_tax_benefit_system(A)``.
+
+    The returned systems are shared and must not be modified. Only their variables are read-only: their parameters are not protected, and an edit of a shared system's parameters, e.g. with ``update``, would affect every other user of the system.
+    Use ``clone()`` or apply a reform, e.g. with ``modify_parameters``, to get a system whose variables and parameters can be modified.
+
+    :param reforms: Reform classes, e.g. ``openfisca_germany.reforms.removal_basic_income.removal_basic_income``.
+
+    Example:
+
+    >>> from openfisca_germany.reforms.flat_social_security_contribution import flat_social_security_contribution
+    >>> reformed_tax_benefit_system = get_tax_benefit_system(flat_social_security_contribution)
+    """
+    key = tuple(reforms)
+    tax_benefit_system = _tax_benefit_systems.get(key)
+    if tax_benefit_system is not None:
+        return tax_benefit_system
+
+    with _lock:
+        tax_benefit_system = _tax_benefit_systems.get(key)
+        if tax_benefit_system is None:
+            for reform in key:
+                if not (isclass(reform) and issubclass(reform, Reform)):
+                    raise ValueError('`{}` does not seem to be a valid Openfisca reform.'.format(reform))
+            if key:
+                tax_benefit_system = key[-1](get_tax_benefit_system(*key[:-1]))
+            else:
+                tax_benefit_system = CountryTaxBenefitSystem()
+            _tax_benefit_systems[key] = _freeze(tax_benefit_system)
+    return tax_benefit_system
+
+
+def clear_tax_benefit_systems():
+    """
+    Forgets all the shared tax and benefit systems, so that the next calls to :any:`get_tax_benefit_system` rebuild them.
+    """
+    with _lock:
+        _tax_benefit_systems.clear()
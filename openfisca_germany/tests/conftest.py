@@ -0,0 +1,19 @@
+import os
+
+import pandas as pd
+import pytest
+
+from openfisca_germany.microsimulation import generate_population
+from openfisca_germany.parameter_cache import CACHE_DIR_ENVIRONMENT_VARIABLE
+
+
+# Tests never read nor write compiled parameters in the user cache directory. Tests of the cache set their own directory.
+os.environ[CACHE_DIR_ENVIRONMENT_VARIABLE] = ''
+
+
+@pytest.fixture
+def survey():
+    # Synthetic households whose members are in consecutive rows, with identifiers that are neither 0-based nor contiguous
+    survey = pd.DataFrame(generate_population(40, seed = 1))
+    survey['hh_id'] = survey['tu_id'] = survey['hh_id'] * 3 + 100
+    return survey
@@ -1,12 +1,10 @@
-from pathlib import Path
-import itertools
+import os
 
-from openfisca_germany import CountryTaxBenefitSystem
-from openfisca_core.simulation_builder import SimulationBuilder
-from openfisca_core.simulations import Simulation
+from openfisca_germany.legislation_dates import DatedSimulation
+from openfisca_germany.microsimulation import compare_with_reference, format_differences
+from openfisca_germany.systems import get_tax_benefit_system
 
 import numpy as np
-from numpy.testing import assert_allclose
 import pandas as pd
 import pytest
 
@@ -57,56 +55,45 @@ OUT_COLS = [
 
 YEARS = [2005, 2006, 2009, 2011, 2013, 2016, 2019]
 
+# Set this environment variable to the path of the golden data of gettsim, `gettsim/tests/test_data/test_dfs_alg2.csv`, to run `test_alg2` and `test_alg2_in_one_simulation`
+TEST_DATA_ENVIRONMENT_VARIABLE = "GETTSIM_ALG2_TEST_DATA"
+
 
 @pytest.fixture(scope="module")
 def input_data():
-    return pd.read_csv(Path("/home/thomas/repos/gettsim/gettsim") / "tests" / "test_data" / "test_dfs_alg2.csv")
-
-
-@pytest.mark.parametrize("year, column", itertools.product(YEARS, OUT_COLS))
-def test_alg2(input_data, year, column):
-    year_data = input_data[input_data["jahr"] == year]
-    tax_benefit_system = CountryTaxBenefitSystem()
-    tbs = tax_benefit_system
-
-    id_map = {
-        'person': 'p_id',
-        'household': 'hh_id',
-        'tax_unit': 'tu_id',
-    }
-
-    role_map = {
-        'household': lambda p: p['vorstand_tu'].replace({True: 'parents', False: 'children'}),
-        'tax_unit': lambda p: p['vorstand_tu'].replace({True: 'heads', False: 'others'})
-    }
-
-    def get(data, tbs, id_map, entity):
-        columns = [c for c in INPUT_COLS if tbs.get_variable(c, check_existence = True).entity.key == entity]
-        return data[[id_map[entity]] + columns].rename(index=str, columns={id_map[entity]: "id"}).drop_duplicates().reset_index(drop=True)
-
-
-    simulation = Simulation(tax_benefit_system, tax_benefit_system.instantiate_entities())
-
-    for e in ['person', 'household', 'tax_unit']:
-        data = get(year_data, tbs, id_map, e)
-        p = simulation.populations[e]
-        p.count = len(data['id'])
-        p.ids = data['id']
-        for c in data.columns:
-            if (c in ['id']):
-                continue
-            h = p.get_holder(c)
-            h.set_input(year, data[c])
-
-    for (k, v) in role_map.items():
-        gg = simulation.populations[k]
-        # members_entity_id are not IDs but indexes
-        # gg.members_entity_id = year_data[id_map[k]]
-        gg.members_entity_id = np.searchsorted(simulation.populations[k].ids, year_data[id_map[k]])
-        gg.members_role = v(year_data)
-
-    c_variable = tax_benefit_system.get_variable(column, check_existence = True)
-    actual = simulation.calculate(column, year)
-    expected = year_data[[id_map[c_variable.entity.key], column]].drop_duplicates()[column].values    
-
-    assert_allclose(actual, expected, atol=0.01)
+    path = os.environ.get(TEST_DATA_ENVIRONMENT_VARIABLE)
+    if not path:
+        pytest.skip("{} is not set to the path of the golden data of gettsim".format(TEST_DATA_ENVIRONMENT_VARIABLE))
+    return pd.read_csv(path)
+
+
+def get_reference(data):
+    return data.assign(
+        household_role = np.where(data["vorstand_tu"], "parents", "children"),
+        tax_unit_role = np.where(data["vorstand_tu"], "heads", "others"),
+        )
+
+
+@pytest.mark.parametrize("year", YEARS)
+def test_alg2(input_data, year):
+    # Reference check: one simulation per year, with the legislation of this year
+    reference = get_reference(input_data[input_data["jahr"] == year])
+
+    differences = compare_with_reference(get_tax_benefit_system(), reference, year, OUT_COLS, input_columns = INPUT_COLS)
+
+    assert not differences, format_differences(differences)
+
+
+def test_alg2_in_one_simulation(input_data):
+    data = input_data[input_data["jahr"].isin(YEARS)]
+    # Identifiers are only unique within a year: the whole dataset is simulated at once, each row with the legislation of its year
+    year = data["jahr"].astype(int).astype(str) + "-"
+    reference = get_reference(data.assign(
+        p_id = year + data["p_id"].astype(str),
+        hh_id = year + data["hh_id"].astype(str),
+        tu_id = year + data["tu_id"].astype(str),
+        ))
+
+    differences = compare_with_reference(get_tax_benefit_system(), reference, max(YEARS), OUT_COLS, input_columns = INPUT_COLS, simulation_class = DatedSimulation)
+
+    assert not differences, format_differences(differences)
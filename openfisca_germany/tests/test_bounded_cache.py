@@ -0,0 +1,49 @@
+from functools import partial
+
+from numpy.testing import assert_allclose
+import pytest
+
+from openfisca_germany.bounded_cache import BoundedCacheSimulation
+from openfisca_germany.microsimulation import build_simulation
+from openfisca_germany.storage import get_storage_usage
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+OUTPUTS = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh']
+
+
+def get_computed_variables(simulation):
+    # Variables with a formula whose holder still stores a value
+    variables = simulation.tax_benefit_system.variables
+    return {name for name, nbytes in get_storage_usage(simulation).items() if nbytes and variables[name].formulas}
+
+
+@pytest.mark.parametrize('year', [2005, 2019])
+def test_only_outputs_are_kept(survey, year):
+    tax_benefit_system = get_tax_benefit_system()
+    simulation = build_simulation(tax_benefit_system, survey, year, simulation_class = partial(BoundedCacheSimulation, outputs = OUTPUTS))
+    expected = build_simulation(tax_benefit_system, survey, year)
+
+    for variable in OUTPUTS:
+        assert_allclose(simulation.calculate(variable, year), expected.calculate(variable, year))
+    assert get_computed_variables(simulation) == set(OUTPUTS)
+    assert simulation.get_array('bruttolohn_m', year) is not None  # Inputs are kept
+    assert simulation.cache_stats['evicted'] > 0
+
+    # Dropped intermediates are computed again
+    assert_allclose(simulation.calculate('miete_pro_qm_hh', year), expected.calculate('miete_pro_qm_hh', year))
+    assert_allclose(simulation.calculate('_arbeitsl_geld_2_brutto_eink', year), expected.calculate('_arbeitsl_geld_2_brutto_eink', year))
+
+
+def test_memory_budget(survey):
+    tax_benefit_system = get_tax_benefit_system()
+    budget = 4 * len(survey)
+    simulation = build_simulation(tax_benefit_system, survey, 2019, simulation_class = partial(BoundedCacheSimulation, memory_budget = budget))
+    expected = build_simulation(tax_benefit_system, survey, 2019)
+
+    for variable in OUTPUTS:
+        assert_allclose(simulation.calculate(variable, 2019), expected.calculate(variable, 2019))
+        usage = get_storage_usage(simulation)
+        assert sum(usage[name] for name in get_computed_variables(simulation) - set(OUTPUTS)) <= budget
+    assert simulation.cache_stats['evicted'] > 0
+    assert simulation.cache_stats['misses'] > simulation.cache_stats['evicted']
@@ -0,0 +1,114 @@
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pandas as pd
+import pytest
+
+from openfisca_core.simulation_builder import SimulationBuilder
+
+from openfisca_germany.microsimulation import build_simulation
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+@pytest.fixture
+def tax_benefit_system():
+    return get_tax_benefit_system()
+
+
+@pytest.fixture
+def table():
+    # Two households, listed in no particular order: a couple with two children, and a single parent with one child
+    return pd.DataFrame({
+        'p_id': [10, 11, 20, 12, 21, 13],
+        'hh_id': [7, 7, 3, 7, 3, 7],
+        'tu_id': [7, 7, 3, 7, 3, 7],
+        'household_role': ['parent', 'parent', 'parent', 'child', 'child', 'child'],
+        'tax_unit_role': ['head', 'head', 'head', 'other', 'other', 'other'],
+        'kind': [False, False, False, True, True, True],
+        'alter': [40., 38., 30., 5., 9., 16.],
+        'alleinerziehend': [False, False, True, False, False, False],
+        'bruttolohn_m': [1000., 500., 300., 0., 0., 0.],
+        'kaltmiete_m_hh': [600., 600., 400., 600., 400., 600.],
+        'heizkosten_m_hh': [100., 100., 50., 100., 50., 100.],
+        'wohnfläche_hh': [90., 90., 60., 90., 60., 90.],
+        'bewohnt_eigentum_hh': [False, False, False, False, False, False],
+        'eink_st_tu': [0., 0., 0., 0., 0., 0.],
+        'soli_st_tu': [0., 0., 0., 0., 0., 0.],
+        })
+
+
+def build_from_entities(tax_benefit_system, table, year):
+    # Groups are declared in the order of their ids, as in build_simulation
+    persons = {}
+    households = {str(hh_id): {'parents': [], 'children': []} for hh_id in sorted(table['hh_id'].unique())}
+    tax_units = {str(tu_id): {'heads': [], 'others': []} for tu_id in sorted(table['tu_id'].unique())}
+    for row in table.to_dict('records'):
+        person_id = str(row['p_id'])
+        persons[person_id] = {}
+        household = households[str(row['hh_id'])]
+        household['parents' if row['household_role'] == 'parent' else 'children'].append(person_id)
+        tax_unit = tax_units[str(row['tu_id'])]
+        tax_unit['heads' if row['tax_unit_role'] == 'head' else 'others'].append(person_id)
+        for name, value in row.items():
+            variable = tax_benefit_system.get_variable(name)
+            if variable is None:
+                continue
+            target = {'person': persons[person_id], 'household': household, 'tax_unit': tax_unit}[variable.entity.key]
+            target[name] = {str(year): value}
+    return SimulationBuilder().build_from_entities(tax_benefit_system, {
+        'persons': persons,
+        'households': households,
+        'tax_units': tax_units,
+        })
+
+
+def test_populations(tax_benefit_system, table):
+    simulation = build_simulation(tax_benefit_system, table, 2019)
+    household = simulation.household
+
+    assert_array_equal(simulation.persons.ids, table['p_id'])
+    assert_array_equal(household.ids, [3, 7])
+    assert_array_equal(household.members_entity_id, [1, 1, 0, 1, 0, 1])
+    assert_array_equal(household.members_position, [0, 1, 0, 2, 1, 3])
+    assert [role.key for role in household.members_role] == ['first_parent', 'second_parent', 'first_parent', 'child', 'child', 'child']
+    assert_array_equal(simulation.tax_unit.nb_persons(), [2, 4])
+
+
+def test_group_inputs_are_read_from_the_first_member(tax_benefit_system, table):
+    simulation = build_simulation(tax_benefit_system, table, 2019)
+    assert_array_equal(simulation.calculate('kaltmiete_m_hh', 2019), [400, 600])
+    assert_array_equal(simulation.calculate('alter', 2019), table['alter'])
+
+
+@pytest.mark.parametrize('year', [2005, 2011, 2019])
+def test_same_results_as_simulation_builder(tax_benefit_system, table, year):
+    expected = build_from_entities(tax_benefit_system, table, year)
+    actual = build_simulation(tax_benefit_system, table, year)
+    for variable in ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink', 'arbeitsl_geld_2_eink_hh', 'kost_unterk_m_hh', 'eink_anr_frei']:
+        assert_allclose(actual.calculate(variable, year), expected.calculate(variable, year))
+
+
+def test_arrow_table(tax_benefit_system, table):
+    pyarrow = pytest.importorskip('pyarrow')
+    from_pandas = build_simulation(tax_benefit_system, table, 2019)
+    from_arrow = build_simulation(tax_benefit_system, pyarrow.Table.from_pandas(table), 2019)
+    assert_allclose(from_arrow.calculate('regelbedarf_m_hh', 2019), from_pandas.calculate('regelbedarf_m_hh', 2019))
+
+
+def test_explicit_input_columns(tax_benefit_system, table):
+    simulation = build_simulation(tax_benefit_system, table, 2019, input_columns = ['alter'])
+    assert simulation.get_array('bruttolohn_m', 2019) is None
+
+
+def test_invalid_roles(tax_benefit_system, table):
+    table['household_role'] = 'parent'
+    with pytest.raises(ValueError, match = 'at most 2 parents'):
+        build_simulation(tax_benefit_system, table, 2019)
+    table['household_role'] = 'grandparent'
+    with pytest.raises(ValueError, match = 'not a valid role'):
+        build_simulation(tax_benefit_system, table, 2019)
+
+
+def test_missing_group_ids(tax_benefit_system, table):
+    simulation = build_simulation(tax_benefit_system, table.drop(columns = ['tu_id', 'tax_unit_role']), 2019)
+    assert simulation.tax_unit.count == len(table)
+    assert_array_equal(simulation.tax_unit.members_entity_id, np.arange(len(table)))
@@ -0,0 +1,60 @@
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+
+from openfisca_germany.microsimulation import build_simulation, iter_chunks, iter_simulations, run_in_chunks
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+VARIABLES = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink', 'arbeitsl_geld_2_eink_hh']
+
+
+def pieces(survey, size):
+    return (survey.iloc[start:start + size] for start in range(0, len(survey), size))
+
+
+@pytest.mark.parametrize('piece_size', [1, 7, 1000])
+@pytest.mark.parametrize('chunk_size', [1, 5, 16])
+def test_chunks_never_split_households(survey, piece_size, chunk_size):
+    chunks = list(iter_chunks(pieces(survey, piece_size), chunk_size))
+    assert_array_equal(np.concatenate([chunk['p_id'] for chunk in chunks]), survey['p_id'])
+    households = [set(chunk['hh_id']) for chunk in chunks]
+    assert sum(len(ids) for ids in households) == survey['hh_id'].nunique()
+    for chunk, ids in zip(chunks, households):
+        assert len(chunk['p_id']) <= chunk_size or len(ids) == 1
+
+
+def test_same_results_as_a_single_simulation(survey):
+    tax_benefit_system = get_tax_benefit_system()
+    simulation = build_simulation(tax_benefit_system, survey, 2019)
+    assert len(list(iter_simulations(tax_benefit_system, pieces(survey, 7), 2019, chunk_size = 16))) > 5
+
+    pytest.importorskip('pyarrow')
+    batches = list(run_in_chunks(tax_benefit_system, pieces(survey, 7), 2019, VARIABLES, chunk_size = 16))
+    for variable in VARIABLES:
+        expected = simulation.calculate(variable, 2019)
+        if variable.endswith('_hh'):
+            expected = expected[simulation.household.members_entity_id]
+        assert_allclose(np.concatenate([batch.column(variable).to_numpy() for batch in batches]), expected)
+
+
+@pytest.mark.parametrize('piece_size', [3, 1000])
+def test_groups_in_non_consecutive_rows(survey, piece_size):
+    # The first person of the survey moves to the end: its household reappears after the other ones
+    shuffled = survey.iloc[np.roll(np.arange(len(survey)), -1)]
+    assert shuffled['hh_id'].iloc[0] == shuffled['hh_id'].iloc[-1]
+    with pytest.raises(ValueError, match = "group '{}' of the column 'hh_id' are not in consecutive rows".format(survey['hh_id'][0])):
+        list(iter_chunks(pieces(shuffled, piece_size), 16))
+
+
+def test_string_ids_across_tables(survey):
+    survey = survey.assign(hh_id = 'household-' + survey['hh_id'].astype(str), tu_id = 'unit-' + survey['tu_id'].astype(str))
+    assert sum(len(chunk['p_id']) for chunk in iter_chunks(pieces(survey, 5), 16)) == len(survey)
+
+
+@pytest.mark.parametrize('middle', [[2, 3, 4], [3, 3, 4]])
+def test_group_continued_then_reopened_in_a_later_table(middle):
+    # The household 2 continues from the first table into the second one, ends there, and reappears in the third one
+    tables = [{'p_id': np.arange(3), 'hh_id': np.array(hh_id)} for hh_id in [[1, 1, 2], middle, [2]]]
+    with pytest.raises(ValueError, match = "group '2' of the column 'hh_id' are not in consecutive rows"):
+        list(iter_chunks(tables, 2))
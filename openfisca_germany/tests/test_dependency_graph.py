@@ -0,0 +1,73 @@
+import json
+
+import pytest
+
+from openfisca_germany.dependency_graph import Dependency, build_dependency_graph, extract_formula_dependencies
+from openfisca_germany.incremental import RecordingSimulation
+from openfisca_germany.microsimulation import build_simulation
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+OUTPUTS = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh']
+
+
+@pytest.fixture(scope = 'module')
+def graph():
+    return build_dependency_graph(get_tax_benefit_system())
+
+
+def test_edges_record_projection_and_period(graph):
+    assert Dependency('total_taxes', 'housing_tax', 'formula', '', 'period.this_year') in graph.edges
+    assert Dependency('total_taxes', 'income_tax', 'formula', 'members', 'period') in graph.edges
+    assert Dependency('arbeitsl_geld_2_eink', 'eink_st_tu', 'formula', 'tax_unit', 'period') in graph.edges
+    # Dated formulas are parsed too
+    assert {edge.formula for edge in graph.edges if edge.variable == 'kindersatz_m_hh'} == {'formula', 'formula_2011'}
+
+
+def test_names_bound_to_strings_are_resolved(graph):
+    assert {'bruttolohn_m', 'elterngeld_m'} <= graph.dependencies('_arbeitsl_geld_2_brutto_eink')
+
+
+def test_period_arguments_are_read_from_the_source():
+    def formula(person, period, parameters):
+        return person('bruttolohn_m', period.offset(-1, 'month')) + person.household(
+            'kaltmiete_m_hh',
+            period.first_month,
+            ) * person('alter', period = period.this_year)
+
+    assert extract_formula_dependencies(formula) == [
+        ('bruttolohn_m', '', "period.offset(-1, 'month')"),
+        ('kaltmiete_m_hh', 'household', 'period.first_month'),
+        ('alter', '', 'period.this_year'),
+        ]
+
+
+def test_static_graph_covers_the_dependencies_of_a_calculation(survey, graph):
+    simulation = build_simulation(get_tax_benefit_system(), survey, 2019, simulation_class = RecordingSimulation)
+    for variable in OUTPUTS:
+        simulation.calculate(variable, 2019)
+
+    for (name, _), dependencies in simulation.dependencies.items():
+        assert {dependency for dependency, _ in dependencies} <= graph.dependencies(name)
+    assert {name for name, _ in simulation.computed} <= graph.required_variables(OUTPUTS)
+    assert graph.input_variables(OUTPUTS) >= {'alter', 'kind', 'bruttolohn_m', 'kaltmiete_m_hh'}
+
+
+def test_topological_order(graph):
+    order = graph.topological_order(OUTPUTS)
+    assert set(order) == graph.required_variables(OUTPUTS)
+    position = {name: index for index, name in enumerate(order)}
+    for edge in graph.prune(OUTPUTS).edges:
+        if edge.variable != edge.dependency:
+            assert position[edge.dependency] < position[edge.variable]
+    assert len(graph.topological_order()) == len(graph.variables)
+
+
+def test_export(graph):
+    pruned = graph.prune(['total_taxes'])
+    assert set(pruned.variables) == {'total_taxes', 'income_tax', 'social_security_contribution', 'housing_tax', 'salary', 'accommodation_size', 'housing_occupancy_status'}
+    edges = json.loads(pruned.to_json())['edges']
+    assert [edge['variable'] for edge in edges] == sorted(edge['variable'] for edge in edges)
+    dot = pruned.to_dot()
+    assert dot.startswith('digraph')
+    assert '"total_taxes" -> "housing_tax" [label="period.this_year"];' in dot
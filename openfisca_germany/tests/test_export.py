@@ -0,0 +1,65 @@
+from numpy.testing import assert_allclose, assert_array_equal
+import pandas as pd
+import pytest
+
+from openfisca_germany.microsimulation import build_simulation, export_variables, iter_record_batches
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+pyarrow = pytest.importorskip('pyarrow')
+pyarrow_parquet = pytest.importorskip('pyarrow.parquet')
+
+
+@pytest.fixture
+def simulation():
+    table = pd.DataFrame({
+        'p_id': [10, 11, 20, 12, 21],
+        'hh_id': [7, 7, 3, 7, 3],
+        'tu_id': [7, 7, 3, 7, 3],
+        'household_role': ['parent', 'parent', 'parent', 'child', 'child'],
+        'tax_unit_role': ['head', 'head', 'head', 'other', 'other'],
+        'kind': [False, False, False, True, True],
+        'alter': [40., 38., 30., 5., 9.],
+        'alleinerziehend': [False, False, True, False, False],
+        'bruttolohn_m': [1000., 500., 300., 0., 0.],
+        'kaltmiete_m_hh': [600., 600., 400., 600., 400.],
+        'heizkosten_m_hh': [100., 100., 50., 100., 50.],
+        'wohnfläche_hh': [90., 90., 60., 90., 60.],
+        })
+    return build_simulation(get_tax_benefit_system(), table, 2019)
+
+
+VARIABLES = ['arbeitsl_geld_2_eink', 'regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh']
+
+
+@pytest.mark.parametrize('file_name', ['results.parquet', 'results.arrow'])
+def test_person_rows_are_joined_to_household_values(simulation, tmp_path, file_name):
+    path = str(tmp_path / file_name)
+    assert export_variables(simulation, VARIABLES, [2019], path, batch_size = 2) == 5
+
+    if file_name.endswith('.parquet'):
+        exported = pyarrow_parquet.read_table(path)
+        assert exported.num_rows == 5
+    else:
+        exported = pyarrow.ipc.open_file(path).read_all()
+    assert exported.column_names == ['p_id', 'hh_id', 'tu_id'] + VARIABLES
+    assert_array_equal(exported.column('hh_id').to_numpy(), [7, 7, 3, 7, 3])
+
+    household_index = simulation.household.members_entity_id
+    assert_allclose(exported.column('arbeitsl_geld_2_eink').to_numpy(), simulation.calculate('arbeitsl_geld_2_eink', 2019))
+    assert_allclose(exported.column('regelbedarf_m_hh').to_numpy(), simulation.calculate('regelbedarf_m_hh', 2019)[household_index])
+
+
+def test_batches_and_periods(simulation):
+    batches = list(iter_record_batches(simulation, ['regelbedarf_m_hh'], [2018, 2019], batch_size = 2, id_columns = {}))
+    assert [batch.num_rows for batch in batches] == [2, 2, 1]
+    assert batches[0].schema.names == ['regelbedarf_m_hh_2018', 'regelbedarf_m_hh_2019']
+
+
+def test_household_rows(simulation):
+    batch, = iter_record_batches(simulation, ['regelbedarf_m_hh'], [2019], entity = 'household')
+    assert batch.schema.names == ['hh_id', 'regelbedarf_m_hh']
+    assert_allclose(batch.column(1).to_numpy(), simulation.calculate('regelbedarf_m_hh', 2019))
+
+    with pytest.raises(ValueError, match = 'one row per person'):
+        list(iter_record_batches(simulation, ['arbeitsl_geld_2_eink'], [2019], entity = 'household'))
@@ -0,0 +1,78 @@
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+from openfisca_core import periods
+
+from openfisca_germany.incremental import RecordingSimulation, build_reform_simulation, get_stale_calculations
+from openfisca_germany.microsimulation import build_simulation
+from openfisca_germany.reforms.flat_social_security_contribution import flat_social_security_contribution
+from openfisca_germany.reforms.modify_social_security_taxation import modify_social_security_taxation
+from openfisca_germany.reforms.removal_basic_income import removal_basic_income
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+MONTH = '2019-01'
+VARIABLES = ['disposable_income', 'total_taxes', 'total_benefits']
+
+
+@pytest.fixture
+def table():
+    return {
+        'p_id': np.arange(5),
+        'hh_id': np.array([1, 1, 2, 3, 3]),
+        'household_role': np.array(['parent', 'parent', 'parent', 'parent', 'child']),
+        'salary': np.array([0., 2000., 5000., 15000., 0.]),
+        'age': np.array([30, 40, 25, 50, 10]),
+        'rent': np.array([500., 500., 700., 1200., 1200.]),
+        'accommodation_size': np.array([50., 50., 70., 120., 120.]),
+        'housing_occupancy_status': np.array(['tenant', 'tenant', 'owner', 'tenant', 'tenant']),
+        }
+
+
+@pytest.fixture
+def baseline_simulation(table):
+    simulation = build_simulation(get_tax_benefit_system(), table, MONTH, simulation_class = RecordingSimulation)
+    for variable in VARIABLES:
+        simulation.calculate(variable, MONTH)
+    return simulation
+
+
+@pytest.mark.parametrize('reform, stale_variables', [
+    (flat_social_security_contribution, {'social_security_contribution', 'disposable_income', 'total_taxes'}),
+    (modify_social_security_taxation, {'social_security_contribution', 'disposable_income', 'total_taxes'}),
+    (removal_basic_income, {'basic_income', 'disposable_income', 'total_benefits'}),
+    ])
+def test_only_the_closure_of_the_reform_is_computed_again(table, baseline_simulation, reform, stale_variables):
+    reform = reform(get_tax_benefit_system())
+    assert {name for name, _ in get_stale_calculations(baseline_simulation, reform)} == stale_variables
+
+    reform_simulation = build_reform_simulation(baseline_simulation, reform)
+    assert reform_simulation.get_array('income_tax', MONTH) is baseline_simulation.get_array('income_tax', MONTH)
+    for name in stale_variables - {'basic_income'}:  # A neutralized variable always has its default value
+        assert reform_simulation.get_array(name, MONTH) is None
+
+    expected = build_simulation(reform, table, MONTH)
+    for variable in VARIABLES:
+        assert_allclose(reform_simulation.calculate(variable, MONTH), expected.calculate(variable, MONTH))
+
+
+def test_reform_of_a_reform(table, baseline_simulation):
+    first = build_reform_simulation(baseline_simulation, flat_social_security_contribution(get_tax_benefit_system()))
+    first.calculate('disposable_income', MONTH)
+    second_reform = removal_basic_income(first.tax_benefit_system)
+    second = build_reform_simulation(first, second_reform)
+    assert second.get_array('social_security_contribution', MONTH) is first.get_array('social_security_contribution', MONTH)
+    assert_allclose(second.calculate('disposable_income', MONTH), build_simulation(second_reform, table, MONTH).calculate('disposable_income', MONTH))
+
+
+def test_recording_simulations_can_be_traced(table):
+    simulation = build_simulation(get_tax_benefit_system(), table, MONTH, simulation_class = RecordingSimulation)
+    simulation.trace = True
+    simulation.calculate('total_taxes', MONTH)
+
+    assert [child.name for child in simulation.tracer.trees[0].children] == ['income_tax', 'social_security_contribution', 'housing_tax']
+    assert simulation.tracer.trees[0].children[0].parameters[0].name == 'taxes.income_tax_rate'
+    assert ('taxes.income_tax_rate', periods.instant(MONTH)) in simulation.parameter_uses[('income_tax', periods.period(MONTH))]
+    assert ('income_tax', periods.period(MONTH)) in simulation.computed
+    assert simulation.get_memory_usage()['by_variable']['income_tax']['nb_requests'] == 1
@@ -0,0 +1,128 @@
+import os
+import subprocess
+import sys
+
+from openfisca_core.simulation_builder import SimulationBuilder
+
+from openfisca_germany import COUNTRY_DIR, CountryTaxBenefitSystem
+from openfisca_germany.lazy_variables import scan_variable_names
+from openfisca_germany.reforms.flat_social_security_contribution import flat_social_security_contribution
+from openfisca_germany.situation_examples import single
+from openfisca_germany.systems import clear_tax_benefit_systems, get_tax_benefit_system
+
+
+def test_scan_variable_names():
+    names = scan_variable_names(os.path.join(COUNTRY_DIR, 'variables', 'housing.py'))
+    assert names == ['accommodation_size', 'rent', 'housing_occupancy_status', 'postal_code']
+
+
+def test_scan_resolves_imported_and_split_base_classes(tmp_path):
+    file_path = tmp_path / 'aliased.py'
+    file_path.write_text(
+        "from openfisca_core import variables\n"
+        "from openfisca_core.variables import Variable as BaseVariable\n"
+        "from openfisca_core.model_api import *\n"
+        "from openfisca_germany.entities import Person\n"
+        "class aliased(BaseVariable):\n"
+        "    value_type = float\n"
+        "class qualified(\n"
+        "        variables.Variable,\n"
+        "        ):\n"
+        "    value_type = float\n"
+        "class derived(aliased):\n"
+        "    pass\n"
+        "class Status(Enum):\n"
+        "    a = 'A'\n"
+        )
+    assert scan_variable_names(str(file_path)) == ['aliased', 'qualified', 'derived']
+
+
+def test_unresolved_files_are_imported_right_away(tmp_path):
+    (tmp_path / 'assigned.py').write_text(
+        "from openfisca_core.model_api import *\n"
+        "from openfisca_germany.entities import Person\n"
+        "Base = Variable\n"
+        "class assigned_base(Base):\n"
+        "    value_type = float\n"
+        "    entity = Person\n"
+        "    definition_period = MONTH\n"
+        )
+    (tmp_path / 'static.py').write_text(
+        "from openfisca_core.model_api import *\n"
+        "from openfisca_germany.entities import Person\n"
+        "class static_base(Variable):\n"
+        "    value_type = float\n"
+        "    entity = Person\n"
+        "    definition_period = MONTH\n"
+        )
+    assert scan_variable_names(str(tmp_path / 'assigned.py')) is None
+
+    tax_benefit_system = CountryTaxBenefitSystem()
+    tax_benefit_system._register_variables_from_directory(str(tmp_path))
+    assert tax_benefit_system.variables.is_loaded('assigned_base')
+    assert not tax_benefit_system.variables.is_loaded('static_base')
+    assert tax_benefit_system.get_variable('static_base').name == 'static_base'
+
+
+def test_extension_variables_are_imported_right_away(tmp_path):
+    (tmp_path / 'extension.py').write_text(
+        "from openfisca_core.model_api import *\n"
+        "from openfisca_germany.entities import Person\n"
+        "class extension_variable(Variable):\n"
+        "    value_type = float\n"
+        "    entity = Person\n"
+        "    definition_period = MONTH\n"
+        )
+    tax_benefit_system = CountryTaxBenefitSystem()
+    tax_benefit_system.add_variables_from_directory(str(tmp_path))
+    assert tax_benefit_system.variables.is_loaded('extension_variable')
+    assert not tax_benefit_system.variables.is_loaded('salary')
+
+
+def test_variables_are_imported_on_first_request():
+    tax_benefit_system = CountryTaxBenefitSystem()
+    variables = tax_benefit_system.variables
+    assert 'regelsatz_m_hh' in variables
+    assert not variables.is_loaded('regelsatz_m_hh')
+
+    variable = tax_benefit_system.get_variable('regelsatz_m_hh')
+    assert variable.name == 'regelsatz_m_hh'
+    # The other variables of the same file are imported together
+    assert variables.is_loaded('kindersatz_m_hh')
+    assert not variables.is_loaded('salary')
+
+    assert tax_benefit_system.get_variable('does_not_exist') is None
+
+
+def test_iterating_imports_all_variables():
+    tax_benefit_system = CountryTaxBenefitSystem()
+    names = set(tax_benefit_system.variables)
+    assert len(names) == len(tax_benefit_system.variables)
+    assert {'salary', 'arbeitsl_geld_2_eink', 'housing_occupancy_status'} <= names
+    assert all(tax_benefit_system.variables.is_loaded(name) for name in names)
+
+
+def test_reform_of_a_pending_variable():
+    tax_benefit_system = CountryTaxBenefitSystem()
+    reform = flat_social_security_contribution(tax_benefit_system)
+
+    situation = {
+        'persons': {'Bob': {'salary': {'2017-01': 1000}}},
+        'households': {'_': {'parents': ['Bob']}},
+        }
+    simulation = SimulationBuilder().build_from_entities(reform, situation)
+    assert simulation.calculate('social_security_contribution', '2017-01')[0] == 30
+    simulation = SimulationBuilder().build_from_entities(tax_benefit_system, situation)
+    assert simulation.calculate('social_security_contribution', '2017-01')[0] == 20
+
+
+def test_lazy_shared_system():
+    clear_tax_benefit_systems()
+    simulation = SimulationBuilder().build_from_entities(get_tax_benefit_system(), single)
+    assert simulation.calculate('disposable_income', '2017-01').shape == (1, )
+    clear_tax_benefit_systems()
+
+
+def test_examples_are_loaded_on_first_access():
+    code = "import openfisca_germany.situation_examples as e, sys; assert 'couple' not in vars(e); e.couple; assert 'couple' in vars(e)"
+    subprocess.check_call([sys.executable, '-c', code])
@@ -0,0 +1,65 @@
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+from openfisca_germany.legislation_dates import DatedSimulation, ParameterNodeAtInstants
+from openfisca_germany.microsimulation import build_simulation
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+YEARS = [2005, 2006, 2009, 2011, 2013, 2016, 2019]
+VARIABLES = ['kindersatz_m_hh', 'regelsatz_m_hh', 'regelbedarf_m_hh', 'eink_anr_frei', 'arbeitsl_geld_2_eink', 'arbeitsl_geld_2_eink_hh']
+
+
+@pytest.fixture
+def tax_benefit_system():
+    return get_tax_benefit_system()
+
+
+@pytest.fixture
+def panel(survey):
+    # Each household is observed in one of the years
+    household_years = np.random.RandomState(3).choice(YEARS, survey['hh_id'].nunique())
+    _, household_index = np.unique(survey['hh_id'], return_inverse = True)
+    return survey.assign(jahr = household_years[household_index].astype(float))
+
+
+def test_mixed_years_in_one_simulation(tax_benefit_system, panel):
+    simulation = build_simulation(tax_benefit_system, panel, 2019, simulation_class = DatedSimulation)
+    for year in YEARS:
+        expected_simulation = build_simulation(tax_benefit_system, panel, year)
+        for variable in VARIABLES:
+            population = simulation.get_variable_population(variable)
+            years = panel['jahr'].to_numpy() if population.entity.is_person else population.value_from_first_person(panel['jahr'].to_numpy())
+            assert_allclose(
+                simulation.calculate(variable, 2019)[years == year],
+                expected_simulation.calculate(variable, year)[years == year],
+                rtol = 1e-6, err_msg = '{} in {}'.format(variable, year),
+                )
+
+
+def test_without_dates_behaves_as_a_regular_simulation(tax_benefit_system, survey):
+    simulation = build_simulation(tax_benefit_system, survey, 2011, simulation_class = DatedSimulation)
+    expected = build_simulation(tax_benefit_system, survey, 2011)
+    for variable in VARIABLES:
+        assert_allclose(simulation.calculate(variable, 2011), expected.calculate(variable, 2011))
+
+
+def test_parameters_indexed_by_an_array_of_keys(tax_benefit_system):
+    nodes = [tax_benefit_system.get_parameters_at_instant(instant) for instant in ['2013-01-01', '2019-01-01']]
+    parameters = ParameterNodeAtInstants(nodes, np.array([0, 1, 1, 0]))
+    keys = np.array(['one', 'one', 'six', 'six'])
+    assert_allclose(parameters.regelsatz[keys], [nodes[0].regelsatz.one, nodes[1].regelsatz.one, nodes[1].regelsatz.six, nodes[0].regelsatz.six])
+
+    with pytest.raises(ValueError, match = 'one key per row'):
+        parameters.regelsatz[keys[:2]]
+
+
+def test_parameters_are_traced(tax_benefit_system, panel):
+    simulation = build_simulation(tax_benefit_system, panel, 2019, simulation_class = DatedSimulation)
+    simulation.trace = True
+    simulation.calculate('regelsatz_m_hh', 2019)
+    node, = simulation.tracer.trees
+    accesses = [(parameter.name, str(parameter.period)) for parameter in node.parameters]
+    # The parameters are read at the date of each household, by the formula of this date
+    assert {('regelsatz.value', '2005-01-01'), ('regelsatz.value', '2009-01-01'), ('regelsatz.one', '2011-01-01'), ('regelsatz.one', '2019-01-01')} <= set(accesses)
@@ -0,0 +1,46 @@
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+from openfisca_germany.microsimulation import build_simulation, open_columns, write_columns
+from openfisca_germany.storage import get_mapped_usage, get_storage_usage, is_mapped, lean_storage
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+VARIABLES = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh']
+
+
+@pytest.mark.parametrize('file_name', ['survey', 'survey.arrow'])
+def test_mapped_inputs(survey, tmp_path, file_name):
+    if file_name.endswith('.arrow'):
+        pytest.importorskip('pyarrow')
+    tax_benefit_system = get_tax_benefit_system()
+    path = str(tmp_path / file_name)
+    assert write_columns(survey, path, tax_benefit_system) == len(survey)
+    columns = open_columns(path)
+    assert is_mapped(columns['bruttolohn_m'])
+
+    simulation = build_simulation(tax_benefit_system, columns, 2019)
+    expected = build_simulation(tax_benefit_system, survey, 2019)
+    for variable in VARIABLES:
+        assert_allclose(simulation.calculate(variable, 2019), expected.calculate(variable, 2019))
+
+    # Inputs of persons are stored without copy
+    assert np.shares_memory(simulation.get_array('bruttolohn_m', 2019), columns['bruttolohn_m'])
+    assert get_mapped_usage(simulation)['bruttolohn_m'] == 4 * len(survey)
+    assert get_storage_usage(simulation)['bruttolohn_m'] == 0
+    assert get_storage_usage(simulation)['regelbedarf_m_hh'] > 0
+
+
+def test_columns_in_storage_profile_dtypes(survey, tmp_path):
+    system = lean_storage(get_tax_benefit_system())
+    write_columns(survey, str(tmp_path), system, columns = ['p_id', 'alter', 'household_role'])
+    columns = open_columns(str(tmp_path))
+    assert sorted(columns) == ['alter', 'household_role', 'p_id']
+    assert columns['alter'].dtype == np.int8
+    assert columns['household_role'].dtype.kind == 'U'
+
+
+def test_parquet_cannot_be_mapped(survey, tmp_path):
+    with pytest.raises(ValueError):
+        write_columns(survey, str(tmp_path / 'survey.parquet'))
@@ -0,0 +1,34 @@
+from numpy.testing import assert_allclose
+import pytest
+
+from openfisca_germany.microsimulation import build_simulation, calculate_periods, run_periods
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+YEARS = [2005, 2006, 2009, 2011, 2013, 2016, 2019]
+VARIABLES = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink', 'arbeitsl_geld_2_eink_hh']
+
+
+@pytest.fixture
+def tax_benefit_system():
+    return get_tax_benefit_system()
+
+
+def test_same_results_as_one_simulation_per_year(tax_benefit_system, survey):
+    results = run_periods(tax_benefit_system, survey, YEARS, VARIABLES)
+    for index, year in enumerate(YEARS):
+        simulation = build_simulation(tax_benefit_system, survey, year)
+        for variable in VARIABLES:
+            assert_allclose(results[variable][index], simulation.calculate(variable, year))
+    assert results['regelbedarf_m_hh'].shape == (len(YEARS), survey['hh_id'].nunique())
+
+
+def test_inputs_are_shared_by_all_periods(tax_benefit_system, survey):
+    simulation = build_simulation(tax_benefit_system, survey, YEARS)
+    assert simulation.get_array('alter', 2005) is simulation.get_array('alter', 2019)
+    assert simulation.get_array('kaltmiete_m_hh', 2005) is simulation.get_array('kaltmiete_m_hh', 2019)
+
+    # Inputs that change between years can still be set for a single year
+    simulation.set_input('bruttolohn_m', 2019, survey['bruttolohn_m'] * 2)
+    results = calculate_periods(simulation, 'arbeitsl_geld_2_eink', [2016, 2019])
+    assert_allclose(results[1], build_simulation(tax_benefit_system, survey.assign(bruttolohn_m = survey['bruttolohn_m'] * 2), 2019).calculate('arbeitsl_geld_2_eink', 2019))
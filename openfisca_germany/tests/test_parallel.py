@@ -0,0 +1,45 @@
+import numpy as np
+from numpy.testing import assert_allclose, assert_array_equal
+import pytest
+
+from openfisca_germany.microsimulation import build_simulation, run_in_parallel
+from openfisca_germany.microsimulation.parallel import get_shards
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+VARIABLES = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink', 'arbeitsl_geld_2_eink_hh']
+
+
+@pytest.fixture
+def shuffled_survey(survey):
+    # Members of a household are no longer in consecutive rows
+    return survey.sample(frac = 1, random_state = 2).reset_index(drop = True)
+
+
+def test_shards_never_split_households(shuffled_survey):
+    columns = {name: shuffled_survey[name].to_numpy() for name in shuffled_survey.columns}
+    shards = get_shards(columns, 4)
+    assert_array_equal(np.unique(shards), [0, 1, 2, 3])
+    assert (shuffled_survey.groupby(shards)['hh_id'].nunique().sum() == shuffled_survey['hh_id'].nunique())
+
+
+@pytest.mark.parametrize('shard_count', [1, 2, 4])
+def test_tax_units_spanning_households(shuffled_survey, shard_count):
+    # Two neighbouring households share a tax unit: the table is rejected whatever the number of shards
+    first, second = np.unique(shuffled_survey['hh_id'])[:2]
+    shuffled_survey.loc[shuffled_survey['hh_id'] == second, 'tu_id'] = first
+    columns = {name: shuffled_survey[name].to_numpy() for name in shuffled_survey.columns}
+    with pytest.raises(ValueError, match = "The tax_unit '{}' \\(column 'tu_id'\\) spans several households".format(first)):
+        get_shards(columns, shard_count)
+
+
+@pytest.mark.parametrize('processes', [1, 3])
+def test_same_results_as_a_single_simulation(shuffled_survey, processes):
+    tax_benefit_system = get_tax_benefit_system()
+    simulation = build_simulation(tax_benefit_system, shuffled_survey, 2019)
+    results = run_in_parallel(tax_benefit_system, shuffled_survey, 2019, VARIABLES, processes = processes)
+    for variable in VARIABLES:
+        expected = simulation.calculate(variable, 2019)
+        if variable.endswith('_hh'):
+            expected = expected[simulation.household.members_entity_id]
+        assert_allclose(results[variable], expected)
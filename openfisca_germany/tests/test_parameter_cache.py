@@ -0,0 +1,79 @@
+import os
+import shutil
+
+import numpy as np
+import pytest
+
+from openfisca_germany import COUNTRY_DIR, CountryTaxBenefitSystem, parameter_cache
+
+
+@pytest.fixture
+def parameters_dir(tmp_path):
+    directory = tmp_path / 'parameters'
+    shutil.copytree(os.path.join(COUNTRY_DIR, 'parameters'), str(directory))
+    return str(directory)
+
+
+@pytest.fixture
+def cache_dir(tmp_path):
+    return str(tmp_path / 'cache')
+
+
+def cache_files(cache_dir):
+    return [name for name in os.listdir(cache_dir) if name.endswith(parameter_cache.CACHE_FILE_EXTENSION)]
+
+
+def test_cache_is_written_then_read(parameters_dir, cache_dir):
+    cold = parameter_cache.load_parameters(parameters_dir, cache_dir = cache_dir)
+    assert len(cache_files(cache_dir)) == 1
+
+    warm = parameter_cache.load_parameters(parameters_dir, cache_dir = cache_dir)
+    assert warm is not cold
+    assert warm.regelsatz('2019-01-01').one == cold.regelsatz('2019-01-01').one == 424
+    salaries = np.array([0, 500, 1500])
+    assert (warm.taxes.eink_anr_frei('2006-01-01').calc(salaries) == cold.taxes.eink_anr_frei('2006-01-01').calc(salaries)).all()
+
+
+def test_cache_is_invalidated_when_a_file_changes(parameters_dir, cache_dir):
+    parameter_cache.load_parameters(parameters_dir, cache_dir = cache_dir)
+    key = parameter_cache.compute_cache_key(parameters_dir)
+
+    file_path = os.path.join(parameters_dir, 'taxes', 'income_tax_rate.yaml')
+    with open(file_path) as file:
+        content = file.read()
+    with open(file_path, 'w') as file:
+        file.write(content.replace('0.15', '0.5'))
+
+    assert parameter_cache.compute_cache_key(parameters_dir) != key
+    parameters = parameter_cache.load_parameters(parameters_dir, cache_dir = cache_dir)
+    assert parameters.taxes.income_tax_rate('2015-06-01') == 0.5
+    # The stale compiled file has been replaced
+    assert len(cache_files(cache_dir)) == 1
+
+
+def test_unreadable_cache_falls_back_to_yaml(parameters_dir, cache_dir):
+    parameter_cache.load_parameters(parameters_dir, cache_dir = cache_dir)
+    for name in cache_files(cache_dir):
+        with open(os.path.join(cache_dir, name), 'wb') as file:
+            file.write(b'not a pickle')
+
+    parameters = parameter_cache.load_parameters(parameters_dir, cache_dir = cache_dir)
+    assert parameters.general.age_of_majority('2019-01-01') == 18
+
+
+def test_cache_can_be_disabled(parameters_dir, cache_dir, monkeypatch):
+    monkeypatch.setenv(parameter_cache.CACHE_DIR_ENVIRONMENT_VARIABLE, '')
+    assert parameter_cache.default_cache_dir() is None
+
+    parameters = parameter_cache.load_parameters(parameters_dir)
+    assert parameters.general.age_of_majority('2019-01-01') == 18
+    assert not os.path.exists(cache_dir)
+
+
+def test_tax_benefit_system_uses_cache(cache_dir, monkeypatch):
+    monkeypatch.setenv(parameter_cache.CACHE_DIR_ENVIRONMENT_VARIABLE, cache_dir)
+    CountryTaxBenefitSystem()
+    assert len(cache_files(cache_dir)) == 1
+
+    tax_benefit_system = CountryTaxBenefitSystem()
+    assert tax_benefit_system.get_parameters_at_instant('2019-01-01').regelsatz.two == 382
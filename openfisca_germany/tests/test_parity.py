@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from openfisca_germany.legislation_dates import DatedSimulation
+from openfisca_germany.microsimulation import build_simulation, compare_with_reference, format_differences, generate_population
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+YEARS = [2005, 2011, 2019]
+OUTPUTS = ['regelbedarf_m_hh', 'kost_unterk_m_hh', 'eink_anr_frei', 'arbeitsl_geld_2_eink_hh']
+
+
+@pytest.fixture
+def tax_benefit_system():
+    return get_tax_benefit_system()
+
+
+@pytest.fixture
+def reference(tax_benefit_system):
+    # Households observed in several years, with the results of a simulation for each year as reference values
+    table = pd.DataFrame(generate_population(300, seed = 4))
+    _, household_index = np.unique(table['hh_id'], return_inverse = True)
+    table['jahr'] = np.random.RandomState(5).choice(YEARS, household_index.max() + 1)[household_index].astype(float)
+    for year in YEARS:
+        simulation = build_simulation(tax_benefit_system, table, year)
+        for variable in OUTPUTS:
+            population = simulation.get_variable_population(variable)
+            values = simulation.calculate(variable, year).astype(float)
+            if not population.entity.is_person:
+                values = population.project(values)
+            table.loc[table['jahr'] == year, 'expected_' + variable] = values[table['jahr'] == year]
+    return table
+
+
+def test_matching_reference(tax_benefit_system, reference):
+    outputs = {variable: 'expected_' + variable for variable in OUTPUTS}
+    assert compare_with_reference(tax_benefit_system, reference, 2019, outputs, simulation_class = DatedSimulation) == []
+
+
+def test_differences_are_reported_with_their_inputs(tax_benefit_system, reference):
+    household_rows = np.flatnonzero(reference['hh_id'] == reference['hh_id'][10])
+    reference.loc[household_rows, 'expected_arbeitsl_geld_2_eink_hh'] += 5
+    reference.loc[3, 'expected_eink_anr_frei'] += 0.02
+    outputs = {variable: 'expected_' + variable for variable in OUTPUTS}
+
+    differences = compare_with_reference(tax_benefit_system, reference, 2019, outputs, simulation_class = DatedSimulation)
+
+    assert [difference.variable for difference in differences] == ['eink_anr_frei', 'arbeitsl_geld_2_eink_hh']
+    person, household = differences
+    assert person.count == 1
+    assert list(person.rows) == [3]
+    assert person.max_difference == pytest.approx(0.02)
+    assert household.count == 1
+    assert list(household.rows) == list(household_rows)
+    assert household.max_difference == pytest.approx(5)
+    np.testing.assert_allclose(household.expected - household.actual, 5)
+    np.testing.assert_array_equal(household.inputs['bruttolohn_m'], reference['bruttolohn_m'][household_rows])
+    assert 'expected_arbeitsl_geld_2_eink_hh' not in household.inputs
+
+    report = format_differences(differences, limit = 1)
+    assert 'arbeitsl_geld_2_eink_hh (expected_arbeitsl_geld_2_eink_hh): 1 entities differ' in report
+    assert 'bruttolohn_m' in report
+
+
+def test_tolerances(tax_benefit_system, reference):
+    reference['regelbedarf_m_hh'] = reference['expected_regelbedarf_m_hh'] * 1.001
+    one_year = reference[reference['jahr'] == 2019]
+
+    # Output columns named after their variable are not used as inputs
+    assert len(compare_with_reference(tax_benefit_system, one_year, 2019, ['regelbedarf_m_hh'])) == 1
+    assert compare_with_reference(tax_benefit_system, one_year, 2019, ['regelbedarf_m_hh'], rtol = 0.002) == []
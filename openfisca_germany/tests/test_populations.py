@@ -0,0 +1,123 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+from openfisca_core.populations import GroupPopulation, Population
+from openfisca_core.simulation_builder import SimulationBuilder
+from openfisca_core.simulations import Simulation
+
+from openfisca_germany import situation_examples
+from openfisca_germany.entities import Household
+from openfisca_germany.microsimulation import build_simulation
+from openfisca_germany.populations import Bands, IndexedGroupPopulation, positions_within_groups
+from openfisca_germany.reforms.removal_basic_income import removal_basic_income
+from openfisca_germany.storage import lean_storage
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+def build_population(population_class, members_entity_id, members_role):
+    tax_benefit_system = get_tax_benefit_system()
+    members = Population(tax_benefit_system.person_entity)
+    members.count = len(members_entity_id)
+    population = population_class(Household, members)
+    population.count = members_entity_id.max() + 1
+    population.members_entity_id = members_entity_id
+    population.members_role = members_role
+    Simulation(tax_benefit_system, {'person': members, 'household': population})
+    return population
+
+
+@pytest.fixture(params = ['sorted', 'shuffled', 'empty households'])
+def populations(request):
+    random = np.random.RandomState(0)
+    members_entity_id = np.sort(random.randint(0, 50, 200))
+    if request.param == 'shuffled':
+        members_entity_id = random.permutation(members_entity_id)
+    elif request.param == 'empty households':
+        members_entity_id = np.where(members_entity_id % 7 == 3, members_entity_id + 1, members_entity_id)
+    # The first member of each household is its first parent
+    positions = positions_within_groups(members_entity_id, members_entity_id.max() + 1)[0]
+    roles = np.where(positions == 0, Household.FIRST_PARENT, Household.CHILD)
+    return (
+        build_population(GroupPopulation, members_entity_id, roles),
+        build_population(IndexedGroupPopulation, members_entity_id, roles),
+        )
+
+
+@pytest.mark.parametrize('role', [None, Household.CHILD])
+def test_aggregations_are_the_same_as_openfisca_core(populations, role):
+    core, indexed = populations
+    random = np.random.RandomState(1)
+    values = random.uniform(-100, 100, 200)
+    integers = random.randint(0, 20, 200)
+    flags = values > 50
+
+    for method, array in [('sum', values), ('sum', integers), ('any', flags), ('all', flags), ('max', integers), ('min', values)]:
+        expected = getattr(core, method)(array, role = role)
+        result = getattr(indexed, method)(array, role = role)
+        assert result.dtype == expected.dtype, method
+        assert_array_equal(result, expected, err_msg = method)
+    assert_array_equal(indexed.nb_persons(role), core.nb_persons(role))
+
+
+def test_positions_and_nth_persons_are_the_same_as_openfisca_core(populations):
+    core, indexed = populations
+    values = np.arange(200) * 1.5
+    assert_array_equal(indexed.members_position, core.members_position)
+    for n in range(3):
+        assert_array_equal(indexed.value_nth_person(n, values, default = -1), core.value_nth_person(n, values, default = -1))
+    assert_array_equal(indexed.value_from_person(values, Household.FIRST_PARENT), core.value_from_person(values, Household.FIRST_PARENT))
+    assert_array_equal(indexed.project(indexed.sum(values)), core.project(core.sum(values)))
+
+
+def test_index_is_built_again_when_members_change(populations):
+    _, indexed = populations
+    indexed.sum(np.ones(200))
+    indexed.members_entity_id = np.zeros(200, dtype = int)
+    assert indexed.nb_persons()[0] == 200
+
+
+@pytest.mark.parametrize('reforms', [(), (removal_basic_income,)])
+def test_simulations_use_the_index(survey, reforms):
+    simulation = build_simulation(get_tax_benefit_system(*reforms), survey, 2019)
+    assert isinstance(simulation.populations['household'], IndexedGroupPopulation)
+    assert isinstance(simulation.populations['tax_unit'], IndexedGroupPopulation)
+
+
+def test_simulations_of_reforms_use_the_index():
+    # Reforms inherit `instantiate_entities` from OpenFisca-Core, not from the country system
+    for reform in [removal_basic_income(get_tax_benefit_system()), get_tax_benefit_system(removal_basic_income)]:
+        simulation = SimulationBuilder().build_from_entities(reform, situation_examples.couple)
+        assert isinstance(simulation.populations['household'], IndexedGroupPopulation)
+        assert simulation.populations['household'].nb_persons().tolist() == [2]
+
+
+def test_bands_count_members_as_masks_do(populations):
+    _, indexed = populations
+    random = np.random.RandomState(2)
+    ages = random.choice([0, 3.5, 6, 6.5, 7, 13, 13.5, 14, 15, 20, 24, 24.5, 30, np.nan], 200)
+    kind = random.randint(0, 2, 200).astype(bool)
+    bands = Bands({'0_6': (0, 6), '7_13': (7, 13), '14_24': (14, 24), '0_15': (0, 15)})
+
+    counts = bands.count(indexed, ages, where = kind)
+    assert counts.shape == (indexed.count, 4)
+    for name, (low, high) in [('0_6', (0, 6)), ('7_13', (7, 13)), ('14_24', (14, 24)), ('0_15', (0, 15))]:
+        assert_array_equal(counts[:, bands.index[name]], indexed.sum(kind & (low <= ages) & (ages <= high)))
+
+
+@pytest.mark.parametrize('storage_profile', [None, lean_storage])
+def test_bands_are_counted_once_per_simulation(survey, storage_profile):
+    tax_benefit_system = get_tax_benefit_system()
+    if storage_profile is not None:
+        tax_benefit_system = storage_profile(tax_benefit_system)  # `kind` is packed in bits, and unpacked at each read
+    simulation = build_simulation(tax_benefit_system, survey, 2019)
+    household = simulation.populations['household']
+    bands = Bands({'0_6': (0, 6), '7_13': (7, 13)})
+
+    def count():
+        return bands.count(household, household.members('alter', 2019), where = household.members('kind', 2019), cache_key = ('alter', 'kind', 2019))
+
+    counts = count()
+    assert count() is counts
+    assert len(bands._counts[simulation]) == 1
+    assert_array_equal(counts[:, bands.index['0_6']], household.sum(household.members('kind', 2019) & (household.members('alter', 2019) <= 6)))
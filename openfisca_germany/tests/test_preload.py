@@ -0,0 +1,46 @@
+import copy
+import gc
+import multiprocessing
+
+import pytest
+
+from openfisca_germany import CountryTaxBenefitSystem
+from openfisca_germany.situation_examples import couple
+from openfisca_germany.web_api import create_app
+from openfisca_germany.web_api.preload import freeze, get_memory_usage, get_warm_up_situation, warm_up
+
+
+def test_warm_up():
+    tax_benefit_system = CountryTaxBenefitSystem()
+    warm_up(tax_benefit_system, range(2016, 2019))
+    assert all(tax_benefit_system.variables.is_loaded(name) for name in tax_benefit_system.variables)
+    assert len(tax_benefit_system._parameters_at_instant_cache) >= 3 * 12
+
+    response = create_app(tax_benefit_system).test_client().post('/calculate', json = get_warm_up_situation(tax_benefit_system, 2017))
+    assert response.status_code == 200
+    assert response.get_json()['persons']['_']['disposable_income']['2017-01'] is not None
+
+
+def serve_request(app, connection):
+    response = app.test_client().post('/calculate', json = copy.deepcopy(couple))
+    connection.send((response.status_code, response.get_json(), get_memory_usage()))
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason = "Workers are forked")
+def test_forked_workers_share_the_warmed_system():
+    tax_benefit_system = CountryTaxBenefitSystem()
+    warm_up(tax_benefit_system, [2017])
+    app = create_app(tax_benefit_system, max_batch_size = 4)
+    freeze()
+    try:
+        assert gc.get_freeze_count() > 0
+        receiver, sender = multiprocessing.Pipe(duplex = False)
+        worker = multiprocessing.get_context('fork').Process(target = serve_request, args = (app, sender))
+        worker.start()
+        status_code, result, memory = receiver.recv()
+        worker.join()
+    finally:
+        gc.unfreeze()
+    assert status_code == 200
+    assert result['households']['_']['total_benefits']['2017-01'] is not None
+    assert memory['rss'] > 0
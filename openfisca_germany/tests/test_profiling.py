@@ -0,0 +1,79 @@
+import copy
+import multiprocessing
+
+from numpy.testing import assert_allclose
+import pytest
+
+from openfisca_germany.microsimulation import build_simulation, run_in_parallel
+from openfisca_germany.profiling import Profiler
+from openfisca_germany.situation_examples import couple
+from openfisca_germany.storage import PackedBoolStorage, lean_storage
+from openfisca_germany.systems import get_tax_benefit_system
+from openfisca_germany.web_api import create_app
+
+
+def test_profile_calculations(survey):
+    tax_benefit_system = get_tax_benefit_system()
+    profiler = Profiler()
+    simulation = build_simulation(tax_benefit_system, survey, 2019, profiler = profiler)
+    result = simulation.calculate('arbeitsl_geld_2_eink_hh', 2019)
+    simulation.calculate('arbeitsl_geld_2_eink_hh', 2019)
+    assert_allclose(result, build_simulation(tax_benefit_system, survey, 2019).calculate('arbeitsl_geld_2_eink_hh', 2019))
+
+    stats = profiler.stats['arbeitsl_geld_2_eink_hh', '2019']
+    assert (stats['calls'], stats['hits'], stats['misses']) == (2, 1, 1)
+    assert stats['bytes'] == result.nbytes
+    assert 0 < stats['self_time'] < stats['total_time']
+    # Inputs are read from the cache
+    assert profiler.stats['bruttolohn_m', '2019']['misses'] == 0
+
+    # The self times of the stacks add up to the time of the calculations requested directly
+    total_self_time = sum(profiler.stacks.values())
+    assert total_self_time == pytest.approx(stats['total_time'], rel = 1e-6)
+    assert total_self_time == pytest.approx(sum(values['self_time'] for values in profiler.stats.values()), rel = 1e-6)
+
+    table = profiler.get_table('misses', by_period = False)
+    assert table[0]['misses'] == 1 and table[0]['period'] is None
+    with pytest.raises(ValueError, match = 'Cannot sort'):
+        profiler.get_table('memory')
+
+
+def test_hits_do_not_read_the_values(survey, monkeypatch):
+    profiler = Profiler()
+    simulation = build_simulation(lean_storage(get_tax_benefit_system()), survey, 2019, profiler = profiler)
+    unpacked = []
+    get = PackedBoolStorage.get
+    monkeypatch.setattr(PackedBoolStorage, 'get', lambda storage, period: unpacked.append(period) or get(storage, period))
+    simulation.calculate('kind', 2019)
+    assert len(unpacked) == 1  # Only read by the calculation itself
+    assert (profiler.stats['kind', '2019']['hits'], profiler.stats['kind', '2019']['misses']) == (1, 0)
+
+
+def test_collapsed_stacks(survey, tmp_path):
+    profiler = Profiler()
+    build_simulation(get_tax_benefit_system(), survey, 2019, profiler = profiler).calculate('arbeitsl_geld_2_eink_hh', 2019)
+    path = str(tmp_path / 'alg2.folded')
+    profiler.write_collapsed_stacks(path)
+    with open(path) as collapsed_file:
+        lines = collapsed_file.read().splitlines()
+    assert 'arbeitsl_geld_2_eink_hh;arbeitsl_geld_2_eink;eink_anr_frei' in [line.rsplit(' ', 1)[0] for line in lines]
+    assert all(line.rsplit(' ', 1)[1].isdigit() for line in lines)
+    assert profiler.get_collapsed_stacks(by_period = True).startswith('arbeitsl_geld_2_eink_hh<2019>')
+
+
+@pytest.mark.skipif('fork' not in multiprocessing.get_all_start_methods(), reason = "Workers are forked")
+def test_profile_parallel_runs(survey):
+    profiler = Profiler()
+    run_in_parallel(get_tax_benefit_system(), survey, 2019, ['arbeitsl_geld_2_eink_hh'], processes = 3, profiler = profiler)
+    assert profiler.stats['arbeitsl_geld_2_eink_hh', '2019']['misses'] == 3
+
+
+def test_profile_web_api():
+    profiler = Profiler()
+    client = create_app(get_tax_benefit_system(), profiler = profiler).test_client()
+    assert client.post('/calculate', json = copy.deepcopy(couple)).status_code == 200
+    rows = client.get('/profile?sort=calls&limit=3').get_json()
+    assert len(rows) == 3
+    assert rows[0]['calls'] >= rows[1]['calls'] >= rows[2]['calls']
+    assert 'total_benefits' in client.get('/profile?format=collapsed').get_data(as_text = True)
+    assert client.get('/profile?sort=memory').status_code == 400
@@ -0,0 +1,39 @@
+import numpy as np
+from numpy.testing import assert_allclose
+import pytest
+
+from openfisca_core.taxscales import MarginalRateTaxScale
+
+from openfisca_germany.reforms.modify_social_security_taxation import modify_social_security_taxation
+from openfisca_germany.scales import CompiledMarginalRateTaxScale
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+@pytest.fixture
+def bases():
+    return np.concatenate([np.random.RandomState(0).uniform(-100, 60000, 10000), [0, 100, 400, 800, 1000, 1200, 6000, 12400]])
+
+
+@pytest.mark.parametrize('instant', ['2005-01-01', '2005-10-01', '2011-04-01', '2019-01-01'])
+@pytest.mark.parametrize('name', ['eink_anr_frei', 'eink_anr_frei_kinder', 'social_security_contribution'])
+def test_same_results_as_marginal_rate_tax_scale(bases, instant, name):
+    scale = get_tax_benefit_system().get_parameters_at_instant(instant).taxes[name]
+    assert isinstance(scale, CompiledMarginalRateTaxScale)
+    assert_allclose(scale.calc(bases), MarginalRateTaxScale.calc(scale, bases), atol = 1e-9)
+    assert_allclose(scale.calc(bases, factor = 1.5), MarginalRateTaxScale.calc(scale, bases, factor = 1.5), atol = 1e-9)
+    assert_allclose(scale.calc(bases, round_base_decimals = 2), MarginalRateTaxScale.calc(scale, bases, round_base_decimals = 2))
+
+
+def test_scales_modified_by_a_reform_are_compiled_again(bases):
+    scale = get_tax_benefit_system(modify_social_security_taxation).get_parameters_at_instant('2019-01-01').taxes.social_security_contribution
+    assert scale.thresholds == [6000, 12400, 40000]
+    assert_allclose(scale.calc(bases), MarginalRateTaxScale.calc(scale, bases), atol = 1e-9)
+
+
+def test_modified_brackets_are_compiled_again():
+    scale = CompiledMarginalRateTaxScale()
+    scale.add_bracket(0, 0)
+    scale.add_bracket(100, 0.1)
+    assert_allclose(scale.calc(np.array([0, 150])), [0, 5])
+    scale.add_bracket(120, 0.5)
+    assert_allclose(scale.calc(np.array([0, 150])), [0, 17])
@@ -0,0 +1,52 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+
+from openfisca_germany.microsimulation import build_simulation, compare_storage_profiles
+from openfisca_germany.storage import PackedBoolStorage, StorageProfile, get_storage_usage, lean_storage
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+VARIABLES = ['regelbedarf_m_hh', 'arbeitsl_geld_2_eink_hh', 'kindersatz_m_hh', 'alleinerziehenden_mehrbedarf_hh']
+
+
+def test_packed_bool_storage():
+    storage = PackedBoolStorage()
+    values = np.random.RandomState(0).randint(0, 2, 13).astype(bool)
+    storage.put(values, '2019')
+    assert_array_equal(storage.get('2019'), values)
+    assert storage.get('2018') is None
+    assert storage.get_memory_usage()['total_nb_bytes'] == 2
+
+
+def test_lean_storage(survey):
+    tax_benefit_system = get_tax_benefit_system()
+    simulation = build_simulation(lean_storage(tax_benefit_system), survey, 2019)
+    for variable in VARIABLES:
+        simulation.calculate(variable, 2019)
+
+    assert simulation.get_array('alter', 2019).dtype == np.int8
+    assert simulation.get_array('anz_kinder_hh', 2019).dtype == np.int8
+    assert simulation.get_array('kind', 2019).dtype == bool
+    assert isinstance(simulation.get_holder('kind')._memory_storage, PackedBoolStorage)
+    assert get_storage_usage(simulation)['kind'] == (len(survey) + 7) // 8
+
+    # Simulations of the baseline keep their dtypes
+    simulation = build_simulation(tax_benefit_system, survey, 2019)
+    assert simulation.get_array('alter', 2019).dtype == np.float32
+    assert not isinstance(simulation.get_holder('kind')._memory_storage, PackedBoolStorage)
+
+
+def test_lean_storage_is_valid(survey):
+    assert compare_storage_profiles(get_tax_benefit_system(), survey, 2019, VARIABLES) == []
+
+
+class narrow_wages(StorageProfile):
+    name = "Wages in int8"
+    dtypes_by_variable = {'bruttolohn_m': np.int8}
+
+
+def test_invalid_profile_is_reported(survey):
+    differences = compare_storage_profiles(get_tax_benefit_system(), survey, 2019, ['arbeitsl_geld_2_eink_hh'], profile = narrow_wages)
+    assert [difference.variable for difference in differences] == ['arbeitsl_geld_2_eink_hh']
+    assert differences[0].max_difference > 0.01
+    assert len(differences[0].rows) > 0
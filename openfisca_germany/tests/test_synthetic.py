@@ -0,0 +1,60 @@
+import numpy as np
+from numpy.testing import assert_array_equal
+import pytest
+
+from openfisca_germany.microsimulation import build_simulation, generate_population, open_columns, write_columns
+from openfisca_germany.systems import get_tax_benefit_system
+
+
+def test_same_seed_same_population():
+    population = generate_population(100, seed = 2)
+    same = generate_population(100, seed = 2)
+    other = generate_population(100, seed = 3)
+    for name, column in population.items():
+        assert_array_equal(column, same[name])
+    assert not np.array_equal(population['bruttolohn_m'], other['bruttolohn_m'])
+
+
+def test_households():
+    population = generate_population(10_000, household_sizes = {1: 0.5, 3: 0.5}, couple_share = 0.5)
+    sizes = np.bincount(population['hh_id'])
+    assert set(sizes) == {1, 3}
+    assert abs((sizes == 1).mean() - 0.5) < 0.05
+    assert_array_equal(population['kind'], population['household_role'] == 'child')
+    assert_array_equal(population['kind'], population['tax_unit_role'] == 'other')
+    parents = np.bincount(population['hh_id'], weights = ~population['kind'])
+    assert set(parents) == {1, 2}
+
+    # Single parents are alleinerziehend, and at least 18 years older than their children
+    single_parents = population['alleinerziehend']
+    assert (parents[population['hh_id'][single_parents]] == 1).all()
+    assert (sizes[population['hh_id'][single_parents]] == 3).all()
+    assert (population['alter'][population['kind']] <= 24).all()
+    first_parent_age = population['alter'][np.unique(population['hh_id'], return_index = True)[1]]
+    assert (first_parent_age[population['hh_id']][population['kind']] - population['alter'][population['kind']] >= 18).all()
+
+    # Household inputs are repeated for all the members
+    assert (population['kaltmiete_m_hh'][population['bewohnt_eigentum_hh']] == 0).all()
+    assert (np.bincount(population['hh_id'], weights = population['wohnfläche_hh']) == sizes * population['wohnfläche_hh'][np.unique(population['hh_id'], return_index = True)[1]]).all()
+
+
+def test_incomes():
+    population = generate_population(10_000, incomes = {'bruttolohn_m': (1, 3000), 'arbeitsl_geld_m': (1, 1000)})
+    working_age = ~population['kind'] & (population['alter'] < 65)
+    assert (population['bruttolohn_m'][working_age] > 0).all()
+    assert (population['bruttolohn_m'][~working_age] == 0).all()
+    assert (population['arbeitsl_geld_m'] == 0).all()
+    assert (population['ges_rente_m'] == 0).all()
+    assert np.median(population['bruttolohn_m'][working_age]) == pytest.approx(3000, rel = 0.05)
+
+    with pytest.raises(ValueError, match = "Unknown income sources: lohn"):
+        generate_population(10, incomes = {'lohn': (1, 1000)})
+
+
+def test_simulate_population(tmp_path):
+    tax_benefit_system = get_tax_benefit_system()
+    population = generate_population(1000, seed = 1)
+    write_columns(population, str(tmp_path), tax_benefit_system)
+    simulation = build_simulation(tax_benefit_system, open_columns(str(tmp_path)), 2019)
+    assert (simulation.calculate('_arbeitsl_geld_2_brutto_eink', 2019) > 0).mean() > 0.5
+    assert (simulation.calculate('regelbedarf_m_hh', 2019) > 0).all()
@@ -0,0 +1,65 @@
+import pytest
+
+from openfisca_core.simulation_builder import SimulationBuilder
+
+from openfisca_germany import CountryTaxBenefitSystem
+from openfisca_germany.reforms.flat_social_security_contribution import flat_social_security_contribution
+from openfisca_germany.reforms.removal_basic_income import removal_basic_income
+from openfisca_germany.situation_examples import single
+from openfisca_germany.systems import clear_tax_benefit_systems, get_tax_benefit_system
+
+
+@pytest.fixture(autouse = True)
+def fresh_systems():
+    clear_tax_benefit_systems()
+    yield
+    clear_tax_benefit_systems()
+
+
+def test_base_system_is_shared():
+    tax_benefit_system = get_tax_benefit_system()
+    assert isinstance(tax_benefit_system, CountryTaxBenefitSystem)
+    assert get_tax_benefit_system() is tax_benefit_system
+
+
+def test_reformed_systems_are_memoized_by_ordered_reforms():
+    reformed = get_tax_benefit_system(flat_social_security_contribution, removal_basic_income)
+    assert get_tax_benefit_system(flat_social_security_contribution, removal_basic_income) is reformed
+    assert get_tax_benefit_system(removal_basic_income, flat_social_security_contribution) is not reformed
+
+    # Reforms are applied on top of the shared system of their prefix
+    assert reformed.baseline is get_tax_benefit_system(flat_social_security_contribution)
+    assert reformed.baseline.baseline is get_tax_benefit_system()
+
+
+def test_shared_systems_cannot_be_modified():
+    tax_benefit_system = get_tax_benefit_system()
+    with pytest.raises(TypeError):
+        tax_benefit_system.neutralize_variable('basic_income')
+
+    clone = tax_benefit_system.clone()
+    clone.neutralize_variable('basic_income')
+    assert not tax_benefit_system.get_variable('basic_income').is_neutralized
+
+
+def test_clones_copy_the_parameters():
+    tax_benefit_system = get_tax_benefit_system()
+    clone = tax_benefit_system.clone()
+    clone.parameters.regelsatz.one.update(period = 'year:2019', value = 1000)
+    assert clone.get_parameters_at_instant('2019-01-01').regelsatz.one == 1000
+    assert tax_benefit_system.get_parameters_at_instant('2019-01-01').regelsatz.one == 424
+
+
+def test_reforms_do_not_modify_the_base_system():
+    base = get_tax_benefit_system()
+    reformed = get_tax_benefit_system(removal_basic_income)
+
+    simulation = SimulationBuilder().build_from_entities(reformed, single)
+    assert simulation.calculate('basic_income', '2017-01')[0] == 0
+    simulation = SimulationBuilder().build_from_entities(base, single)
+    assert simulation.calculate('basic_income', '2017-01')[0] > 0
+
+
+def test_invalid_reform():
+    with pytest.raises(ValueError):
+        get_tax_benefit_system('openfisca_germany.reforms.removal_basic_income.removal_basic_income')
@@ -0,0 +1,95 @@
+from concurrent.futures import ThreadPoolExecutor
+import copy
+
+from openfisca_core.errors import SituationParsingError
+from openfisca_web_api import handlers
+import pytest
+
+from openfisca_germany.situation_examples import couple, single
+from openfisca_germany.systems import get_tax_benefit_system
+from openfisca_germany.web_api import MicroBatcher, create_app
+from openfisca_germany.web_api.batching import calculate_batch, get_batch_key
+
+
+def get_situations(count):
+    situations = []
+    for index in range(count):
+        situation = copy.deepcopy(couple if index % 2 else single)
+        situation['persons']['Alicia']['salary'] = {'2017-01': 1000 + 100 * index}
+        situations.append(situation)
+    return situations
+
+
+def test_batch_has_the_results_of_each_situation():
+    tax_benefit_system = get_tax_benefit_system()
+    situations = get_situations(5)
+    expected = [handlers.calculate(tax_benefit_system, copy.deepcopy(situation)) for situation in situations]
+    simulated = []
+
+    def calculate(tax_benefit_system, situation):
+        simulated.append(situation)
+        return handlers.calculate(tax_benefit_system, situation)
+
+    assert calculate_batch(tax_benefit_system, situations, calculate) == expected
+    assert len(simulated) == 1
+
+
+@pytest.mark.parametrize('count', [2, 8])
+def test_compatible_situations_are_computed_in_one_simulation(count):
+    stats = dict(simulations = 0, fallbacks = 0)
+    calculate_batch(get_tax_benefit_system(), get_situations(count), stats = stats)
+    assert stats == dict(simulations = 1, fallbacks = 0)
+
+
+def test_errors_are_reported_to_their_situation(caplog):
+    tax_benefit_system = get_tax_benefit_system()
+    situations = get_situations(3)
+    situations[1]['households']['_']['parents'] = ['Alicia', 'Bob']
+    stats = dict(simulations = 0, fallbacks = 0)
+    results = calculate_batch(tax_benefit_system, situations, stats = stats)
+    assert isinstance(results[1], SituationParsingError)
+    assert results[0] == handlers.calculate(tax_benefit_system, get_situations(1)[0])
+    assert stats == dict(simulations = 4, fallbacks = 1)
+    assert 'Unable to compute 3 situations in one simulation' in caplog.text
+
+
+def test_situations_setting_other_inputs_are_not_merged():
+    tax_benefit_system = get_tax_benefit_system()
+    situations = get_situations(2)
+    assert get_batch_key(tax_benefit_system, situations[0]) == get_batch_key(tax_benefit_system, get_situations(3)[2])
+    situations[0]['persons']['Alicia']['income_tax'] = {'2017-01': 100}
+    assert get_batch_key(tax_benefit_system, situations[0]) != get_batch_key(tax_benefit_system, get_situations(1)[0])
+    assert get_batch_key(tax_benefit_system, dict(situations[1], axes = [[]])) is None
+
+
+def test_concurrent_requests_are_coalesced():
+    tax_benefit_system = get_tax_benefit_system()
+    app = create_app(tax_benefit_system, max_batch_size = 16, max_wait = 0.05)
+    situations = get_situations(16)
+    client = create_app(tax_benefit_system).test_client()
+    expected = [client.post('/calculate', json = situation).get_json() for situation in situations]
+
+    def post(situation):
+        return app.test_client().post('/calculate', json = situation)
+
+    with ThreadPoolExecutor(len(situations)) as executor:
+        responses = list(executor.map(post, situations))
+    assert [response.get_json() for response in responses] == expected
+    batcher = app.config['MICRO_BATCHER']
+    assert batcher.stats['requests'] == len(situations)
+    assert batcher.stats['largest_batch'] > 1
+    assert batcher.stats['fallbacks'] == 0
+    assert batcher.stats['simulations'] == batcher.stats['batches'] < len(situations)
+
+
+def test_invalid_request():
+    app = create_app(get_tax_benefit_system(), max_batch_size = 4)
+    response = app.test_client().post('/calculate', json = {'persons': {}})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('max_batch_size', [1, 4])
+def test_same_routes(max_batch_size):
+    app = create_app(get_tax_benefit_system(), max_batch_size = max_batch_size)
+    assert app.test_client().get('/variable/disposable_income').status_code == 200
+    assert isinstance(MicroBatcher(get_tax_benefit_system()).calculate(get_situations(1)[0]), dict)
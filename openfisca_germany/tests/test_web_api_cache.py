@@ -0,0 +1,66 @@
+import copy
+
+from openfisca_germany.reforms.removal_basic_income import removal_basic_income
+from openfisca_germany.situation_examples import couple
+from openfisca_germany.systems import get_tax_benefit_system
+from openfisca_germany.web_api import ResponseCache, create_app
+
+
+def get_couple(salary = 2500, period = '2017-01'):
+    situation = copy.deepcopy(couple)
+    situation['persons']['Javier']['salary'] = {period: salary}
+    return situation
+
+
+def test_equivalent_situations_have_the_same_key():
+    cache = ResponseCache(get_tax_benefit_system())
+    key = cache.get_key(get_couple())
+    assert cache.get_key(get_couple(period = 'month:2017-01')) == key
+    assert cache.get_key(get_couple(salary = 2500.0)) == key
+
+    # Inputs equal to their default value
+    without_salary = get_couple()
+    del without_salary['persons']['Javier']['salary']
+    assert cache.get_key(get_couple(salary = 0)) == cache.get_key(without_salary)
+
+    assert cache.get_key(get_couple(salary = 2600)) != key
+    requesting_more = get_couple()
+    requesting_more['persons']['Javier']['income_tax'] = {'2017-01': None}
+    assert cache.get_key(requesting_more) != key
+    assert ResponseCache(get_tax_benefit_system(removal_basic_income)).get_key(get_couple()) != key
+
+
+def test_repeated_requests_are_read_from_the_cache():
+    app = create_app(get_tax_benefit_system(), cache_size = 10)
+    client = app.test_client()
+    expected = create_app(get_tax_benefit_system()).test_client().post('/calculate', json = get_couple()).get_json()
+
+    assert client.post('/calculate', json = get_couple()).get_json() == expected
+    assert client.post('/calculate', json = get_couple()).get_json() == expected
+    # Responses repeat their own request
+    response = client.post('/calculate', json = get_couple(period = 'month:2017-01')).get_json()
+    assert response['persons']['Javier']['salary'] == {'month:2017-01': 2500}
+    assert response['persons']['Alicia']['disposable_income'] == expected['persons']['Alicia']['disposable_income']
+
+    assert client.get('/stats').get_json()['cache'] == dict(hits = 2, misses = 1, evicted = 0, expired = 0)
+
+
+def test_size_and_time_to_live():
+    cache = ResponseCache(get_tax_benefit_system(), max_size = 1)
+    cache.calculate(get_couple())
+    cache.calculate(get_couple(salary = 2600))
+    assert len(cache) == 1
+    assert cache.stats['evicted'] == 1
+
+    cache.ttl = -1
+    cache.calculate(get_couple())
+    cache.calculate(get_couple())
+    assert cache.stats['expired'] == 1
+    assert cache.stats['hits'] == 0
+
+
+def test_invalid_situations_are_not_cached():
+    app = create_app(get_tax_benefit_system(), cache_size = 10)
+    response = app.test_client().post('/calculate', json = {'persons': {'Javier': {'salary': {'not a period': 1}}}})
+    assert response.status_code == 400
+    assert len(app.config['RESPONSE_CACHE']) == 0
@@ -0,0 +1,123 @@
+import os
+
+import pytest
+
+from openfisca_germany.yaml_tests import run_yaml_tests
+
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+
+CASES = """
+- name: Salary of 2500
+  period: 2017-01
+  input:
+    salary: 2500
+  output:
+    disposable_income: 2675
+
+- name: Wrong salary of 10000
+  period: 2017-01
+  input:
+    salary: 10000
+  output:
+    disposable_income: 1
+
+- name: Couple
+  period: 2017-01
+  input:
+    household:
+      parents: [Alicia, Bob]
+    persons:
+      Alicia:
+        salary: 2400
+      Bob:
+        salary: 0
+  output:
+    persons:
+      Alicia:
+        income_tax: 360
+      Bob:
+        income_tax: 0
+
+- name: Age set as an input
+  period: 2017-01
+  input:
+    age: 40
+  output:
+    age: 40
+
+- name: Unknown input
+  period: 2017-01
+  input:
+    unknown_salary: 10000
+  output:
+    disposable_income: 8740
+
+- name: Reform
+  reforms: openfisca_germany.reforms.modify_social_security_taxation.modify_social_security_taxation
+  period: 2017-01
+  input:
+    salary: [2000, 15000]
+  output:
+    social_security_contribution: [0, 1336]
+"""
+
+
+def test_tests_of_the_package():
+    results = run_yaml_tests([TESTS_DIR], processes = 1)
+    assert len(results) > 30
+    assert [result for result in results if result['error'] is not None] == []
+    assert max(result['batch'] for result in results) > 1
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_failures_are_reported_by_case(tmp_path, processes):
+    path = tmp_path / 'cases.yaml'
+    path.write_text(CASES)
+    results = run_yaml_tests([str(path)], processes = processes)
+    errors = {result['name']: result['error'] for result in results}
+    assert errors['Salary of 2500'] is None
+    assert errors['Couple'] is None
+    assert errors['Age set as an input'] is None
+    assert errors['Reform'] is None
+    assert errors['Wrong salary of 10000'].startswith('disposable_income@2017-01: [8740.] differs from 1')
+    assert 'unknown_salary' in errors['Unknown input']
+
+    # Cases setting the same inputs are simulated together, whether or not they describe their entities
+    batches = {result['name']: result['batch'] for result in results}
+    assert batches['Salary of 2500'] == batches['Wrong salary of 10000'] == batches['Couple'] == 3
+    assert batches['Age set as an input'] == 1
+
+
+def test_batches_that_cannot_be_merged_are_reported(tmp_path, caplog):
+    invalid_case = """
+- name: Three parents {}
+  period: 2018-01
+  input:
+    household:
+      parents: [Alicia, Bob, Claude]
+    persons:
+      Alicia:
+        salary: 2400
+      Bob:
+        salary: 0
+      Claude:
+        salary: 0
+  output:
+    income_tax: [360, 0, 0]
+"""
+    path = tmp_path / 'cases.yaml'
+    path.write_text(CASES + invalid_case.format(1) + invalid_case.format(2))
+    results = run_yaml_tests([str(path)], processes = 1)
+    errors = {result['name']: result['error'] for result in results}
+    batches = {result['name']: result['batch'] for result in results}
+    assert 'parents' in errors['Three parents 1'] and 'parents' in errors['Three parents 2']
+    assert batches['Three parents 1'] == batches['Three parents 2'] == 1
+    assert batches['Couple'] == 3
+    assert "Unable to simulate the 2 cases of '{}' together".format(path) in caplog.text
+
+
+def test_name_filter(tmp_path):
+    path = tmp_path / 'cases.yaml'
+    path.write_text(CASES)
+    assert [result['name'] for result in run_yaml_tests([str(path)], processes = 1, options = dict(name_filter = 'salary'))] == ['Wrong salary of 10000']
@@ -1,10 +1,31 @@
 from openfisca_core.variables import Variable
 from openfisca_core.periods import YEAR, MONTH
 from openfisca_germany.entities import Household, Person, TaxUnit
+from openfisca_germany.populations import Bands
 
 from numpy import minimum, maximum, nan_to_num, where
 
 
+# Age bands of the children, in years, counted in a single pass by `anz_kinder_nach_alter_hh`
+ALTERSGRUPPEN_KINDER = Bands({
+    '0_6': (0, 6),
+    '7_13': (7, 13),
+    '14_24': (14, 24),
+    '0_15': (0, 15),
+    })
+
+
+def anz_kinder_nach_alter_hh(household, period):
+    """
+    Returns the number of children of each household in each band of ``ALTERSGRUPPEN_KINDER``, as a (households x bands) matrix.
+
+    The matrix is computed once per simulation and period. The ages and the children are still read at each call, so that the formulas calling this function depend on them.
+    """
+    alter = household.members('alter', period)
+    kind = household.members('kind', period)
+    return ALTERSGRUPPEN_KINDER.count(household, alter, where = kind, cache_key = ('alter', 'kind', period))
+
+
 class _arbeitsl_geld_2_brutto_eink_hh(Variable):
     value_type = float
     entity = Household
@@ -119,8 +140,7 @@ class anz_kind_zwischen_0_6_hh(Variable):
     definition_period = YEAR
 
     def formula(household, period):
-        alter = household.members('alter', period)
-        return household.sum(household.members('kind', period) * (0 <= alter) * (alter <= 6))
+        return anz_kinder_nach_alter_hh(household, period)[:, ALTERSGRUPPEN_KINDER.index['0_6']]
 
 
 class anz_kind_zwischen_0_15_hh(Variable):
@@ -129,8 +149,7 @@ class anz_kind_zwischen_0_15_hh(Variable):
     definition_period = YEAR
 
     def formula(household, period):
-        alter = household.members('alter', period)
-        return household.sum(household.members('kind', period) * (0 <= alter) * (alter <= 15))
+        return anz_kinder_nach_alter_hh(household, period)[:, ALTERSGRUPPEN_KINDER.index['0_15']]
 
 
 class arbeitsl_geld_m(Variable):
@@ -269,39 +288,6 @@ class kind(Variable):
     definition_period = YEAR
 
 
-class kind_zwischen_0_6(Variable):
-    value_type = bool
-    entity = Person
-    definition_period = YEAR
-
-    def formula(person, period):
-        alter = person('alter', period)
-        kind = person('kind', period)
-        return kind & (0 <= alter) & (alter <= 6)
-
-
-class kind_zwischen_7_13(Variable):
-    value_type = bool
-    entity = Person
-    definition_period = YEAR
-
-    def formula(person, period):
-        alter = person('alter', period)
-        kind = person('kind', period)
-        return kind & (7 <= alter) & (alter <= 13)
-
-
-class kind_zwischen_14_24(Variable):
-    value_type = bool
-    entity = Person
-    definition_period = YEAR
-
-    def formula(person, period):
-        alter = person('alter', period)
-        kind = person('kind', period)
-        return kind & (14 <= alter) & (alter <= 24)
-
-
 class kinder_in_hh(Variable):
     value_type = bool
     entity = Household
@@ -325,27 +311,24 @@ class kindersatz_m_hh(Variable):
     def formula(household, period, parameters):
         P = parameters(period)
         anteile = P.anteil_regelsatz
+        kinder = anz_kinder_nach_alter_hh(household, period)
 
-        per_child = P.regelsatz.value * (
-            anteile.kinder_0_6 * household.members('kind_zwischen_0_6', period)
-            + anteile.kinder_7_13 * household.members('kind_zwischen_7_13', period)
-            + anteile.kinder_14_24 * household.members('kind_zwischen_14_24', period)
+        return P.regelsatz.value * (
+            anteile.kinder_0_6 * kinder[:, ALTERSGRUPPEN_KINDER.index['0_6']]
+            + anteile.kinder_7_13 * kinder[:, ALTERSGRUPPEN_KINDER.index['7_13']]
+            + anteile.kinder_14_24 * kinder[:, ALTERSGRUPPEN_KINDER.index['14_24']]
         )
 
-        return household.sum(per_child)
-
     def formula_2011(household, period, parameters):
         P = parameters(period)
-        anteile = P.anteil_regelsatz
+        kinder = anz_kinder_nach_alter_hh(household, period)
 
-        per_child = (
-            P.regelsatz.six * household.members('kind_zwischen_0_6', period)
-            + P.regelsatz.five * household.members('kind_zwischen_7_13', period)
-            + P.regelsatz.four * household.members('kind_zwischen_14_24', period)
+        return (
+            P.regelsatz.six * kinder[:, ALTERSGRUPPEN_KINDER.index['0_6']]
+            + P.regelsatz.five * kinder[:, ALTERSGRUPPEN_KINDER.index['7_13']]
+            + P.regelsatz.four * kinder[:, ALTERSGRUPPEN_KINDER.index['14_24']]
         )
 
-        return household.sum(per_child)
-
 
 class kost_unterk_m_hh(Variable):
     value_type = float
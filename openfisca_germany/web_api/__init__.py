@@ -0,0 +1,7 @@
+# -*- coding: utf-8 -*-
+
+# This package serves the country package with the OpenFisca web API, with serving modes for high loads.
+
+from openfisca_germany.web_api.app import create_app  # noqa: F401
+from openfisca_germany.web_api.batching import MicroBatcher  # noqa: F401
+from openfisca_germany.web_api.cache import ResponseCache  # noqa: F401
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+# This file creates the web API of the country package: the one of OpenFisca-Core, whose `/calculate` route can coalesce concurrent requests, see `batching.py`, cache its results, see `cache.py`, and profile its simulations, see `profiling.py`.
+
+from functools import partial
+
+import dpath
+from flask import abort, jsonify, make_response, request
+
+from openfisca_core.errors import SituationParsingError
+from openfisca_core.indexed_enums import Enum
+from openfisca_core.simulation_builder import SimulationBuilder
+from openfisca_web_api import app as web_api_app
+
+from openfisca_germany.web_api.batching import DEFAULT_MAX_WAIT, MicroBatcher
+from openfisca_germany.web_api.cache import DEFAULT_TTL, ResponseCache
+
+
+def handle_invalid_json(error):
+    abort(make_response(jsonify({'error': 'Invalid JSON: {}'.format(error.args[0])}), 400))
+
+
+def fill_results(tax_benefit_system, simulation, input_data):
+    """
+    Computes with ``simulation`` the variables requested by ``input_data``, i.e. given with a ``null`` value, and sets their values in ``input_data``, as the `/calculate` route of OpenFisca-Core does.
+
+    :returns: ``input_data``, with the values computed.
+    """
+    computation_results = {}
+    for path, _ in dpath.util.search(input_data, '*/*/*/*', afilter = lambda value: value is None, yielded = True):
+        entity_plural, entity_id, variable_name, period = path.split('/')
+        variable = tax_benefit_system.get_variable(variable_name)
+        result = simulation.calculate(variable_name, period)
+        entity_index = simulation.get_population(entity_plural).get_index(entity_id)
+        if variable.value_type == Enum:
+            entity_result = result.decode()[entity_index].name
+        elif variable.value_type == float:
+            entity_result = float(str(result[entity_index]))  # As OpenFisca-Core, to serialize float32 values without extra decimals
+        elif variable.value_type == str:
+            entity_result = str(result[entity_index])
+        else:
+            entity_result = result.tolist()[entity_index]
+        dpath.util.new(computation_results, path, entity_result)
+    dpath.merge(input_data, computation_results)
+    return input_data
+
+
+def calculate(tax_benefit_system, input_data, profiler = None):
+    """
+    Computes the variables requested by ``input_data``, as ``openfisca_web_api.handlers.calculate`` does.
+
+    :param profiler: If given, a :any:`Profiler` to which the simulation is attached.
+    """
+    simulation = SimulationBuilder().build_from_entities(tax_benefit_system, input_data)
+    if profiler is not None:
+        profiler.attach(simulation)
+    return fill_results(tax_benefit_system, simulation, input_data)
+
+
+def create_app(tax_benefit_system, max_batch_size = 1, max_wait = DEFAULT_MAX_WAIT, cache_size = 0, cache_ttl = DEFAULT_TTL, profiler = None, **options):
+    """
+    Creates the OpenFisca web API of ``tax_benefit_system``.
+
+    :param max_batch_size: Maximum number of concurrent `/calculate` requests computed in one simulation. With 1, each request gets its own simulation, as in OpenFisca-Core.
+    :param max_wait: Maximum time, in seconds, a `/calculate` request waits for other requests to be computed with.
+    :param cache_size: Maximum number of situations whose `/calculate` results are cached. With 0, results are not cached.
+    :param cache_ttl: Time, in seconds, during which cached results are served.
+    :param profiler: If given, a :any:`Profiler` recording the calculations of the `/calculate` route, served by the `/profile` route.
+    :param options: ``tracker_url``, ``tracker_idsite``, ``tracker_token`` and ``welcome_message``, as in ``openfisca_web_api.app.create_app``.
+
+    Requests are only received concurrently by servers running several threads, e.g. ``gunicorn --threads 16``.
+    The counters of the cache and of the batches are served by the `/stats` route.
+    The profile is served by the `/profile` route, as a table sorted by the ``sort`` argument, e.g. `/profile?sort=misses&limit=20`, or as collapsed stacks with `/profile?format=collapsed`, by period with `by_period=true`.
+    """
+    app = web_api_app.create_app(tax_benefit_system, **options)
+    if max_batch_size <= 1 and cache_size <= 0 and profiler is None:
+        return app
+
+    calculate_simulation = partial(calculate, profiler = profiler)
+    calculate_situation = partial(calculate_simulation, tax_benefit_system)
+    stats = {}
+    if max_batch_size > 1:
+        batcher = app.config['MICRO_BATCHER'] = MicroBatcher(tax_benefit_system, max_batch_size, max_wait, calculate_simulation)
+        calculate_situation = batcher.calculate
+        stats['batching'] = batcher.stats
+    if cache_size > 0:
+        cache = app.config['RESPONSE_CACHE'] = ResponseCache(tax_benefit_system, cache_size, cache_ttl)
+        calculate_situation = partial(cache.calculate, calculate = calculate_situation)
+        stats['cache'] = cache.stats
+
+    def calculate_route():
+        request.on_json_loading_failed = handle_invalid_json
+        input_data = request.get_json()
+        try:
+            result = calculate_situation(input_data)
+        except SituationParsingError as e:
+            abort(make_response(jsonify(e.error), e.code or 400))
+        except UnicodeEncodeError as e:
+            abort(make_response(jsonify({"error": "'" + e.args[1] + "' is not a valid ASCII value."}), 400))
+        return jsonify(result)
+
+    app.view_functions['calculate'] = calculate_route
+
+    @app.route('/stats')
+    def get_stats():
+        return jsonify(stats)
+
+    if profiler is not None:
+        app.config['PROFILER'] = profiler
+
+        @app.route('/profile')
+        def get_profile():
+            collapsed = request.args.get('format') == 'collapsed'
+            by_period = request.args.get('by_period', 'false' if collapsed else 'true') == 'true'
+            if collapsed:
+                return app.response_class(profiler.get_collapsed_stacks(by_period), mimetype = 'text/plain')
+            try:
+                table = profiler.get_table(request.args.get('sort', 'self_time'), by_period)
+            except ValueError as error:
+                abort(make_response(jsonify({'error': error.args[0]}), 400))
+            return jsonify(table[:request.args.get('limit', type = int)])
+
+    return app
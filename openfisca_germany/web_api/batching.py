@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+
+# This file coalesces the concurrent `/calculate` requests of the web API into vectorial simulations.
+# Each request usually describes one household: building a simulation for each of them pays the whole overhead of the simulation for a few persons.
+# Requests received within a few milliseconds are merged into one situation, with entity ids prefixed by the index of their request so that they are disjoint.
+# The merged situation is simulated once, and its results are split back per request.
+
+from concurrent.futures import Future
+import logging
+import os
+import queue
+import threading
+import time
+
+from openfisca_web_api import handlers
+
+
+log = logging.getLogger(__name__)
+
+# Maximum number of requests merged into one simulation
+DEFAULT_MAX_BATCH_SIZE = 64
+
+# Maximum time, in seconds, a request waits for other requests to merge with
+DEFAULT_MAX_WAIT = 0.005
+
+
+def get_role_keys(tax_benefit_system):
+    """
+    Returns the keys under which the members of each group entity are listed in situations, e.g. ``{'households': {'parents', 'children'}}``.
+    """
+    return {
+        entity.plural: {role.plural or role.key for role in entity.roles}
+        for entity in tax_benefit_system.group_entities
+        }
+
+
+def get_batch_key(tax_benefit_system, situation):
+    """
+    Returns a key telling which situations can be merged with ``situation``, or ``None`` if it must be simulated alone.
+
+    Situations are merged only if they set the same variables for the same periods.
+    Otherwise, an input set by a situation for a period, e.g. ``income_tax`` or a yearly ``salary``, would replace the values computed, or the monthly inputs, of the other situations.
+    Situations with ``axes``, or with values not given by period, are simulated alone.
+    """
+    if not isinstance(situation, dict) or 'axes' in situation:
+        return None
+    role_keys = get_role_keys(tax_benefit_system)
+    inputs = set()
+    for plural, instances in situation.items():
+        if not isinstance(instances, dict):
+            return None
+        for instance in instances.values():
+            if not isinstance(instance, dict):
+                return None
+            for name, values in instance.items():
+                if name in role_keys.get(plural, ()):
+                    continue
+                if not isinstance(values, dict):
+                    return None
+                inputs.update((plural, name, period) for period, value in values.items() if value is not None)
+    return frozenset(inputs)
+
+
+def get_batch_id(index, entity_id):
+    return '{}#{}'.format(index, entity_id)
+
+
+def merge_situations(tax_benefit_system, situations):
+    """
+    Merges situations into one, in which the id of each entity is prefixed by the index of its situation, see :any:`get_batch_id`.
+
+    The values of the variables are shared with ``situations``, not copied.
+    """
+    role_keys = get_role_keys(tax_benefit_system)
+    merged = {}
+    for index, situation in enumerate(situations):
+        for plural, instances in situation.items():
+            merged_instances = merged.setdefault(plural, {})
+            for entity_id, instance in instances.items():
+                merged_instance = dict(instance)
+                for role_key in role_keys.get(plural, set()) & set(instance):
+                    members = instance[role_key]
+                    if isinstance(members, list):
+                        merged_instance[role_key] = [get_batch_id(index, member) for member in members]
+                    else:
+                        merged_instance[role_key] = get_batch_id(index, members)
+                merged_instances[get_batch_id(index, entity_id)] = merged_instance
+    return merged
+
+
+def split_result(tax_benefit_system, result, index, situation):
+    """
+    Returns the result of the situation ``index`` of a merged ``result``, with the entity ids and members of ``situation``.
+    """
+    role_keys = get_role_keys(tax_benefit_system)
+    split = {}
+    for plural, instances in situation.items():
+        split[plural] = {}
+        for entity_id, instance in instances.items():
+            merged_instance = result[plural][get_batch_id(index, entity_id)]
+            split[plural][entity_id] = {
+                name: instance[name] if name in role_keys.get(plural, ()) else values
+                for name, values in merged_instance.items()
+                }
+    return split
+
+
+def calculate_batch(tax_benefit_system, situations, calculate = handlers.calculate, stats = None):
+    """
+    Computes the variables requested by each situation, as the `/calculate` route of the web API does, with a single simulation.
+
+    :param calculate: The function computing a situation, e.g. ``openfisca_germany.web_api.app.calculate`` with a profiler. Defaults to the one of the `/calculate` route.
+    :param stats: If given, a dict whose ``simulations`` and ``fallbacks`` counts are incremented.
+
+    :returns: The result of each situation, or the exception raised when simulating it.
+
+    If the merged situation cannot be simulated, e.g. if one situation is invalid, each situation is simulated alone, so that errors are reported to their request only.
+    These fallbacks are logged, and counted in ``stats``.
+    """
+    stats = stats if stats is not None else dict(simulations = 0, fallbacks = 0)
+    if len(situations) > 1:
+        stats['simulations'] += 1
+        try:
+            merged = calculate(tax_benefit_system, merge_situations(tax_benefit_system, situations))
+            return [split_result(tax_benefit_system, merged, index, situation) for index, situation in enumerate(situations)]
+        except Exception:
+            stats['fallbacks'] += 1
+            log.warning("Unable to compute {} situations in one simulation: computing each of them alone.".format(len(situations)), exc_info = True)
+    results = []
+    for situation in situations:
+        stats['simulations'] += 1
+        try:
+            results.append(calculate(tax_benefit_system, situation))
+        except Exception as error:
+            results.append(error)
+    return results
+
+
+class MicroBatcher(object):
+    """
+    Coalesces the situations submitted concurrently, e.g. by the threads of a web server, and computes them in batches.
+
+    :param max_batch_size: Maximum number of situations computed in one simulation.
+    :param max_wait: Maximum time, in seconds, the first situation of a batch waits for other situations.
+    :param calculate: The function computing a situation, as in :any:`calculate_batch`.
+
+    Situations are computed by a background thread, started by the first submission in each process, so that forked processes get their own.
+    ``stats`` counts the ``requests``, the ``batches`` of compatible situations computed, the ``largest_batch``, the ``simulations`` run, and the ``fallbacks`` to one simulation per situation of the batches that could not be computed together, see :any:`calculate_batch`.
+
+    Example:
+
+    >>> batcher = MicroBatcher(tax_benefit_system, max_batch_size = 32, max_wait = 0.002)
+    >>> batcher.calculate(couple)  # Returns the situation with its computed values, like the `/calculate` route
+    """
+
+    def __init__(self, tax_benefit_system, max_batch_size = DEFAULT_MAX_BATCH_SIZE, max_wait = DEFAULT_MAX_WAIT, calculate = handlers.calculate):
+        self.tax_benefit_system = tax_benefit_system
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.calculate_situation = calculate
+        self.stats = dict(requests = 0, batches = 0, largest_batch = 0, simulations = 0, fallbacks = 0)
+        self._queue = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def submit(self, situation):
+        """
+        Submits a situation, and returns a ``concurrent.futures.Future`` of its result.
+        """
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queue = queue.Queue()
+                threading.Thread(target = self._run, args = (self._queue,), daemon = True).start()
+        future = Future()
+        self._queue.put((situation, future))
+        return future
+
+    def calculate(self, situation):
+        """
+        Returns the result of a situation, computed with the other situations submitted meanwhile.
+
+        :raises: The exception raised when simulating the situation, e.g. a ``SituationParsingError``.
+        """
+        return self.submit(situation).result()
+
+    def _run(self, requests):
+        while True:
+            batch = [requests.get()]
+            deadline = time.monotonic() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                try:
+                    batch.append(requests.get(timeout = max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            self._compute(batch)
+
+    def _compute(self, batch):
+        batches = {}
+        for index, (situation, _) in enumerate(batch):
+            key = get_batch_key(self.tax_benefit_system, situation)
+            batches.setdefault(key if key is not None else ('alone', index), []).append(batch[index])
+        self.stats['requests'] += len(batch)
+        for requests in batches.values():
+            self.stats['batches'] += 1
+            self.stats['largest_batch'] = max(self.stats['largest_batch'], len(requests))
+            try:
+                results = calculate_batch(self.tax_benefit_system, [situation for situation, _ in requests], self.calculate_situation, self.stats)
+            except BaseException as error:
+                results = [error] * len(requests)
+            for (_, future), result in zip(requests, results):
+                if isinstance(result, BaseException):
+                    future.set_exception(result)
+                else:
+                    future.set_result(result)
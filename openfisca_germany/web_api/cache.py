@@ -0,0 +1,218 @@
+# -*- coding: utf-8 -*-
+
+# This file caches the results of the `/calculate` route of the web API.
+# Front-end calculators send many identical situations, such as the `single` and `couple` examples with small edits, each of which costs a simulation.
+# Each situation is canonicalized: periods are normalized, inputs equal to their default value are removed, and keys are sorted.
+# Its hash, with the country package version and the reforms of the tax and benefit system, keys the computed values in a bounded LRU cache with a time to live.
+
+from collections import OrderedDict
+import datetime
+import hashlib
+import json
+import threading
+import time
+
+from openfisca_core import periods
+from openfisca_core.indexed_enums import Enum
+from openfisca_web_api import handlers
+
+from openfisca_germany.web_api.batching import get_role_keys
+
+
+# Maximum number of situations whose results are cached
+DEFAULT_MAX_SIZE = 10_000
+
+# Time, in seconds, during which cached results are served
+DEFAULT_TTL = 3600
+
+
+def is_default(variable, value):
+    """
+    Returns ``True`` if ``value``, as given in a situation, is the default value of ``variable``.
+    """
+    default = variable.default_value
+    if isinstance(default, Enum):
+        return value == default.name
+    if isinstance(default, datetime.date):
+        return value == default.isoformat()
+    return isinstance(value, (bool, int, float, str)) and value == default
+
+
+def canonicalize_values(variable, values):
+    """
+    Returns the values of ``variable`` by period, with normalized periods, and numbers of float variables as floats.
+
+    :raises: ValueError if a period is invalid, or given twice.
+    """
+    canonical = {}
+    for period, value in values.items():
+        if variable.value_type == float and type(value) is int:
+            value = float(value)
+        canonical[str(periods.period(period))] = value
+    if len(canonical) != len(values):
+        raise ValueError("Some periods of '{}' are given several times.".format(variable.name))
+    return canonical
+
+
+def canonicalize_situation(tax_benefit_system, situation):
+    """
+    Returns a canonical form of ``situation``: situations with the same canonical form have the same results.
+
+    - periods are normalized, e.g. ``'month:2017-01'`` becomes ``'2017-01'``;
+    - the members of each role are given as lists;
+    - inputs equal to the default value of a variable without formula are removed, if they are its only input.
+
+    The requested variables, whose values are ``None``, are kept.
+
+    :raises: ValueError if a period cannot be parsed.
+    """
+    role_keys = get_role_keys(tax_benefit_system)
+    canonical = {}
+    for plural, instances in situation.items():
+        if not isinstance(instances, dict):
+            canonical[plural] = instances
+            continue
+        canonical[plural] = {}
+        for entity_id, instance in instances.items():
+            canonical_instance = canonical[plural][entity_id] = {}
+            for name, values in instance.items():
+                variable = tax_benefit_system.get_variable(name)
+                if name in role_keys.get(plural, ()):
+                    canonical_instance[name] = values if isinstance(values, list) else [values]
+                    continue
+                if variable is None or not isinstance(values, dict):
+                    canonical_instance[name] = values
+                    continue
+                values = canonicalize_values(variable, values)
+                inputs = [value for value in values.values() if value is not None]
+                if not variable.formulas and len(inputs) == 1 and is_default(variable, inputs[0]):
+                    values = {period: value for period, value in values.items() if value is None}
+                if values:
+                    canonical_instance[name] = values
+    return canonical
+
+
+def get_system_description(tax_benefit_system):
+    """
+    Returns the country package, its version, and the reforms applied to ``tax_benefit_system``, from the first to the last.
+    """
+    reforms = []
+    while tax_benefit_system.baseline is not None:
+        reforms.insert(0, '{}.{}'.format(type(tax_benefit_system).__module__, type(tax_benefit_system).__qualname__))
+        tax_benefit_system = tax_benefit_system.baseline
+    metadata = tax_benefit_system.get_package_metadata()
+    return dict(package = metadata['name'], version = metadata['version'], reforms = reforms)
+
+
+def get_requested_computations(situation):
+    """
+    Yields the (entity plural, entity id, variable name, period) requested by ``situation``, i.e. whose value is ``None``.
+    """
+    for plural, instances in situation.items():
+        if not isinstance(instances, dict):
+            continue
+        for entity_id, instance in instances.items():
+            for name, values in instance.items():
+                if isinstance(values, dict):
+                    for period, value in values.items():
+                        if value is None:
+                            yield plural, entity_id, name, period
+
+
+class ResponseCache(object):
+    """
+    A bounded LRU cache of the values computed for situations by the `/calculate` route, see :any:`canonicalize_situation`.
+
+    :param max_size: Maximum number of situations whose values are kept. The least recently used ones are dropped first.
+    :param ttl: Time, in seconds, after which the values of a situation are computed again.
+
+    Only the requested values are cached, so that each response repeats its own request, e.g. with its own spelling of periods.
+    ``stats`` counts the ``hits``, the ``misses``, the situations ``evicted`` to respect ``max_size`` and the ones ``expired``.
+
+    Example:
+
+    >>> cache = ResponseCache(tax_benefit_system, max_size = 1000, ttl = 600)
+    >>> cache.calculate(couple)  # Computes the values, like the `/calculate` route
+    >>> cache.calculate(couple)  # Reads them from the cache
+    """
+
+    def __init__(self, tax_benefit_system, max_size = DEFAULT_MAX_SIZE, ttl = DEFAULT_TTL):
+        self.tax_benefit_system = tax_benefit_system
+        self.max_size = max_size
+        self.ttl = ttl
+        self.stats = dict(hits = 0, misses = 0, evicted = 0, expired = 0)
+        self._system_description = get_system_description(tax_benefit_system)
+        self._entries = OrderedDict()  # Key -> (expiry time, values by (entity plural, entity id, variable name, period)), least recently used first
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_key(self, situation):
+        """
+        Returns the hash of ``situation`` and of the system, or ``None`` if ``situation`` cannot be canonicalized, e.g. if it is invalid.
+        """
+        try:
+            canonical = canonicalize_situation(self.tax_benefit_system, situation)
+        except (AttributeError, TypeError, ValueError):
+            return None
+        serialized = json.dumps([self._system_description, canonical], sort_keys = True, default = str)
+        return hashlib.sha256(serialized.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Returns the values cached for ``key``, or ``None``.
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] < time.monotonic():
+                del self._entries[key]
+                self.stats['expired'] += 1
+                entry = None
+            if entry is None:
+                self.stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[1]
+
+    def put(self, key, values):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, values)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last = False)
+                self.stats['evicted'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def calculate(self, situation, calculate = None):
+        """
+        Returns ``situation`` with its requested values, read from the cache or computed.
+
+        :param calculate: The function computing a situation, e.g. ``MicroBatcher.calculate``. Defaults to the one of the `/calculate` route.
+        """
+        if calculate is None:
+            calculate = self._calculate
+        key = self.get_key(situation)
+        if key is None:
+            return calculate(situation)
+
+        requested = list(get_requested_computations(situation))
+        values = self.get(key)
+        if values is not None:
+            for plural, entity_id, name, period in requested:
+                situation[plural][entity_id][name][period] = values[plural, entity_id, name, str(periods.period(period))]
+            return situation
+
+        result = calculate(situation)
+        self.put(key, {
+            (plural, entity_id, name, str(periods.period(period))): result[plural][entity_id][name][period]
+            for plural, entity_id, name, period in requested
+            })
+        return result
+
+    def _calculate(self, situation):
+        return handlers.calculate(self.tax_benefit_system, situation)
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+
+# This file prepares a tax and benefit system to be shared by preforked web workers.
+# Each worker of the web API otherwise builds its own system, and its first requests pay for loading variables, resolving parameters at each instant, and running each formula for the first time.
+# Here, the system is built and warmed up once in the parent process: its variables are loaded, the parameters are resolved for each month of a range of years, and the most requested variables are computed, also through the `/calculate` route.
+# Forked workers then share this memory copy-on-write. Objects are frozen out of the garbage collector, so that collections in workers do not write to, and copy, the shared pages.
+
+import gc
+import os
+import resource
+import time
+import warnings
+
+from openfisca_core.periods import ETERNITY, MONTH, YEAR, period as make_period
+from openfisca_core.simulation_builder import SimulationBuilder
+
+
+# Variables most requested to the web API
+DEFAULT_WARM_VARIABLES = ['disposable_income', 'total_benefits', 'total_taxes']
+
+
+def warm_up(tax_benefit_system, years, variables = DEFAULT_WARM_VARIABLES):
+    """
+    Loads all the variables of ``tax_benefit_system``, resolves its parameters for each month of ``years``, and computes ``variables`` for each year on a default simulation.
+
+    :returns: The time spent, in seconds.
+    """
+    start = time.perf_counter()
+    for name in tax_benefit_system.variables:
+        tax_benefit_system.get_variable(name)
+    for year in years:
+        for month in make_period(year).get_subperiods(MONTH):
+            tax_benefit_system.get_parameters_at_instant(month.start)
+
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)  # Default simulations divide by null incomes
+        for year in years:
+            simulation = SimulationBuilder().build_default_simulation(tax_benefit_system)
+            for name in variables:
+                variable = tax_benefit_system.get_variable(name, check_existence = True)
+                if variable.definition_period == ETERNITY:
+                    simulation.calculate(name, year)
+                else:
+                    simulation.calculate_add(name, year)
+    return time.perf_counter() - start
+
+
+def get_warm_up_situation(tax_benefit_system, year, variables = DEFAULT_WARM_VARIABLES):
+    """
+    Returns a situation of one person, alone in each group entity, requesting ``variables`` for ``year``, or for its first month.
+    """
+    situation = {entity.plural: {'_': {}} for entity in tax_benefit_system.entities}
+    for entity in tax_benefit_system.group_entities:
+        situation[entity.plural]['_'][entity.roles[0].plural or entity.roles[0].key] = ['_']
+    for name in variables:
+        variable = tax_benefit_system.get_variable(name, check_existence = True)
+        period = {ETERNITY: 'ETERNITY', YEAR: str(year), MONTH: '{}-01'.format(year)}.get(variable.definition_period, str(year))
+        situation[variable.entity.plural]['_'][name] = {period: None}
+    return situation
+
+
+def warm_up_app(app, tax_benefit_system, years, variables = DEFAULT_WARM_VARIABLES):
+    """
+    Requests ``variables`` for each of ``years`` to the `/calculate` route of ``app``, so that the code serving requests runs once before workers are forked.
+    """
+    client = app.test_client()
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', RuntimeWarning)
+        for year in years:
+            client.post('/calculate', json = get_warm_up_situation(tax_benefit_system, year, variables))
+
+
+def freeze():
+    """
+    Moves all the objects of the current process out of the garbage collector, before forking workers that share them.
+    """
+    gc.collect()
+    gc.freeze()
+
+
+def get_memory_usage():
+    """
+    Returns the ``rss`` of the current process, and how much of it is ``shared`` with other processes or ``private``, in bytes.
+
+    Shared and private memory are only known on Linux. Elsewhere, ``rss`` is the peak resident memory, and the others are ``None``.
+    """
+    try:
+        with open('/proc/self/smaps_rollup') as smaps:
+            sizes = {}
+            for line in smaps:
+                key, _, value = line.partition(':')
+                if value.strip().endswith('kB'):
+                    sizes[key] = int(value.split()[0]) * 1024
+    except OSError:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return dict(rss = rss * (1 if os.uname().sysname == 'Darwin' else 1024), shared = None, private = None)
+    return dict(
+        rss = sizes['Rss'],
+        shared = sizes['Shared_Clean'] + sizes['Shared_Dirty'],
+        private = sizes['Private_Clean'] + sizes['Private_Dirty'],
+        )
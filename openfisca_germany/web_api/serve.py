@@ -0,0 +1,133 @@
+# -*- coding: utf-8 -*-
+
+# This file defines a command line interface to serve the web API, like `openfisca serve`, with the serving modes of this package.
+#
+# Usage: python -m openfisca_germany.web_api.serve --country-package openfisca_germany --max-batch-size 64 --max-wait 0.005 --cache-size 10000 [gunicorn options]
+#
+# With `--preload`, the tax and benefit system is built and warmed up once, see `preload.py`, before the workers are forked: they share it copy-on-write.
+# Usage: python -m openfisca_germany.web_api.serve --country-package openfisca_germany --preload --warm-years 2015 2020 --warm-variables disposable_income total_benefits
+#
+# With `--profile`, the calculations of each worker are profiled, see `profiling.py`, served by the `/profile` route, and written when the worker exits.
+# Usage: python -m openfisca_germany.web_api.serve --country-package openfisca_germany --profile profiles/api
+
+import argparse
+import logging
+import os
+import time
+
+from openfisca_core.scripts import add_tax_benefit_system_arguments, build_tax_benefit_system
+from openfisca_web_api.scripts import serve
+
+from openfisca_germany.profiling import Profiler
+from openfisca_germany.web_api.app import create_app
+from openfisca_germany.web_api.batching import DEFAULT_MAX_WAIT
+from openfisca_germany.web_api.cache import DEFAULT_TTL
+from openfisca_germany.web_api.preload import DEFAULT_WARM_VARIABLES, freeze, get_memory_usage, warm_up, warm_up_app
+
+
+log = logging.getLogger('gunicorn.error')
+
+# Threads of each worker, which receive the requests to coalesce
+DEFAULT_THREADS = 16
+
+
+def get_parser():
+    parser = argparse.ArgumentParser(description = "Run the OpenFisca web API. Unknown options are passed to gunicorn, e.g. --workers or --threads.")
+    parser = add_tax_benefit_system_arguments(parser)
+    parser.add_argument('-p', '--port', action = 'store', help = "port to serve on (use --bind to specify host and port)", type = int)
+    parser.add_argument('--tracker-url', action = 'store', help = "tracking service url", type = str)
+    parser.add_argument('--tracker-idsite', action = 'store', help = "tracking service id site", type = int)
+    parser.add_argument('--tracker-token', action = 'store', help = "tracking service authentication token", type = str)
+    parser.add_argument('--welcome-message', action = 'store', help = "welcome message users will get when visiting the API root", type = str)
+    parser.add_argument('-f', '--configuration-file', action = 'store', help = "configuration file", type = str)
+    parser.add_argument('--max-batch-size', action = 'store', help = "maximum number of concurrent /calculate requests computed in one simulation", type = int)
+    parser.add_argument('--max-wait', action = 'store', help = "maximum time, in seconds, a /calculate request waits for other requests", type = float)
+    parser.add_argument('--cache-size', action = 'store', help = "maximum number of situations whose /calculate results are cached by each worker", type = int)
+    parser.add_argument('--cache-ttl', action = 'store', help = "time, in seconds, during which cached /calculate results are served", type = float)
+    parser.add_argument('--warm-years', action = 'store', nargs = 2, metavar = ('FIRST', 'LAST'), help = "years for which the parameters are resolved and the --warm-variables computed before serving", type = int)
+    parser.add_argument('--warm-variables', action = 'store', nargs = '+', help = "variables computed before serving, for each of the --warm-years", type = str)
+    parser.add_argument('--profile', action = 'store', metavar = 'PREFIX', help = "profile the calculations, and write the profile of each worker to PREFIX.<pid>.txt and PREFIX.<pid>.folded when it exits", type = str)
+    return parser
+
+
+class WebAPIApplication(serve.OpenFiscaWebAPIApplication):
+
+    def load(self):
+        tax_benefit_system = build_tax_benefit_system(
+            self.options.get('country_package'),
+            self.options.get('extensions'),
+            self.options.get('reforms')
+            )
+        profiler = Profiler() if self.options.get('profile') else None
+        app = create_app(
+            tax_benefit_system,
+            max_batch_size = self.options.get('max_batch_size', 1),
+            max_wait = self.options.get('max_wait', DEFAULT_MAX_WAIT),
+            cache_size = self.options.get('cache_size', 0),
+            cache_ttl = self.options.get('cache_ttl', DEFAULT_TTL),
+            profiler = profiler,
+            tracker_url = self.options.get('tracker_url'),
+            tracker_idsite = self.options.get('tracker_idsite'),
+            tracker_token = self.options.get('tracker_token'),
+            welcome_message = self.options.get('welcome_message'),
+            )
+        if self.options.get('warm_years'):
+            first, last = self.options['warm_years']
+            years = range(first, last + 1)
+            variables = self.options.get('warm_variables', DEFAULT_WARM_VARIABLES)
+            start = time.perf_counter()
+            warm_up(tax_benefit_system, years, variables)
+            warm_up_app(app, tax_benefit_system, years, variables)
+            log.info("Warmed up the tax and benefit system for {} to {} in {:.2f}s".format(first, last, time.perf_counter() - start))
+        if profiler is not None:
+            profiler.clear()  # Only profile the requests
+            app.config['PROFILE_PREFIX'] = self.options['profile']
+        if self.cfg.preload_app:
+            freeze()
+        return app
+
+
+def post_fork(server, worker):
+    worker.forked_at = time.perf_counter()
+
+
+def post_worker_init(worker):
+    memory = get_memory_usage()
+    worker.log.info("Worker {} started in {:.3f}s, RSS {:.1f} MB, of which {} MB are private".format(
+        worker.pid,
+        time.perf_counter() - worker.forked_at,
+        memory['rss'] / 1e6,
+        '?' if memory['private'] is None else '{:.1f}'.format(memory['private'] / 1e6),
+        ))
+
+
+def worker_exit(server, worker):
+    app = getattr(worker, 'wsgi', None)
+    profiler = app.config.get('PROFILER') if app is not None else None
+    if profiler is None:
+        return
+    path = '{}.{}'.format(app.config['PROFILE_PREFIX'], worker.pid)
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok = True)
+    with open(path + '.txt', 'w') as table_file:
+        table_file.write(profiler.format_table() + '\n')
+    profiler.write_collapsed_stacks(path + '.folded')
+    worker.log.info("Worker {} wrote its profile to {}.txt and {}.folded".format(worker.pid, path, path))
+
+
+def main():
+    configuration = {
+        'port': serve.DEFAULT_PORT,
+        'bind': '{}:{}'.format(serve.HOST, serve.DEFAULT_PORT),
+        'workers': serve.DEFAULT_WORKERS_NUMBER,
+        'threads': DEFAULT_THREADS,
+        'timeout': serve.DEFAULT_TIMEOUT,
+        'post_fork': post_fork,
+        'post_worker_init': post_worker_init,
+        'worker_exit': worker_exit,
+        }
+    configuration = serve.read_user_configuration(configuration, get_parser())
+    WebAPIApplication(configuration).run()
+
+
+if __name__ == '__main__':
+    main()
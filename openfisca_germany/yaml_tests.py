@@ -0,0 +1,383 @@
+# -*- coding: utf-8 -*-
+
+# This file runs the YAML tests of the country package in batches, like `openfisca test`, but much faster on large test suites.
+# OpenFisca-Core builds a simulation for each test case, and runs the cases one after the other.
+# Here, the tax and benefit system, and each of its reformed variants, is built once. Test cases with the same period, reforms and extensions, and setting the same inputs, are merged into one situation, as the `/calculate` requests of the web API, see `web_api/batching.py`, and simulated once.
+# The merged simulations are spread over forked worker processes, which share the systems. The outputs of each case are still checked, and failures reported, case by case.
+#
+# Usage: python -m openfisca_germany.yaml_tests openfisca_germany/tests [--processes 4] [--name-filter housing]
+
+import argparse
+from functools import lru_cache
+import importlib
+import logging
+import multiprocessing
+import os
+import sys
+import time
+
+from openfisca_core import periods
+from openfisca_core.simulation_builder import SimulationBuilder
+from openfisca_core.tools import assert_near
+from openfisca_core.tools.test_runner import TEST_KEYWORDS, Loader, yaml
+
+from openfisca_germany.systems import get_tax_benefit_system
+from openfisca_germany.web_api.batching import get_batch_id, get_batch_key, merge_situations
+
+
+log = logging.getLogger(__name__)
+
+# Maximum number of cases merged into one simulation. Building larger simulations from situations takes a time quadratic in their number of persons.
+DEFAULT_BATCH_SIZE = 500
+
+# Arguments shared with the forked workers. Only set while tests are running.
+_shared = None
+
+
+@lru_cache(maxsize = None)
+def parse_period(value):
+    # Parsing periods is slow, and the cases of a batch check the same periods
+    return periods.period(value)
+
+
+def iter_yaml_files(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, _, file_names in sorted(os.walk(path)):
+                for file_name in sorted(file_names):
+                    if file_name.endswith(('.yaml', '.yml')):
+                        yield os.path.join(directory, file_name)
+        else:
+            yield path
+
+
+def load_cases(paths, name_filter = None):
+    """
+    Returns the test cases of the YAML files of ``paths``, exploring directories recursively, as dicts with the ``path`` of their file, their ``name`` and their ``test``.
+
+    :param name_filter: If given, only the cases whose file name, name or keywords contain it are returned, as with ``openfisca test --name_filter``.
+    """
+    cases = []
+    for path in iter_yaml_files(paths):
+        with open(path) as yaml_file:
+            tests = yaml.load(yaml_file, Loader = Loader)
+        file_name = os.path.splitext(os.path.basename(path))[0]
+        for test in tests if isinstance(tests, list) else [tests]:
+            if name_filter is None or name_filter in file_name or name_filter in test.get('name', '') or name_filter in test.get('keywords', []):
+                cases.append(dict(path = path, name = test.get('name', ''), test = test))
+    return cases
+
+
+def as_list(value):
+    if value is None:
+        return []
+    return value if isinstance(value, list) else [value]
+
+
+def get_system_key(test):
+    return tuple(as_list(test.get('reforms'))), frozenset(as_list(test.get('extensions')))
+
+
+def import_reform(path):
+    module_name, _, name = path.rpartition('.')
+    return getattr(importlib.import_module(module_name), name)
+
+
+def build_tax_benefit_system(tax_benefit_system, reforms, extensions):
+    """
+    Returns ``tax_benefit_system`` with ``reforms``, given by their import path, and ``extensions``. Without ``tax_benefit_system``, reforms are applied to the shared system, see :any:`get_tax_benefit_system`.
+    """
+    reform_classes = [import_reform(reform) for reform in reforms]
+    if tax_benefit_system is None:
+        tax_benefit_system = get_tax_benefit_system(*reform_classes)
+    else:
+        for reform_class in reform_classes:
+            tax_benefit_system = reform_class(tax_benefit_system)
+    for extension in sorted(extensions):
+        tax_benefit_system = tax_benefit_system.clone()
+        tax_benefit_system.load_extension(extension)
+    return tax_benefit_system
+
+
+def get_situation(tax_benefit_system, test):
+    """
+    Returns the input of ``test`` as a situation describing all its entities, in which all the values are given by period.
+
+    Inputs only made of variables describe persons each alone in their groups, with the first role, as in ``SimulationBuilder.build_from_variables``.
+    """
+    default_period = str(periods.period(test['period'])) if test.get('period') is not None else None
+    input_dict = SimulationBuilder().explicit_singular_entities(tax_benefit_system, test.get('input') or {})
+
+    def by_period(values):
+        if isinstance(values, dict):
+            return {str(period): value for period, value in values.items()}
+        if default_period is None:
+            raise ValueError("Input variables should be set for specific periods, or the test should have a period.")
+        return {default_period: values}
+
+    plurals = tax_benefit_system.entities_plural()
+    if any(key in plurals for key in input_dict):
+        role_keys = {entity.plural: {role.plural or role.key for role in entity.roles} for entity in tax_benefit_system.group_entities}
+        return {
+            plural: {
+                str(entity_id): {
+                    name: values if name in role_keys.get(plural, ()) else by_period(values)
+                    for name, values in (instance or {}).items()
+                    }
+                for entity_id, instance in instances.items()
+                }
+            for plural, instances in input_dict.items()
+            }
+
+    # Each value is given for all the persons, or as a list with one value per person
+    values_by_period = {name: by_period(values) for name, values in input_dict.items()}
+    count = max([len(value) for values in values_by_period.values() for value in values.values() if isinstance(value, list)] or [1])
+    ids = [str(index) for index in range(count)]
+    situation = {tax_benefit_system.person_entity.plural: {person_id: {} for person_id in ids}}
+    for entity in tax_benefit_system.group_entities:
+        role = entity.roles[0]
+        situation[entity.plural] = {entity_id: {role.plural or role.key: [entity_id]} for entity_id in ids}
+    for name, values in values_by_period.items():
+        variable = tax_benefit_system.get_variable(name, check_existence = True)
+        for index, entity_id in enumerate(ids):
+            situation[variable.entity.plural][entity_id][name] = {
+                period: value[index] if isinstance(value, list) else value
+                for period, value in values.items()
+                }
+    return situation
+
+
+def get_instance_ids(tax_benefit_system, situation):
+    """
+    Returns the ids of the instances of each entity of ``situation``, in the order of the simulation, including the groups of the persons listed in no group.
+    """
+    persons = list(situation.get(tax_benefit_system.person_entity.plural, {}))
+    ids = {tax_benefit_system.person_entity.plural: persons}
+    for entity in tax_benefit_system.group_entities:
+        instances = situation.get(entity.plural)
+        if instances is None:
+            ids[entity.plural] = persons
+            continue
+        members = set()
+        for instance in instances.values():
+            for role in entity.roles:
+                members.update(str(member) for member in as_list(instance.get(role.plural or role.key)))
+        ids[entity.plural] = list(instances) + [person for person in persons if person not in members]
+    return ids
+
+
+def check_case(tax_benefit_system, simulation, case, get_id, options, positions):
+    """
+    Checks the outputs of ``case`` in ``simulation``, whose entity ids are given by ``get_id``.
+
+    :param positions: The index of each entity id in ``simulation``, by entity plural, shared by the cases of ``simulation``. Filled as needed.
+    :raises: AssertionError if an output differs from its expected value.
+    """
+    test = case['test']
+    situation = case['situation']
+    instance_ids = get_instance_ids(tax_benefit_system, situation)
+    indexes = {}
+
+    def get_indexes(plural):
+        if plural not in indexes:
+            if plural not in positions:
+                positions[plural] = {entity_id: index for index, entity_id in enumerate(simulation.get_population(plural = plural).ids)}
+            indexes[plural] = [positions[plural][get_id(entity_id)] for entity_id in instance_ids[plural]]
+        return indexes[plural]
+
+    def check_variable(name, expected_value, period, plural = None, entity_id = None):
+        only_variables = options.get('only_variables')
+        ignore_variables = options.get('ignore_variables')
+        if (ignore_variables is not None and name in ignore_variables) or (only_variables is not None and name not in only_variables):
+            return
+        if isinstance(expected_value, dict):
+            for requested_period, expected_value_at_period in expected_value.items():
+                check_variable(name, expected_value_at_period, requested_period, plural, entity_id)
+            return
+        values = simulation.calculate(name, parse_period(period))
+        if entity_id is None:
+            actual_value = values[get_indexes(tax_benefit_system.get_variable(name, check_existence = True).entity.plural)]
+        else:
+            actual_value = values[get_indexes(plural)[instance_ids[plural].index(str(entity_id))]]
+        assert_near(
+            actual_value,
+            expected_value,
+            absolute_error_margin = test.get('absolute_error_margin'),
+            message = '{}@{}: '.format(name, period),
+            relative_error_margin = test.get('relative_error_margin'),
+            )
+
+    period = test.get('period')
+    singulars = tax_benefit_system.entities_by_singular()
+    for key, expected_value in test['output'].items():
+        if tax_benefit_system.get_variable(key) is not None:
+            check_variable(key, expected_value, period)
+        elif key in singulars:
+            for name, value in expected_value.items():
+                check_variable(name, value, period)
+        elif key in tax_benefit_system.entities_plural():
+            for entity_id, values in expected_value.items():
+                for name, value in values.items():
+                    check_variable(name, value, period, key, entity_id)
+        else:
+            raise ValueError("'{}' is neither a variable nor an entity.".format(key))
+
+
+def get_error_message(error):
+    if isinstance(error, AssertionError):
+        return str(error)
+    if hasattr(error, 'error'):  # SituationParsingError
+        return 'Could not parse situation described: {}'.format(error.error)
+    return '{}: {}'.format(type(error).__name__, error)
+
+
+def simulate_cases(tax_benefit_system, cases, options):
+    """
+    Simulates ``cases`` in one simulation, and returns the error message of each case, or ``None`` if it passed.
+
+    :raises: The exception raised while building or computing the simulation, which may be due to any case.
+    """
+    period = cases[0]['test'].get('period')
+    builder = SimulationBuilder()
+    builder.set_default_period(period)
+    if len(cases) == 1:
+        simulation = builder.build_from_entities(tax_benefit_system, cases[0]['situation'])
+        get_ids = [lambda entity_id: entity_id]
+    else:
+        simulation = builder.build_from_entities(tax_benefit_system, merge_situations(tax_benefit_system, [case['situation'] for case in cases]))
+        get_ids = [lambda entity_id, index = index: get_batch_id(index, entity_id) for index in range(len(cases))]
+    messages = []
+    positions = {}
+    for case, get_id in zip(cases, get_ids):
+        try:
+            check_case(tax_benefit_system, simulation, case, get_id, options, positions)
+            messages.append(None)
+        except AssertionError as error:
+            messages.append(get_error_message(error))
+    return messages
+
+
+def run_group(group):
+    """
+    Runs the cases of ``group``, a list of indexes of the shared cases, and returns the index, the error message, or ``None``, and the number of cases simulated together, of each case.
+
+    If the merged simulation cannot be built or computed, e.g. because one case is invalid, the error is logged, and each case is simulated alone, so that errors are reported to their case only.
+    """
+    systems, cases, options = _shared
+    group_cases = [cases[index] for index in group]
+    tax_benefit_system = systems[get_system_key(group_cases[0]['test'])]
+    if len(group) > 1:
+        try:
+            return [(index, message, len(group)) for index, message in zip(group, simulate_cases(tax_benefit_system, group_cases, options))]
+        except Exception:
+            log.warning("Unable to simulate the {} cases of '{}' together: simulating each of them alone.".format(len(group), group_cases[0]['path']), exc_info = True)
+    results = []
+    for index, case in zip(group, group_cases):
+        try:
+            results.append((index, simulate_cases(tax_benefit_system, [case], options)[0], 1))
+        except Exception as error:
+            results.append((index, get_error_message(error), 1))
+    return results
+
+
+def check_keys(case):
+    test = case['test']
+    if not test.get('output'):
+        return "Missing key 'output' in test '{}' in file '{}'".format(case['name'], case['path'])
+    if not TEST_KEYWORDS.issuperset(test.keys()):
+        return "Unexpected keys {} in test '{}' in file '{}'".format(set(test.keys()).difference(TEST_KEYWORDS), case['name'], case['path'])
+    return None
+
+
+def run_yaml_tests(paths, tax_benefit_system = None, processes = None, batch_size = DEFAULT_BATCH_SIZE, options = None):
+    """
+    Runs the YAML tests of ``paths``, exploring directories recursively, with one simulation for each group of compatible cases.
+
+    :param tax_benefit_system: The system to test, to which the reforms of the cases are applied. Defaults to the shared system, see :any:`get_tax_benefit_system`.
+    :param processes: Number of worker processes. Defaults to the number of CPU cores. With one process, or on platforms that cannot fork, the tests run in the current process.
+    :param batch_size: Maximum number of cases simulated together.
+    :param options: ``name_filter``, ``only_variables`` and ``ignore_variables``, as the options of ``openfisca test``.
+
+    :returns: A dict for each case, with the ``path`` of its file, its ``name``, the ``error`` message if it failed, else ``None``, and the number of cases simulated with it in its ``batch``, 1 if its batch could not be simulated together.
+
+    Cases are merged if they have the same period, reforms and extensions, and set the same inputs for the same periods, see :any:`get_batch_key`. Cases with ``axes`` are simulated alone.
+
+    Example:
+
+    >>> results = run_yaml_tests(['openfisca_germany/tests'], processes = 8)
+    >>> failures = [result for result in results if result['error'] is not None]
+    """
+    global _shared
+
+    options = options or {}
+    cases = load_cases(paths, options.get('name_filter'))
+    results = [dict(path = case['path'], name = case['name'], error = check_keys(case), batch = 0) for case in cases]
+
+    # Systems are built, and their variables imported, once, before forking
+    systems = {}
+    groups = {}
+    for index, case in enumerate(cases):
+        if results[index]['error'] is not None:
+            continue
+        system_key = get_system_key(case['test'])
+        try:
+            if system_key not in systems:
+                systems[system_key] = build_tax_benefit_system(tax_benefit_system, *system_key)
+                list(systems[system_key].variables)
+            case['situation'] = get_situation(systems[system_key], case['test'])
+        except Exception as error:
+            results[index]['error'] = get_error_message(error)
+            continue
+        key = get_batch_key(systems[system_key], case['situation'])
+        period = case['test'].get('period')
+        group_key = (system_key, str(periods.period(period)) if period is not None else None, key) if key is not None else ('alone', index)
+        groups.setdefault(group_key, []).append(index)
+
+    # The largest batches first, so that workers finish at about the same time
+    groups = sorted((group[start:start + batch_size] for group in groups.values() for start in range(0, len(group), batch_size)), key = len, reverse = True)
+    processes = processes or os.cpu_count() or 1
+    if processes > 1 and 'fork' not in multiprocessing.get_all_start_methods():
+        processes = 1
+    processes = min(processes, max(len(groups), 1))
+
+    _shared = (systems, cases, options)
+    try:
+        if processes == 1:
+            group_results = [run_group(group) for group in groups]
+        else:
+            with multiprocessing.get_context('fork').Pool(processes) as pool:
+                group_results = pool.map(run_group, groups, chunksize = 1)
+    finally:
+        _shared = None
+
+    for group_result in group_results:
+        for index, message, batch in group_result:
+            results[index]['error'] = message
+            results[index]['batch'] = batch
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description = "Run YAML tests, merging compatible test cases into vectorial simulations run on several processes.")
+    parser.add_argument('paths', nargs = '+', help = "paths of the YAML files, or of directories containing them")
+    parser.add_argument('--processes', type = int, help = "number of worker processes, by default the number of CPU cores")
+    parser.add_argument('--batch-size', type = int, default = DEFAULT_BATCH_SIZE, help = "maximum number of test cases simulated together")
+    parser.add_argument('-n', '--name-filter', help = "only run the tests whose file name, name or keywords contain this text")
+    parser.add_argument('-o', '--only-variables', nargs = '+', help = "only check these output variables")
+    parser.add_argument('-i', '--ignore-variables', nargs = '+', help = "do not check these output variables")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    options = dict(name_filter = args.name_filter, only_variables = args.only_variables, ignore_variables = args.ignore_variables)
+    results = run_yaml_tests(args.paths, processes = args.processes, batch_size = args.batch_size, options = options)
+    failures = [result for result in results if result['error'] is not None]
+    for result in failures:
+        print("{}:\n  Test '{}':\n{}".format(result['path'], result['name'], '\n'.join('    ' + line for line in result['error'].splitlines())))  # noqa: T001, T201
+    simulations = sum(1. / result['batch'] for result in results if result['batch'])
+    print("{} passed, {} failed, {} simulations, in {:.2f}s".format(  # noqa: T001, T201
+        len(results) - len(failures), len(failures), round(simulations), time.perf_counter() - start))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,7 +4,7 @@ from setuptools import setup, find_packages
 
 setup(
     name = "OpenFisca-Germany",
-    version = "3.9.10",
+    version = "4.0.2",
     author = "OpenFisca Team",
     author_email = "contact@openfisca.org",
     classifiers=[
@@ -26,6 +26,9 @@ setup(
         "OpenFisca-Core[web-api] >=27.0,<35.0",
         ],
     extras_require = {
+        "arrow": [
+            "pyarrow >=1.0",
+            ],
         "dev": [
             "autopep8 ==1.5",
             "flake8 >=3.5.0,<3.8.0",